@@ -0,0 +1,232 @@
+"""
+Per-player distribution and league percentile analytics on NumPy arrays.
+
+`snapshot()` takes every counted player-match (non-ringer stats of
+completed, non-SCRIM matches, halves summed) from the stats store's
+player-match table and sorts it into a struct of arrays by player and played
+date. When the store isn't ready (or is disabled) the same table is loaded
+with `statstore.load_columns` instead. Everything else is computed
+vectorized for all players at once:
+
+- per-match mean, standard deviation and quantiles of kills/deaths/flags
+  (sorted once by player and value, quantiles interpolated per group),
+- career K/D with the leaderboard's rule (`serializers.kd_ratio`),
+- form over each player's last N matches from cumulative sums,
+- league quantiles and percentile ranks of the per-player averages.
+
+The snapshot is cached in-process and stale once `stats_store.version` has
+moved on: every match write in this process, and every other worker's match
+write heard on the invalidation bus, goes through the store, enabled or not.
+A snapshot older than `ANALYTICS_TTL_SECONDS` (the bus's fallback TTL while
+its listener is down) counts as stale too. A stale snapshot keeps being
+served while a background thread rebuilds it. The first snapshot is built in
+the background at startup (`start()`); requests that arrive before it is
+done wait for it.
+
+Snapshots loaded from the database read the primary, as the store does: on
+a lagging replica a build could miss a write and still be recorded as the
+version after it.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from invalidation import bus
+from statstore import StoreView, load_columns, store as stats_store
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.getenv("ANALYTICS_TTL_SECONDS", "60"))
+
+METRICS = ("kills", "deaths", "flags")
+QUANTILES = {"p10": 0.10, "p25": 0.25, "p50": 0.50, "p75": 0.75, "p90": 0.90, "p99": 0.99}
+
+
+def _group_quantile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated quantile `q` of every group in values sorted by (group, value)."""
+    pos = starts + q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _kd(kills: np.ndarray, deaths: np.ndarray) -> np.ndarray:
+    # Same as serializers.kd_ratio: kills/deaths, or kills when there are no deaths
+    safe = np.where(deaths > 0, deaths, 1)
+    return np.round(np.where(deaths > 0, kills / safe, kills), 2)
+
+
+class StatsSnapshot:
+    """Per-match player stats as arrays, with per-player aggregates precomputed."""
+
+    def __init__(self, rows: np.ndarray, version: int = 0):
+        # rows: player_id, match_id, kills, deaths, flags; sorted by player, played date
+        self.built_at = time.monotonic()
+        self.version = version  # stats_store.version the rows reflect
+        self.rows = len(rows)
+        player_col = rows[:, 0] if len(rows) else np.empty(0, dtype=np.int64)
+        self.player_ids, self.starts, self.counts = np.unique(player_col, return_index=True, return_counts=True)
+        self.ends = self.starts + self.counts
+        self.values = {metric: rows[:, 2 + i].astype(np.float64) for i, metric in enumerate(METRICS)}
+        # Zero-prefixed running sums give any contiguous window's total in O(1)
+        self.cumsums = {
+            metric: np.concatenate(([0.0], np.cumsum(values))) for metric, values in self.values.items()
+        }
+
+        group = np.repeat(np.arange(len(self.player_ids)), self.counts)
+        self.totals = {m: np.add.reduceat(v, self.starts) if self.rows else v for m, v in self.values.items()}
+        self.means = {m: self.totals[m] / self.counts for m in METRICS}
+        self.stddevs = {}
+        self.quantiles = {}
+        for metric, values in self.values.items():
+            deviations = (values - np.repeat(self.means[metric], self.counts)) ** 2
+            variance = np.add.reduceat(deviations, self.starts) / self.counts if self.rows else deviations
+            self.stddevs[metric] = np.sqrt(variance)
+            sorted_values = values[np.lexsort((values, group))]
+            self.quantiles[metric] = {
+                name: _group_quantile(sorted_values, self.starts, self.counts, q) for name, q in QUANTILES.items()
+            }
+            self.quantiles[metric]["min"] = sorted_values[self.starts] if self.rows else values
+            self.quantiles[metric]["max"] = sorted_values[self.ends - 1] if self.rows else values
+        self.kd = _kd(self.totals["kills"], self.totals["deaths"])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.player_ids, self.starts, self.counts, self.ends, self.kd]
+        arrays += list(self.values.values()) + list(self.cumsums.values()) + list(self.totals.values())
+        arrays += list(self.means.values()) + list(self.stddevs.values())
+        arrays += [a for qs in self.quantiles.values() for a in qs.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def index_of(self, player_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self.player_ids, player_id))
+        if i < len(self.player_ids) and self.player_ids[i] == player_id:
+            return i
+        return None
+
+    def form(self, last: int) -> Dict[str, np.ndarray]:
+        """Per-match averages over every player's last `last` matches, plus how many that was."""
+        window_starts = np.maximum(self.starts, self.ends - last)
+        matches = self.ends - window_starts
+        form = {"matches": matches}
+        for metric, cumsum in self.cumsums.items():
+            form[metric] = cumsum[self.ends] - cumsum[window_starts]
+        form["kd_ratio"] = _kd(form["kills"], form["deaths"])
+        for metric in METRICS:
+            form[metric] = form[metric] / matches
+        return form
+
+    def per_player(self, min_matches: int = 1) -> Dict[str, np.ndarray]:
+        """Per-player averages for players with at least `min_matches` matches."""
+        eligible = self.counts >= min_matches
+        averages = {f"{m}_per_match": self.means[m][eligible] for m in METRICS}
+        averages["kd_ratio"] = self.kd[eligible]
+        return averages
+
+    def league_quantiles(self, min_matches: int = 1) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name, values in self.per_player(min_matches).items():
+            if len(values):
+                qs = np.quantile(values, list(QUANTILES.values()))
+                result[name] = {q: round(float(v), 3) for q, v in zip(QUANTILES, qs)}
+            else:
+                result[name] = {q: None for q in QUANTILES}
+        return result
+
+    def percentile_ranks(self, index: int, min_matches: int = 1) -> Dict[str, Optional[float]]:
+        """Share (0-100) of eligible players whose average is at or below this player's."""
+        ranks = {}
+        player = {f"{m}_per_match": self.means[m][index] for m in METRICS}
+        player["kd_ratio"] = self.kd[index]
+        for name, values in self.per_player(min_matches).items():
+            if not len(values):
+                ranks[name] = None
+                continue
+            sorted_values = np.sort(values)
+            at_or_below = np.searchsorted(sorted_values, player[name], side="right")
+            ranks[name] = round(100.0 * int(at_or_below) / len(sorted_values), 1)
+        return ranks
+
+    def histogram(self, index: int, metric: str, bins: int = 10) -> dict:
+        values = self.values[metric][self.starts[index]:self.ends[index]]
+        counts, edges = np.histogram(values, bins=bins)
+        return {"edges": [round(float(e), 2) for e in edges], "counts": counts.tolist()}
+
+
+def snapshot_from(view: StoreView, version: int = 0) -> StatsSnapshot:
+    stats = view.stats
+    player_ids = view.player_ids[stats["player"]]
+    order = np.lexsort((stats["match_id"], stats["played_date"], player_ids))
+    rows = np.column_stack(
+        (player_ids, stats["match_id"], stats["kills"], stats["deaths"], stats["flags"])
+    ).astype(np.int64)
+    return StatsSnapshot(rows[order], version)
+
+
+def load_snapshot(db: Session) -> StatsSnapshot:
+    return snapshot_from(load_columns(db).view())
+
+
+_snapshot: Optional[StatsSnapshot] = None
+_refreshing = False
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def _build() -> StatsSnapshot:
+    global _snapshot
+    # Read the version first: a write after it only makes this snapshot stale early
+    version = stats_store.version
+    view = stats_store.view()
+    if view is None:
+        with SessionLocal() as db:
+            view = load_columns(db).view()
+    _snapshot = current = snapshot_from(view, version)
+    return current
+
+
+def _refresh():
+    global _refreshing
+    try:
+        with _build_lock:
+            _build()
+    except Exception:
+        logger.exception("Rebuilding the analytics snapshot failed")
+    finally:
+        _refreshing = False
+
+
+def start():
+    """Build the first snapshot in the background so no request has to wait for it."""
+    global _refreshing
+    with _lock:
+        if _snapshot is not None or _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_refresh, name="ktp-analytics-warm", daemon=True).start()
+
+
+def snapshot() -> StatsSnapshot:
+    """The cached snapshot; a stale one is returned while it is rebuilt in the background."""
+    global _refreshing
+    current = _snapshot
+    if current is None:
+        with _build_lock:
+            current = _snapshot or _build()
+        return current
+
+    age = time.monotonic() - current.built_at
+    stale = current.version != stats_store.version or age >= bus.max_age(TTL_SECONDS)
+    if stale:
+        with _lock:
+            start, _refreshing = not _refreshing, True
+        if start:
+            threading.Thread(target=_refresh, name="ktp-analytics-refresh", daemon=True).start()
+    return current
+
@@ -8,6 +8,7 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
+from tracing import traced
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,7 +17,10 @@ SECRET_KEY = os.getenv("SECRET_KEY", "ktp-league-super-secret-key-change-in-prod
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashing cost; the tests lower it. Existing hashes verify with the rounds stored in them.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -42,6 +46,7 @@ def decode_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+@traced
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -66,6 +71,7 @@ async def get_current_user(
     
     return user
 
+@traced
 async def get_current_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
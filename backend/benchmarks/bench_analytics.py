@@ -0,0 +1,70 @@
+"""
+Latency of the NumPy analytics endpoints at a given number of stat rows.
+
+Generates a league with about `--stat-rows` rows in player_match_stats,
+times building the analytics snapshot (the one bulk query plus the
+vectorized per-player aggregates), then times warm requests to
+`/api/stats/players/{id}/distribution` and `/api/stats/percentiles`.
+
+    python -m benchmarks.bench_analytics --stat-rows 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.common import use_scratch_database, reset_schema, make_client, report
+
+use_scratch_database()
+
+# datagen: two sides of SIDE_SIZE players, two halves each
+ROWS_PER_MATCH = 2 * 6 * 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stat-rows", type=int, default=1_000_000)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="fail if a median exceeds this")
+    args = parser.parse_args()
+
+    from database import engine, SessionLocal
+    from benchmarks.datagen import generate_league
+    import analytics
+
+    reset_schema()
+    league = generate_league(engine, teams=args.teams, matches=args.stat_rows // ROWS_PER_MATCH)
+    print(f"{league['player_match_stats']} stat rows, {league['players']} players")
+
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        snapshot = analytics.load_snapshot(db)
+        report("snapshot build", time.perf_counter() - start)
+    print(f"snapshot: {snapshot.rows} player-matches, {snapshot.nbytes / 1024 / 1024:.1f} MiB")
+
+    client = make_client()
+    client.get("/api/stats/percentiles").raise_for_status()  # builds the cached snapshot
+    rng = random.Random(0)
+    player_ids = league["player_ids"]
+    over_budget = []
+    for label, path in [
+        ("GET /players/{id}/distribution", lambda: f"/api/stats/players/{rng.choice(player_ids)}/distribution"),
+        ("GET /percentiles", lambda: "/api/stats/percentiles"),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            client.get(path()).raise_for_status()
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        report(label + " (median)", median)
+        if median * 1000 > args.budget_ms:
+            over_budget.append(label)
+
+    if over_budget:
+        raise SystemExit(f"Over the {args.budget_ms:g} ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Bytes on the wire and latency for identity vs gzip vs brotli responses.
+
+Latency is measured in-process (so it shows the compression cost); the
+transfer time saved is estimated for a given link speed.
+
+    python -m benchmarks.bench_compression [players] [matches] [mbit_per_s]
+"""
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_scratch_database, reset_schema, make_client, measure
+
+use_scratch_database()
+
+
+def seed(players, matches):
+    from database import engine
+    from models import Team, Player, Match, MatchType
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Team.__table__.insert(), [
+            {"id": i, "name": f"Team {i}", "tag": f"T{i}", "is_free_agents": False} for i in range(1, 51)
+        ])
+        conn.execute(Player.__table__.insert(), [
+            {"nickname": f"player{i}", "team_id": i % 50 + 1, "total_kills": i % 500,
+             "total_deaths": i % 400 + 1, "total_flags": i % 30, "matches_played": i % 50 + 1}
+            for i in range(players)
+        ])
+        conn.execute(Match.__table__.insert(), [
+            {"match_type": MatchType.LEAGUE, "team1_id": i % 50 + 1, "team2_id": (i + 1) % 50 + 1,
+             "team1_score": i % 4, "team2_score": (i + 2) % 4, "map_name": f"dod_map{i % 12}",
+             "played_date": now - timedelta(hours=i), "is_completed": True}
+            for i in range(matches)
+        ])
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    matches = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    mbit = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+    reset_schema()
+    seed(players, matches)
+    client = make_client()
+
+    print(f"{'endpoint':<34} {'encoding':<9} {'bytes':>10} {'ratio':>7} {'server ms':>10} {'transfer ms @%gMbit' % mbit:>20}")
+    for url in ["/api/players", "/api/matches", "/api/stats/leaderboard?limit=500"]:
+        baseline = None
+        for encoding in ["identity", "gzip", "br"]:
+            def fetch():
+                with client.stream("GET", url, headers={"Accept-Encoding": encoding}) as response:
+                    raw = b"".join(response.iter_raw())
+                    return response.headers.get("content-encoding", "identity"), raw
+            seconds, _, (used, raw) = measure(fetch, repeat=5)
+            if used != encoding:
+                print(f"{url:<34} {encoding:<9} (not available)")
+                continue
+            baseline = baseline or len(raw)
+            transfer_ms = len(raw) * 8 / (mbit * 1_000_000) * 1000
+            print(f"{url:<34} {encoding:<9} {len(raw):>10} {baseline / len(raw):6.1f}x {seconds * 1000:10.1f} {transfer_ms:20.1f}")
+
+
+if __name__ == "__main__":
+    main()
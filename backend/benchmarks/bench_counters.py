@@ -0,0 +1,148 @@
+"""
+Concurrent player-counter updates: Python read-modify-write vs atomic SQL.
+
+`--loaders` threads each apply `--loads` match loads to a shared pool of
+`--hot` players (what parallel admins loading matches of the same teams do to
+`players.total_*`). Each strategy starts from the same totals; the report
+shows throughput, failed transactions and how many players ended with totals
+that don't match the sum of the committed loads (lost updates).
+
+    python -m benchmarks.bench_counters --loaders 20 --loads 50
+
+Strategies:
+  read-modify-write  load the Player rows, add in Python, commit (the old code)
+  row-locks          the same with SELECT ... FOR UPDATE (Postgres only)
+  atomic             counters.add_player_totals: rows locked in id order, one UPDATE ... + delta
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import use_scratch_database, reset_schema
+
+use_scratch_database()
+
+
+def _read_modify_write(db, deltas, lock=False):
+    from models import Player
+
+    query = db.query(Player).filter(Player.id.in_(deltas)).order_by(Player.id)
+    if lock:
+        query = query.with_for_update()
+    for player in query:
+        kills, deaths, flags, matches = deltas[player.id]
+        player.total_kills += kills
+        player.total_deaths += deaths
+        player.total_flags += flags
+        player.matches_played += matches
+
+
+def _atomic(db, deltas):
+    from counters import add_player_totals
+
+    add_player_totals(db, deltas)
+
+
+STRATEGIES = {
+    "read-modify-write": _read_modify_write,
+    "row-locks": lambda db, deltas: _read_modify_write(db, deltas, lock=True),
+    "atomic": _atomic,
+}
+
+
+def _totals(engine, player_ids):
+    from sqlalchemy import select
+    from models import Player
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(
+            Player.id, Player.total_kills, Player.total_deaths, Player.total_flags, Player.matches_played
+        ).where(Player.id.in_(player_ids)))
+        return {row[0]: list(row[1:]) for row in rows}
+
+
+def run(strategy, workloads, hot):
+    from database import engine, SessionLocal
+
+    apply = STRATEGIES[strategy]
+    before = _totals(engine, hot)
+    committed = []
+    failures = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(workloads))
+
+    def loader(loads):
+        barrier.wait()
+        for deltas in loads:
+            db = SessionLocal()
+            try:
+                apply(db, deltas)
+                db.commit()
+                with lock:
+                    committed.append(deltas)
+            except Exception as e:
+                db.rollback()
+                with lock:
+                    failures.append(type(e).__name__)
+            finally:
+                db.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workloads)) as pool:
+        list(pool.map(loader, workloads))
+    elapsed = time.perf_counter() - start
+
+    expected = {pid: list(totals) for pid, totals in before.items()}
+    for deltas in committed:
+        for pid, delta in deltas.items():
+            expected[pid] = [a + b for a, b in zip(expected[pid], delta)]
+    after = _totals(engine, hot)
+    lost = sum(1 for pid in hot if after[pid] != expected[pid])
+    return elapsed, len(committed), len(failures), lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loaders", type=int, default=20)
+    parser.add_argument("--loads", type=int, default=50, help="match loads per loader")
+    parser.add_argument("--hot", type=int, default=24, help="players shared by all loaders")
+    parser.add_argument("--per-load", type=int, default=12, help="players per match load")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # One connection per loader
+    os.environ.setdefault("DB_POOL_SIZE", str(args.loaders))
+
+    from database import engine
+    from benchmarks.datagen import generate_league
+
+    reset_schema()
+    league = generate_league(engine, teams=max(2, args.hot // 8), matches=0)
+    hot = league["player_ids"][:args.hot]
+
+    rng = random.Random(args.seed)
+    workloads = [
+        [
+            {
+                pid: [rng.randint(0, 60), rng.randint(0, 50), rng.randint(0, 6), 1]
+                for pid in rng.sample(hot, min(args.per_load, len(hot)))
+            }
+            for _ in range(args.loads)
+        ]
+        for _ in range(args.loaders)
+    ]
+
+    print(f"{args.loaders} loaders x {args.loads} loads on {len(hot)} shared players ({engine.dialect.name})")
+    print(f"{'strategy':<20} {'wall ms':>10} {'loads/s':>9} {'committed':>10} {'failed':>7} {'lost':>5}")
+    for strategy in STRATEGIES:
+        if strategy == "row-locks" and engine.dialect.name != "postgresql":
+            continue
+        elapsed, committed, failed, lost = run(strategy, workloads, hot)
+        print(f"{strategy:<20} {elapsed * 1000:10.1f} {committed / elapsed:9.1f} {committed:10d} {failed:7d} {lost:5d}")
+
+
+if __name__ == "__main__":
+    main()
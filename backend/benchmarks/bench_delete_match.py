@@ -0,0 +1,106 @@
+"""
+Cost of deleting a completed match as its stat set grows.
+
+Loads matches with `--sizes` stat rows each, then deletes them with the old
+per-row reversal (one Player query per stat row, then one per player) and
+with `DELETE /api/matches/{id}` (one aggregated UPDATE). Reports median wall
+time and SQL statements per delete, and checks both leave the same totals.
+
+    python -m benchmarks.bench_delete_match --sizes 12,100,500 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.common import use_scratch_database, reset_schema, stub_auth
+
+use_scratch_database()
+
+
+def legacy_delete(db, match_id):
+    """delete_match before set-based reversal, for comparison."""
+    from models import Match, MatchType, Player, PlayerMatchStats
+
+    match = db.query(Match).filter(Match.id == match_id).first()
+    if match.is_completed and match.match_type != MatchType.SCRIM:
+        stats = db.query(PlayerMatchStats).filter(PlayerMatchStats.match_id == match_id).all()
+        players_updated = set()
+        for stat in stats:
+            if not stat.is_ringer:
+                player = db.query(Player).filter(Player.id == stat.player_id).first()
+                if player:
+                    player.total_kills -= stat.kills
+                    player.total_deaths -= stat.deaths
+                    player.total_flags -= stat.flags
+                    players_updated.add(player.id)
+        for player_id in players_updated:
+            player = db.query(Player).filter(Player.id == player_id).first()
+            if player and player.matches_played > 0:
+                player.matches_played -= 1
+    db.query(PlayerMatchStats).filter(PlayerMatchStats.match_id == match_id).delete()
+    db.delete(match)
+    db.commit()
+
+
+def load(client, team_ids, player_ids, size):
+    stats = [
+        {"player_id": pid, "team_id": team_ids[i % 2], "half": half, "kills": 10, "deaths": 5, "flags": 1}
+        for i, pid in enumerate(player_ids[:size // 2]) for half in (1, 2)
+    ]
+    response = client.post("/api/matches/load", json={
+        "match_type": "LEAGUE", "team1_id": team_ids[0], "team2_id": team_ids[1], "map_name": "dod_anzio",
+        "team1_score": 3, "team2_score": 1, "player_stats": stats,
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def totals(engine):
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT id, total_kills, total_deaths, total_flags, matches_played FROM players ORDER BY id"
+        )).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="12,100,500", help="stat rows per match")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    from fastapi.testclient import TestClient
+    from database import engine, SessionLocal
+    from benchmarks.datagen import generate_league
+    from querystats import count_queries
+
+    reset_schema()
+    league = generate_league(engine, teams=max(2, max(sizes) // 20 + 1), matches=0)
+    team_ids, player_ids = league["team_ids"][:2], league["player_ids"]
+    client = TestClient(stub_auth())
+    baseline = totals(engine)
+
+    print(f"{'stat rows':>9} {'method':<12} {'median ms':>10} {'queries':>8}")
+    for size in sizes:
+        for method in ("per-row", "set-based"):
+            timings, queries = [], []
+            for _ in range(args.repeat):
+                match_id = load(client, team_ids, player_ids, size)
+                with count_queries() as stats:
+                    start = time.perf_counter()
+                    if method == "per-row":
+                        with SessionLocal() as db:
+                            legacy_delete(db, match_id)
+                    else:
+                        client.delete(f"/api/matches/{match_id}").raise_for_status()
+                    timings.append(time.perf_counter() - start)
+                queries.append(stats.count)
+            print(f"{size:9d} {method:<12} {statistics.median(timings) * 1000:10.1f} {statistics.median(queries):8.0f}")
+            if totals(engine) != baseline:
+                raise SystemExit(f"{method} delete left player totals different from before the loads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Endpoint benchmark suite over every route handler in `routes/`.
+
+For each scale a fresh synthetic league is generated (see `datagen`), every
+route is called `--repeat` times through the real app, and median/p95
+latencies plus SQL statement counts are written to
+`benchmarks/results/<dialect>-<matches>-<timestamp>.json`. Each run is
+compared with the previous result file for the same dialect and scale, and
+routes that got slower than `--threshold` are flagged.
+
+    python -m benchmarks.bench_endpoints --scales 1000,10000,100000
+    BENCH_ALLOW_RESET=1 DATABASE_URL=postgresql://... python -m benchmarks.bench_endpoints
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from benchmarks.common import use_scratch_database, reset_schema, make_client
+
+use_scratch_database()
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _load_body(ctx, i):
+    team1, team2 = ctx["team_ids"][0], ctx["team_ids"][1]
+    stats = []
+    for team_id in (team1, team2):
+        for player_id in ctx["roster"][team_id][:6]:
+            for half in (1, 2):
+                stats.append({"player_id": player_id, "team_id": team_id, "half": half,
+                              "kills": 10 + i % 5, "deaths": 8, "flags": i % 2})
+    return {"match_type": "LEAGUE", "team1_id": team1, "team2_id": team2, "map_name": "dod_anzio",
+            "team1_score": 3, "team2_score": 1, "player_stats": stats}
+
+
+def build_cases():
+    """(name, fn(client, ctx, i)) for every route. Write routes clean up after themselves."""
+    def created(ctx, key, value):
+        ctx.setdefault(key, []).append(value)
+        return value
+
+    return [
+        # Auth
+        ("POST /api/auth/login-json", lambda c, ctx, i: c.post(
+            "/api/auth/login-json", json={"username": "admin", "password": "admin"})),
+        ("POST /api/auth/login", lambda c, ctx, i: c.post(
+            "/api/auth/login", data={"username": "admin", "password": "admin"})),
+        ("GET /api/auth/me", lambda c, ctx, i: c.get("/api/auth/me")),
+        ("POST /api/auth/users", lambda c, ctx, i: created(ctx, "new_users", c.post(
+            "/api/auth/users", json={"username": f"bench-{i}-{time.time_ns()}", "password": "x"}))),
+        ("GET /api/auth/users", lambda c, ctx, i: c.get("/api/auth/users")),
+        ("DELETE /api/auth/users/{id}", lambda c, ctx, i: c.delete(
+            f"/api/auth/users/{ctx['new_users'].pop().json()['id']}")),
+        # Teams
+        ("GET /api/teams", lambda c, ctx, i: c.get("/api/teams")),
+        ("GET /api/teams/{id}", lambda c, ctx, i: c.get(f"/api/teams/{ctx['team_ids'][i % 5]}")),
+        ("POST /api/teams", lambda c, ctx, i: created(ctx, "new_teams", c.post(
+            "/api/teams", json={"name": f"Bench {i}", "tag": f"B{i}"}))),
+        ("PUT /api/teams/{id}", lambda c, ctx, i: c.put(
+            f"/api/teams/{ctx['new_teams'][i].json()['id']}", json={"name": f"Bench {i}*"})),
+        ("POST /api/teams/{id}/players/{pid}", lambda c, ctx, i: c.post(
+            f"/api/teams/{ctx['new_teams'][i].json()['id']}/players/{ctx['free_agents'][i]}")),
+        ("DELETE /api/teams/{id}/players/{pid}", lambda c, ctx, i: c.delete(
+            f"/api/teams/{ctx['new_teams'][i].json()['id']}/players/{ctx['free_agents'][i]}")),
+        ("DELETE /api/teams/{id}", lambda c, ctx, i: c.delete(
+            f"/api/teams/{ctx['new_teams'].pop().json()['id']}")),
+        # Players
+        ("GET /api/players", lambda c, ctx, i: c.get("/api/players")),
+        ("GET /api/players/{id}", lambda c, ctx, i: c.get(f"/api/players/{ctx['player_ids'][i]}")),
+        ("POST /api/players", lambda c, ctx, i: created(ctx, "new_players", c.post(
+            "/api/players", json={"nickname": f"bench-player-{i}"}))),
+        ("PUT /api/players/{id}", lambda c, ctx, i: c.put(
+            f"/api/players/{ctx['new_players'][i].json()['id']}", json={"nickname": f"bench-player-{i}*"})),
+        ("DELETE /api/players/{id}", lambda c, ctx, i: c.delete(
+            f"/api/players/{ctx['new_players'].pop().json()['id']}")),
+        # Matches
+        ("GET /api/matches", lambda c, ctx, i: c.get("/api/matches")),
+        ("GET /api/matches/upcoming", lambda c, ctx, i: c.get("/api/matches/upcoming")),
+        ("GET /api/matches/recent", lambda c, ctx, i: c.get("/api/matches/recent")),
+        ("GET /api/matches/{id}", lambda c, ctx, i: c.get(f"/api/matches/{i + 1}")),
+        ("POST /api/matches", lambda c, ctx, i: created(ctx, "scheduled", c.post("/api/matches", json={
+            "match_type": "LEAGUE", "team1_id": ctx["team_ids"][0], "team2_id": ctx["team_ids"][1]}))),
+        ("POST /api/matches/load", lambda c, ctx, i: created(ctx, "loaded", c.post(
+            "/api/matches/load", json=_load_body(ctx, i)))),
+        ("PUT /api/matches/{id}", lambda c, ctx, i: c.put(
+            f"/api/matches/{ctx['loaded'][i].json()['id']}", json={"team1_score": 4})),
+        ("POST /api/matches/{id}/stats", lambda c, ctx, i: c.post(
+            f"/api/matches/{ctx['scheduled'][i].json()['id']}/stats", json={
+                "player_id": ctx["player_ids"][0], "team_id": ctx["team_ids"][0], "half": 1,
+                "kills": 5, "deaths": 5, "flags": 0})),
+        ("DELETE /api/matches/{id}", lambda c, ctx, i: c.delete(
+            f"/api/matches/{ctx['loaded'].pop().json()['id']}")),
+        # Stats
+        ("GET /api/stats/leaderboard", lambda c, ctx, i: c.get("/api/stats/leaderboard")),
+        ("GET /api/stats/dashboard", lambda c, ctx, i: c.get("/api/stats/dashboard")),
+        ("GET /api/stats/maps", lambda c, ctx, i: c.get("/api/stats/maps")),
+        ("GET /api/stats/team/{id}", lambda c, ctx, i: c.get(f"/api/stats/team/{ctx['team_ids'][i % 5]}")),
+        ("GET /api/stats/compare", lambda c, ctx, i: c.get(
+            "/api/stats/compare", params={"players": ",".join(map(str, ctx["player_ids"][:20]))})),
+    ]
+
+
+def run_scale(matches, teams, repeat):
+    from database import engine
+    from benchmarks.datagen import generate_league, ROSTER_SIZE
+    from querystats import count_queries
+
+    reset_schema()
+    summary = generate_league(engine, teams=teams, matches=matches)
+    ctx = dict(summary)
+    ctx["roster"] = {
+        tid: summary["player_ids"][n * ROSTER_SIZE:(n + 1) * ROSTER_SIZE]
+        for n, tid in enumerate(summary["team_ids"])
+    }
+    ctx["free_agents"] = summary["player_ids"][len(summary["team_ids"]) * ROSTER_SIZE:]
+    client = make_client()
+
+    results = {}
+    for name, fn in build_cases():
+        timings = []
+        queries = []
+        for i in range(repeat):
+            with count_queries() as stats:
+                start = time.perf_counter()
+                response = fn(client, ctx, i)
+                timings.append(time.perf_counter() - start)
+            queries.append(stats.count)
+            if response.status_code >= 400:
+                raise SystemExit(f"{name} failed with {response.status_code}: {response.text[:200]}")
+        timings.sort()
+        results[name] = {
+            "median_ms": statistics.median(timings) * 1000,
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            "queries": max(queries),
+        }
+    return engine.dialect.name, results
+
+
+def compare(dialect, matches, results, threshold):
+    previous_files = sorted(glob.glob(os.path.join(RESULTS_DIR, f"{dialect}-{matches}-*.json")))
+    previous = {}
+    if previous_files:
+        with open(previous_files[-1]) as f:
+            previous = json.load(f)["results"]
+
+    print(f"\n{dialect} / {matches} matches")
+    print(f"{'route':<40} {'median ms':>10} {'p95 ms':>10} {'queries':>8} {'vs prev':>9}")
+    regressions = []
+    for name, r in results.items():
+        change = ""
+        if name in previous and previous[name]["median_ms"] > 0:
+            ratio = r["median_ms"] / previous[name]["median_ms"] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > threshold:
+                change += " !"
+                regressions.append(name)
+        print(f"{name:<40} {r['median_ms']:10.1f} {r['p95_ms']:10.1f} {r['queries']:8d} {change:>9}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1000,10000,100000", help="comma-separated match counts")
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    regressions = []
+    for matches in [int(s) for s in args.scales.split(",")]:
+        dialect, results = run_scale(matches, args.teams, args.repeat)
+        regressions += [f"{name} @ {matches}" for name in compare(dialect, matches, results, args.threshold)]
+        if not args.no_save:
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+            with open(os.path.join(RESULTS_DIR, f"{dialect}-{matches}-{stamp}.json"), "w") as f:
+                json.dump({"dialect": dialect, "matches": matches, "results": results}, f, indent=2)
+
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+SQLite vs Postgres parity, from the `bench_endpoints` result files.
+
+Run the endpoint suite once per backend at the same scale, then compare the
+newest result file of each:
+
+    python -m benchmarks.bench_endpoints --scales 10000
+    BENCH_ALLOW_RESET=1 DATABASE_URL=postgresql://... python -m benchmarks.bench_endpoints --scales 10000
+    python -m benchmarks.bench_parity --scale 10000
+
+Prints both medians for every route with the SQLite/Postgres ratio, and
+flags routes whose worst-case statement counts differ. Some differences are
+expected (Postgres writes also send their invalidation NOTIFY); anything
+else is a dialect-specific code path worth a look.
+"""
+import argparse
+import glob
+import json
+import os
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def latest(dialect, matches):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, f"{dialect}-{matches}-*.json")))
+    if not files:
+        raise SystemExit(
+            f"No {dialect} results for {matches} matches in {RESULTS_DIR}; "
+            f"run benchmarks.bench_endpoints --scales {matches} on {dialect} first"
+        )
+    with open(files[-1]) as f:
+        return os.path.basename(files[-1]), json.load(f)["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10000, help="match count of the runs to compare")
+    args = parser.parse_args()
+
+    sqlite_file, sqlite = latest("sqlite", args.scale)
+    pg_file, pg = latest("postgresql", args.scale)
+    print(f"{sqlite_file} vs {pg_file}")
+    print(f"{'route':<40} {'sqlite ms':>10} {'pg ms':>10} {'ratio':>7} {'queries':>9}")
+    differing = []
+    for name in sorted(sqlite.keys() | pg.keys()):
+        if name not in sqlite or name not in pg:
+            print(f"{name:<40} only in {'sqlite' if name in sqlite else 'postgresql'}")
+            continue
+        s, p = sqlite[name], pg[name]
+        ratio = f"{s['median_ms'] / p['median_ms']:.2f}" if p["median_ms"] > 0 else "-"
+        queries = f"{s['queries']}/{p['queries']}"
+        if s["queries"] != p["queries"]:
+            queries += " !"
+            differing.append(name)
+        print(f"{name:<40} {s['median_ms']:10.1f} {p['median_ms']:10.1f} {ratio:>7} {queries:>9}")
+
+    if differing:
+        print(f"\nStatement counts differ for: {', '.join(differing)}")
+
+
+if __name__ == "__main__":
+    main()
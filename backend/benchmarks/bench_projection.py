@@ -0,0 +1,54 @@
+"""
+Full ORM + Pydantic list vs `?fields=` projection on a large players table.
+
+    python -m benchmarks.bench_projection [rows]
+"""
+import sys
+
+from benchmarks.common import use_scratch_database, reset_schema, make_client, measure, report
+
+use_scratch_database()
+
+
+def seed_players(rows):
+    from database import engine
+    from models import Team, Player
+
+    with engine.begin() as conn:
+        conn.execute(Team.__table__.insert(), [
+            {"id": i, "name": f"Team {i}", "tag": f"T{i}", "is_free_agents": False}
+            for i in range(1, 101)
+        ])
+        conn.execute(Player.__table__.insert(), [
+            {
+                "nickname": f"player{i}",
+                "team_id": i % 100 + 1,
+                "total_kills": i % 500,
+                "total_deaths": i % 400,
+                "total_flags": i % 30,
+                "matches_played": i % 50,
+            }
+            for i in range(rows)
+        ])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    reset_schema()
+    seed_players(rows)
+    client = make_client()
+
+    print(f"GET /api/players with {rows} rows")
+    for label, url in [
+        ("full (ORM + PlayerResponse)", "/api/players"),
+        ("fields=id,nickname,team_id", "/api/players?fields=id,nickname,team_id"),
+    ]:
+        seconds, peak, response = measure(lambda: client.get(url), repeat=3)
+        assert response.status_code == 200, response.text
+        assert len(response.json()) == rows
+        report(label, seconds, peak)
+        print(f"{'':<40} {len(response.content) / 1024:10.1f} KiB body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Response construction + serialization cost per hot endpoint payload.
+
+Compares the old path (validated Pydantic construction, FastAPI re-validation
+against `response_model`, stdlib json) with the fast path (`model_construct`
++ `FastJSONResponse`). No database is involved.
+
+    python -m benchmarks.bench_serialization [rows]
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from models import Match, MatchType, Player, PlayerMatchStats, Team  # noqa: E402
+from schemas import (  # noqa: E402
+    MatchResponse, MatchDetailResponse, PlayerStatsLeaderboard, PlayerMatchStatsResponse
+)
+from serializers import (  # noqa: E402
+    FastJSONResponse, match_response, leaderboard_entry, player_stat_response, kd_ratio
+)
+
+
+def slow_render(model_cls, payload):
+    """What FastAPI did before: dump, re-validate, encode, stdlib json."""
+    dumped = jsonable_encoder(payload)
+    if isinstance(dumped, list):
+        validated = [model_cls.model_validate(item) for item in dumped]
+    else:
+        validated = model_cls.model_validate(dumped)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    now = datetime.utcnow()
+    teams = {1: Team(id=1, name="Alpha", tag="A"), 2: Team(id=2, name="Bravo", tag="B")}
+    matches = [
+        Match(id=i, match_type=MatchType.LEAGUE, team1_id=1, team2_id=2, team1_score=3,
+              team2_score=1, map_name="dod_anzio", played_date=now, is_completed=True, created_at=now)
+        for i in range(rows)
+    ]
+    players = [
+        Player(id=i, nickname=f"p{i}", total_kills=i, total_deaths=i // 2 + 1, total_flags=i % 7,
+               matches_played=10, created_at=now)
+        for i in range(rows)
+    ]
+    stats = [
+        PlayerMatchStats(id=i, match_id=1, player_id=i, team_id=1, half=1, kills=i, deaths=3,
+                         flags=1, is_ringer=False)
+        for i in range(24)
+    ]
+
+    def match_slow():
+        payload = [MatchResponse(
+            id=m.id, match_type=m.match_type.value, team1_id=m.team1_id, team2_id=m.team2_id,
+            team1_score=m.team1_score, team2_score=m.team2_score, map_name=m.map_name,
+            scheduled_date=m.scheduled_date, played_date=m.played_date, is_completed=m.is_completed,
+            created_at=m.created_at, team1_name="Alpha", team2_name="Bravo", team1_tag="A", team2_tag="B"
+        ) for m in matches]
+        return slow_render(MatchResponse, payload)
+
+    def match_fast():
+        return FastJSONResponse([match_response(m, teams) for m in matches]).body
+
+    def leaderboard_slow():
+        payload = [PlayerStatsLeaderboard(
+            id=p.id, nickname=p.nickname, team_name="Alpha", total_kills=p.total_kills,
+            total_deaths=p.total_deaths, total_flags=p.total_flags, matches_played=p.matches_played,
+            kd_ratio=kd_ratio(p.total_kills, p.total_deaths)
+        ) for p in players]
+        return slow_render(PlayerStatsLeaderboard, payload)
+
+    def leaderboard_fast():
+        return FastJSONResponse([leaderboard_entry(p, "Alpha") for p in players]).body
+
+    def detail_slow():
+        payload = MatchDetailResponse(
+            **match_response(matches[0], teams).model_dump(),
+            player_stats=[PlayerMatchStatsResponse(
+                id=s.id, match_id=s.match_id, player_id=s.player_id, team_id=s.team_id, half=s.half,
+                kills=s.kills, deaths=s.deaths, flags=s.flags, is_ringer=s.is_ringer,
+                player_nickname="nick"
+            ) for s in stats]
+        )
+        return slow_render(MatchDetailResponse, payload)
+
+    def detail_fast():
+        return FastJSONResponse(match_response(
+            matches[0], teams, cls=MatchDetailResponse,
+            player_stats=[player_stat_response(s, "nick") for s in stats]
+        )).body
+
+    cases = [
+        (f"GET /api/matches ({rows} rows)", match_slow, match_fast),
+        (f"GET /api/stats/leaderboard ({rows} rows)", leaderboard_slow, leaderboard_fast),
+        ("GET /api/matches/{id} (24 stat rows)", detail_slow, detail_fast),
+    ]
+    print(f"{'payload':<42} {'validated+json':>16} {'construct+orjson':>18} {'speedup':>8}")
+    for label, slow, fast in cases:
+        assert json.loads(slow()) == json.loads(fast())
+        slow_s = min(timeit.repeat(slow, number=5, repeat=3)) / 5
+        fast_s = min(timeit.repeat(fast, number=5, repeat=3)) / 5
+        print(f"{label:<42} {slow_s * 1000:13.2f} ms {fast_s * 1000:15.2f} ms {slow_s / fast_s:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Thundering-herd benchmark for single-flight coalescing.
+
+Fires `--clients` simultaneous requests at each coalesced endpoint (what
+happens when a match is loaded and every open dashboard refreshes), with
+coalescing off and on, and reports wall time and the number of SQL
+statements the burst cost the database.
+
+    python -m benchmarks.bench_singleflight --matches 10000 --clients 100
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import use_scratch_database, reset_schema, stub_auth
+
+use_scratch_database()
+
+ENDPOINTS = ["/api/stats/dashboard", "/api/stats/leaderboard", "/api/matches/recent"]
+
+
+async def burst(app, path, clients):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        responses = await asyncio.gather(*[client.get(path) for _ in range(clients)])
+    failed = [r for r in responses if r.status_code != 200]
+    if failed:
+        raise SystemExit(f"{path} failed with {failed[0].status_code}: {failed[0].text[:200]}")
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=100)
+    args = parser.parse_args()
+
+    from database import engine
+    from benchmarks.datagen import generate_league
+    from querystats import count_queries
+    import singleflight
+
+    reset_schema()
+    generate_league(engine, teams=args.teams, matches=args.matches)
+    app = stub_auth()
+
+    print(f"{args.clients} simultaneous requests per endpoint, {args.matches} matches")
+    print(f"{'endpoint':<28} {'coalescing':>10} {'wall ms':>10} {'queries':>8}")
+    for path in ENDPOINTS:
+        bodies = {}
+        for enabled in (False, True):
+            singleflight.set_enabled(enabled)
+            with count_queries() as stats:
+                start = time.perf_counter()
+                responses = asyncio.run(burst(app, path, args.clients))
+                elapsed = time.perf_counter() - start
+            bodies[enabled] = responses[0].content
+            print(f"{path:<28} {'on' if enabled else 'off':>10} {elapsed * 1000:10.1f} {stats.count:8d}")
+        if bodies[False] != bodies[True]:
+            raise SystemExit(f"{path}: coalesced response differs from the uncoalesced one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Stats endpoints served from SQL vs the in-process columnar store.
+
+Generates a league with about `--stat-rows` rows in player_match_stats,
+builds the store (`STATS_STORE_ENABLED` is forced on) and times warm
+requests to the period leaderboard, map stats and team records both ways,
+checking the two return the same data. Also times an incremental append
+(`POST /api/matches/load`) and removal (`DELETE /api/matches/{id}`).
+
+    python -m benchmarks.bench_statstore --stat-rows 1000000
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_scratch_database, reset_schema, make_client
+
+use_scratch_database()
+os.environ["STATS_STORE_ENABLED"] = "true"
+# No background drift checks while timing
+os.environ.setdefault("STATS_STORE_CHECK_SECONDS", "3600")
+
+# datagen: two sides of SIDE_SIZE players, two halves each
+ROWS_PER_MATCH = 2 * 6 * 2
+
+
+def _median_ms(client, path, params, repeat):
+    timings = []
+    body = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, params=params)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        body = response.json()
+    return statistics.median(timings) * 1000, body
+
+
+def _same(path, a, b) -> bool:
+    if path.endswith("/maps"):
+        # Maps with equal counts may come back in either order
+        return sorted(map(str, a)) == sorted(map(str, b))
+    if path.endswith("/leaderboard"):
+        # So may players with equal K/D
+        return sorted(map(str, a)) == sorted(map(str, b))
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stat-rows", type=int, default=1_000_000)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from database import engine
+    from benchmarks.datagen import generate_league
+    from statstore import store
+
+    reset_schema()
+    league = generate_league(engine, teams=args.teams, matches=args.stat_rows // ROWS_PER_MATCH)
+    print(f"{league['player_match_stats']} stat rows, {league['matches']} matches")
+
+    start = time.perf_counter()
+    store.start()
+    while not store.ready:
+        if store.disabled_reason:
+            raise SystemExit(store.disabled_reason)
+        time.sleep(0.01)
+    status = store.status()
+    print(f"store build {(time.perf_counter() - start) * 1000:.0f} ms: "
+          f"{status['player_matches']} player-matches, {status['bytes'] / 1024 / 1024:.1f} MiB")
+
+    client = make_client()
+    since = (datetime.utcnow() - timedelta(days=180)).date().isoformat()
+    team_id = league["team_ids"][0]
+    requests = [
+        ("/api/stats/leaderboard", {"from": since, "limit": 1000}),
+        ("/api/stats/maps", {"from": since}),
+        ("/api/stats/maps", {}),
+        (f"/api/stats/team/{team_id}", {"from": since}),
+        (f"/api/stats/team/{team_id}", {}),
+    ]
+    print(f"{'endpoint':<40} {'sql ms':>9} {'store ms':>9} {'speedup':>8}")
+    mismatched = []
+    for path, params in requests:
+        store_ms, store_body = _median_ms(client, path, params, args.repeat)
+        store.view = lambda: None  # the routes' SQL fallback
+        try:
+            sql_ms, sql_body = _median_ms(client, path, params, args.repeat)
+        finally:
+            del store.view
+        label = path + ("?from" if "from" in params else "")
+        print(f"{label:<40} {sql_ms:9.1f} {store_ms:9.2f} {sql_ms / store_ms:7.0f}x")
+        if not _same(path, sql_body, store_body):
+            mismatched.append(label)
+
+    team1, team2 = league["team_ids"][:2]
+    player_id = league["player_ids"][0]
+    start = time.perf_counter()
+    match = client.post("/api/matches/load", json={
+        "match_type": "LEAGUE", "team1_id": team1, "team2_id": team2, "map_name": "dod_anzio",
+        "team1_score": 3, "team2_score": 1,
+        "player_stats": [{"player_id": player_id, "team_id": team1, "half": 1, "kills": 5, "deaths": 2, "flags": 1}],
+    })
+    load_ms = (time.perf_counter() - start) * 1000
+    match.raise_for_status()
+    start = time.perf_counter()
+    client.delete(f"/api/matches/{match.json()['id']}").raise_for_status()
+    delete_ms = (time.perf_counter() - start) * 1000
+    print(f"load + append {load_ms:.1f} ms, delete + remove {delete_ms:.1f} ms; store still ready: {store.ready}")
+    print(f"drift check matches the database: {store.check()}")
+    store.stop()
+
+    if mismatched:
+        raise SystemExit(f"Store and SQL disagree on: {', '.join(mismatched)}")
+
+
+if __name__ == "__main__":
+    main()
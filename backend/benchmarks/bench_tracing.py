@@ -0,0 +1,104 @@
+"""
+Request latency with tracing off, on but unsampled, and on for every request.
+
+Generates one league, then times warm requests to a few read endpoints in a
+fresh process per mode (tracing is configured at import time). The `all`
+mode exports every trace to a JSON file, which is also used to report how
+many spans a request produced.
+
+    python -m benchmarks.bench_tracing --matches 10000 --repeat 200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import use_scratch_database, reset_schema, make_client
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    "off": {"TRACING_ENABLED": "false"},
+    "unsampled": {"TRACING_ENABLED": "true", "TRACING_SAMPLE_RATE": "0"},
+    "all": {"TRACING_ENABLED": "true", "TRACING_SAMPLE_RATE": "1", "TRACING_EXPORTERS": "json"},
+}
+
+
+def _paths(league):
+    return [
+        "/api/stats/leaderboard?limit=100",
+        "/api/stats/dashboard",
+        f"/api/teams/{league['team_ids'][0]}",
+        f"/api/players/{league['player_ids'][0]}",
+    ]
+
+
+def worker(paths, repeat):
+    """Runs in the child process: median ms per path as JSON on stdout."""
+    import tracing
+
+    client = make_client()
+    medians = {}
+    for path in paths:
+        client.get(path).raise_for_status()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(path).raise_for_status()
+            timings.append(time.perf_counter() - start)
+        medians[path] = statistics.median(timings) * 1000
+    tracing.tracer.stop()
+    print(json.dumps(medians))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    use_scratch_database()
+    if args.worker:
+        worker(json.loads(args.worker), args.repeat)
+        return
+
+    from database import engine
+    from benchmarks.datagen import generate_league
+
+    reset_schema()
+    league = generate_league(engine, teams=args.teams, matches=args.matches)
+    print(f"{league['matches']} matches, {league['player_match_stats']} stat rows")
+    paths = _paths(league)
+    trace_file = os.path.join(tempfile.mkdtemp(prefix="ktp-traces-"), "traces.jsonl")
+
+    results = {}
+    for mode, env in MODES.items():
+        env = {**os.environ, **env, "TRACING_JSON_PATH": trace_file}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_tracing", "--repeat", str(args.repeat),
+             "--worker", json.dumps(paths)],
+            cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    spans = {}
+    with open(trace_file) as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for span in resource["scopeSpans"][0]["spans"]:
+                    spans[span["traceId"]] = spans.get(span["traceId"], 0) + 1
+    traces = len(spans)
+
+    print(f"{'endpoint':<36} " + " ".join(f"{mode + ' ms':>14}" for mode in MODES))
+    for path in paths:
+        print(f"{path:<36} " + " ".join(f"{results[mode][path]:14.2f}" for mode in MODES))
+    print(f"{traces} traces exported, {sum(spans.values()) / max(traces, 1):.1f} spans per trace on average")
+
+
+if __name__ == "__main__":
+    main()
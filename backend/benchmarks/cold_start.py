@@ -0,0 +1,85 @@
+"""
+Cold-start benchmark: process start to the first successful health probe.
+
+Starts `uvicorn main:app` in a fresh process `--repeat` times against an
+already-migrated database and polls `--path` until it returns 200. The
+default `/readyz` only succeeds once the background DB health sample is in;
+`--path /api/health` answers as soon as the app is serving. The
+`auto-migrate` mode boots with AUTO_MIGRATE=true, which runs the migrate and
+seed steps on every start the way the old startup hook did, for comparison.
+
+    python -m benchmarks.cold_start --repeat 10
+    python -m benchmarks.cold_start --modes check
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import use_scratch_database
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    "check": {"AUTO_MIGRATE": "false"},
+    "auto-migrate": {"AUTO_MIGRATE": "true"},
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_cold_start(env, path="/readyz", timeout=60.0):
+    """Seconds from spawning the server until `path` answers 200."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"Server exited during startup:\n{process.stderr.read().decode()}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise SystemExit(f"No successful {path} within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--path", default="/readyz", help="probe that must return 200")
+    args = parser.parse_args()
+
+    use_scratch_database()
+    from manage import migrate
+    migrate()
+
+    print(f"{'mode':<16} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for mode in args.modes.split(","):
+        env = {**os.environ, **MODES[mode]}
+        timings = [time_cold_start(env, args.path) for _ in range(args.repeat)]
+        print(f"{mode:<16} {statistics.median(timings) * 1000:10.1f} "
+              f"{min(timings) * 1000:10.1f} {max(timings) * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
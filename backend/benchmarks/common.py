@@ -0,0 +1,81 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run from the `backend/` directory, e.g.
+`python -m benchmarks.bench_projection`. Unless `DATABASE_URL` is already set
+they point the app at a throwaway SQLite file so no Postgres is needed.
+"""
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+
+def use_scratch_database():
+    """Point DATABASE_URL at a temporary SQLite file unless one is configured."""
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="ktp-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return os.environ["DATABASE_URL"]
+
+
+def reset_schema():
+    """Drop all tables and migrate from scratch. Refuses non-SQLite databases unless BENCH_ALLOW_RESET=1."""
+    from sqlalchemy import text
+    from database import engine, Base
+    from manage import migrate
+    import models  # noqa: F401 - register tables
+
+    if engine.dialect.name != "sqlite" and os.getenv("BENCH_ALLOW_RESET") != "1":
+        raise SystemExit(
+            f"Refusing to drop tables on {engine.url.render_as_string(hide_password=True)}; "
+            "set BENCH_ALLOW_RESET=1 to benchmark against a disposable database"
+        )
+
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    migrate(seed_defaults=False)
+
+
+def stub_auth():
+    """Authenticate every request to `main:app` as an admin; returns the app."""
+    from auth import get_current_user, get_current_admin_user
+    from models import User
+    from main import app
+
+    bench_user = User(id=1, username="bench", is_admin=True, created_at=datetime.utcnow())
+    app.dependency_overrides[get_current_user] = lambda: bench_user
+    app.dependency_overrides[get_current_admin_user] = lambda: bench_user
+    return app
+
+
+def make_client():
+    """TestClient for `main:app` with authentication stubbed out."""
+    from fastapi.testclient import TestClient
+
+    return TestClient(stub_auth())
+
+
+def measure(fn, repeat=5):
+    """Run `fn` `repeat` times; return (median seconds, peak traced bytes, last result)."""
+    timings = []
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(timings), peak, result
+
+
+def report(label, seconds, peak_bytes=None):
+    line = f"{label:<40} {seconds * 1000:10.1f} ms"
+    if peak_bytes is not None:
+        line += f" {peak_bytes / 1024 / 1024:10.1f} MiB peak"
+    print(line)
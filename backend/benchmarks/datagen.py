@@ -0,0 +1,176 @@
+"""
+Synthetic league generator.
+
+Builds a realistic league with bulk Core inserts: `teams` teams with
+10-player rosters, a pool of free agents, `matches` completed 6v6 matches
+(two halves of `PlayerMatchStats` each) in a SCRIM/LEAGUE/DRAFT mix, a few
+upcoming scheduled matches, and player totals consistent with the API's
+rules (SCRIM and ringer stats don't count).
+
+    python -m benchmarks.datagen --teams 40 --matches 100000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+MAPS = [
+    "dod_anzio", "dod_avalanche", "dod_flash", "dod_kalt", "dod_caen", "dod_chemille",
+    "dod_donner", "dod_harrington", "dod_lennon", "dod_thunder", "dod_merderet", "dod_solitude",
+]
+MATCH_TYPE_WEIGHTS = [("LEAGUE", 0.5), ("SCRIM", 0.3), ("DRAFT", 0.2)]
+ROSTER_SIZE = 10
+SIDE_SIZE = 6
+BATCH_SIZE = 10_000
+
+
+def _batched_insert(conn, table, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(table), rows[i:i + BATCH_SIZE])
+
+
+def generate_league(engine, teams: int = 20, matches: int = 1000, free_agents: int = 30,
+                    upcoming: int = 20, seed: int = 0) -> dict:
+    """Insert a league into an empty schema and return a summary of what was created."""
+    from models import Match, MatchType, Player, PlayerMatchStats, Team, User
+    from auth import get_password_hash
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    match_types = [MatchType(name) for name, _ in MATCH_TYPE_WEIGHTS]
+    weights = [w for _, w in MATCH_TYPE_WEIGHTS]
+
+    team_rows = [{"id": 1, "name": "FREE AGENTS", "tag": "FA", "is_free_agents": True}]
+    team_rows += [
+        {"id": t, "name": f"Team {t - 1}", "tag": f"T{t - 1}", "is_free_agents": False}
+        for t in range(2, teams + 2)
+    ]
+
+    rosters = {}
+    next_player = 1
+    for team in team_rows[1:]:
+        rosters[team["id"]] = list(range(next_player, next_player + ROSTER_SIZE))
+        next_player += ROSTER_SIZE
+    free_agent_ids = list(range(next_player, next_player + free_agents))
+    player_team = {pid: tid for tid, pids in rosters.items() for pid in pids}
+    player_team.update({pid: 1 for pid in free_agent_ids})
+
+    totals = {pid: [0, 0, 0, 0] for pid in player_team}
+    match_rows = []
+    stat_rows = []
+    stat_id = 1
+    team_ids = list(rosters)
+    for match_id in range(1, matches + 1):
+        team1, team2 = rng.sample(team_ids, 2)
+        match_type = rng.choices(match_types, weights)[0]
+        counts = match_type != MatchType.SCRIM
+        score1, score2 = rng.randint(0, 5), rng.randint(0, 5)
+        played_date = now - timedelta(minutes=(matches - match_id) * 90)
+        match_rows.append({
+            "id": match_id,
+            "match_type": match_type,
+            "team1_id": team1,
+            "team2_id": team2,
+            "team1_score": score1,
+            "team2_score": score2,
+            "map_name": rng.choice(MAPS),
+            "scheduled_date": None,
+            "played_date": played_date,
+            "is_completed": True,
+        })
+        for team_id in (team1, team2):
+            lineup = rng.sample(rosters[team_id], SIDE_SIZE)
+            ringer = None
+            if match_type == MatchType.SCRIM and free_agent_ids and rng.random() < 0.2:
+                ringer = rng.choice(free_agent_ids)
+                lineup[-1] = ringer
+            for player_id in lineup:
+                is_ringer = player_id == ringer
+                for half in (1, 2):
+                    kills, deaths, flags = rng.randint(0, 30), rng.randint(0, 25), rng.randint(0, 3)
+                    stat_rows.append({
+                        "id": stat_id, "match_id": match_id, "player_id": player_id,
+                        "team_id": team_id, "half": half, "kills": kills, "deaths": deaths,
+                        "flags": flags, "is_ringer": is_ringer, "played_date": played_date,
+                    })
+                    stat_id += 1
+                    if counts and not is_ringer:
+                        total = totals[player_id]
+                        total[0] += kills
+                        total[1] += deaths
+                        total[2] += flags
+                if counts and not is_ringer:
+                    totals[player_id][3] += 1
+
+    for i in range(upcoming):
+        team1, team2 = rng.sample(team_ids, 2)
+        match_rows.append({
+            "id": matches + i + 1,
+            "match_type": rng.choices(match_types, weights)[0],
+            "team1_id": team1,
+            "team2_id": team2,
+            "team1_score": 0,
+            "team2_score": 0,
+            "map_name": rng.choice(MAPS),
+            "scheduled_date": now + timedelta(days=i + 1),
+            "played_date": None,
+            "is_completed": False,
+        })
+
+    player_rows = [
+        {
+            "id": pid, "nickname": f"player{pid}", "team_id": player_team[pid],
+            "total_kills": t[0], "total_deaths": t[1], "total_flags": t[2], "matches_played": t[3],
+        }
+        for pid, t in totals.items()
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{
+            "username": "admin", "password_hash": get_password_hash("admin"), "is_admin": True
+        }])
+        _batched_insert(conn, Team.__table__, team_rows)
+        _batched_insert(conn, Player.__table__, player_rows)
+        _batched_insert(conn, Match.__table__, match_rows)
+        _batched_insert(conn, PlayerMatchStats.__table__, stat_rows)
+        if engine.dialect.name == "postgresql":
+            # Explicit ids don't advance the serial sequences
+            for table in ("teams", "players", "matches", "player_match_stats"):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                )
+
+    return {
+        "teams": len(team_rows),
+        "players": len(player_rows),
+        "matches": len(match_rows),
+        "player_match_stats": len(stat_rows),
+        "team_ids": team_ids,
+        "player_ids": list(player_team),
+        "completed_match_ids": (1, matches),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--free-agents", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from benchmarks.common import use_scratch_database, reset_schema
+    url = use_scratch_database()
+    reset_schema()
+
+    from database import engine
+    summary = generate_league(engine, args.teams, args.matches, args.free_agents, seed=args.seed)
+    print(f"Generated into {url.rsplit('@', 1)[-1]}: " + ", ".join(
+        f"{summary[k]} {k}" for k in ("teams", "players", "matches", "player_match_stats")
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Concurrent end-to-end load test with per-endpoint latency percentiles.
+
+Drives `main:app` in-process through httpx's ASGI transport (default, on a
+freshly generated league in a scratch SQLite database) or a running server
+with `--url`. Virtual users pick scenarios by weight until `--duration`
+expires; the report shows throughput and p50/p95/p99 per endpoint.
+
+    python -m benchmarks.loadtest --concurrency 50 --duration 30
+    python -m benchmarks.loadtest --url http://localhost:8000 --slo "GET /api/stats/leaderboard:p95=250"
+
+Each `--slo ENDPOINT:pNN=MS` that is breached makes the run exit non-zero.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import use_scratch_database
+
+
+class Context:
+    """Ids discovered from the API that scenarios draw from."""
+
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.match_ids = []
+        self.rosters = {}
+
+
+async def _dashboard_view(client, ctx, rng):
+    yield "GET /api/stats/dashboard", await client.get("/api/stats/dashboard")
+    yield "GET /api/matches/recent", await client.get("/api/matches/recent")
+    yield "GET /api/matches/upcoming", await client.get("/api/matches/upcoming")
+
+
+async def _leaderboard(client, ctx, rng):
+    sort_by = rng.choice(["kd_ratio", "kills", "flags", "matches"])
+    yield "GET /api/stats/leaderboard", await client.get(f"/api/stats/leaderboard?sort_by={sort_by}")
+
+
+async def _match_detail(client, ctx, rng):
+    match_id = rng.choice(ctx.match_ids)
+    yield "GET /api/matches/{id}", await client.get(f"/api/matches/{match_id}")
+
+
+async def _login_burst(client, ctx, rng):
+    for _ in range(3):
+        yield "POST /api/auth/login-json", await client.post(
+            "/api/auth/login-json", json={"username": ctx.username, "password": ctx.password}
+        )
+
+
+async def _match_load(client, ctx, rng):
+    team1, team2 = rng.sample(list(ctx.rosters), 2)
+    stats = [
+        {"player_id": pid, "team_id": tid, "half": half, "kills": rng.randint(0, 30),
+         "deaths": rng.randint(0, 25), "flags": rng.randint(0, 3)}
+        for tid in (team1, team2) for pid in ctx.rosters[tid][:6] for half in (1, 2)
+    ]
+    response = await client.post("/api/matches/load", json={
+        "match_type": rng.choice(["LEAGUE", "SCRIM", "DRAFT"]), "team1_id": team1, "team2_id": team2,
+        "map_name": "dod_anzio", "team1_score": rng.randint(0, 5), "team2_score": rng.randint(0, 5),
+        "player_stats": stats,
+    })
+    yield "POST /api/matches/load", response
+
+
+SCENARIOS = {
+    "dashboard": (_dashboard_view, 40),
+    "leaderboard": (_leaderboard, 25),
+    "match_detail": (_match_detail, 25),
+    "login_burst": (_login_burst, 5),
+    "match_load": (_match_load, 5),
+}
+
+
+async def _discover(client, ctx):
+    response = await client.post(
+        "/api/auth/login-json", json={"username": ctx.username, "password": ctx.password}
+    )
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    matches = (await client.get("/api/matches?fields=id&is_completed=true")).json()
+    ctx.match_ids = [m["id"] for m in matches]
+    teams = {t["id"]: t for t in (await client.get("/api/teams?fields=id,is_free_agents")).json()}
+    for player in (await client.get("/api/players?fields=id,team_id")).json():
+        team = teams.get(player["team_id"])
+        if team and not team["is_free_agents"]:
+            ctx.rosters.setdefault(player["team_id"], []).append(player["id"])
+    ctx.rosters = {tid: pids for tid, pids in ctx.rosters.items() if len(pids) >= 6}
+
+
+async def _virtual_user(client, ctx, scenarios, deadline, samples, errors, seed):
+    rng = random.Random(seed)
+    names = list(scenarios)
+    weights = [scenarios[n][1] for n in names]
+    while time.perf_counter() < deadline:
+        scenario, _ = scenarios[rng.choices(names, weights)[0]]
+        steps = scenario(client, ctx, rng)
+        while True:
+            start = time.perf_counter()
+            try:
+                label, response = await steps.__anext__()
+            except StopAsyncIteration:
+                break
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                break
+            samples[label].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[f"{label} {response.status_code}"] += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def parse_slos(values):
+    slos = []
+    for value in values:
+        endpoint, _, target = value.rpartition(":")
+        pct, _, ms = target.partition("=")
+        slos.append((endpoint, int(pct.lstrip("p")), float(ms)))
+    return slos
+
+
+async def run(args):
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        use_scratch_database()
+        from benchmarks.common import reset_schema
+        from benchmarks.datagen import generate_league
+        from database import engine
+        from main import app
+
+        reset_schema()
+        generate_league(engine, teams=args.teams, matches=args.matches)
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+
+    ctx = Context(args.username, args.password)
+    scenarios = {name: SCENARIOS[name] for name in args.scenarios.split(",")}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        await _discover(client, ctx)
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            _virtual_user(client, ctx, scenarios, deadline, samples, errors, seed)
+            for seed in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in samples.values())
+    print(f"\n{total} requests in {elapsed:.1f}s with {args.concurrency} users: {total / elapsed:.1f} req/s")
+    print(f"{'endpoint':<32} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    summary = {}
+    for label in sorted(samples):
+        values = sorted(samples[label])
+        summary[label] = {pct: percentile(values, pct) * 1000 for pct in (50, 95, 99)}
+        print(f"{label:<32} {len(values):7d} {len(values) / elapsed:8.1f} "
+              f"{summary[label][50]:8.1f} {summary[label][95]:8.1f} {summary[label][99]:8.1f}")
+    if errors:
+        print("\nErrors:")
+        for key, count in sorted(errors.items()):
+            print(f"  {key}: {count}")
+
+    breached = []
+    for endpoint, pct, limit_ms in parse_slos(args.slo):
+        if endpoint not in samples:
+            breached.append(f"{endpoint}: no requests recorded")
+            continue
+        observed = percentile(sorted(samples[endpoint]), pct) * 1000
+        if observed > limit_ms:
+            breached.append(f"{endpoint} p{pct}: {observed:.1f} ms > {limit_ms} ms")
+    if breached:
+        print("\nSLO breached:\n  " + "\n  ".join(breached))
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process ASGI)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--teams", type=int, default=20, help="league size for in-process runs")
+    parser.add_argument("--matches", type=int, default=5000, help="league size for in-process runs")
+    parser.add_argument("--slo", action="append", default=[], metavar="ENDPOINT:pNN=MS")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
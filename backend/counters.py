@@ -0,0 +1,151 @@
+"""
+Atomic maintenance of the denormalized player counters.
+
+`Player.total_kills`, `total_deaths`, `total_flags` and `matches_played` are
+changed with a single UPDATE that adds deltas in SQL, never by reading the
+rows into Python, so concurrent writers can't overwrite each other's changes:
+
+    UPDATE players SET total_kills = players.total_kills + v.kills, ...
+    FROM (VALUES (:player_id, :kills, ...), ...) AS v (player_id, kills, ...)
+    WHERE players.id = v.player_id
+
+Other databases (SQLite can't name VALUES columns) get the same single
+statement with a CASE per column. Reversing or re-applying a whole match
+aggregates its stats in the database instead (`add_match_totals`), and
+`recompute_player_totals` sets the counters from scratch.
+
+The UPDATE locks rows in whatever order its plan visits them, which Postgres
+doesn't promise to be id order, so two writers sharing players could each
+hold a row the other one waits for. Every writer therefore locks the players'
+rows in id order first (`lock_players`); SQLite ignores the lock and
+serializes writers anyway.
+
+A match counts towards the totals once it is completed, unless it is a
+SCRIM (`counts_towards_totals`); ringer stats never count.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from sqlalchemy import Integer, case, column, func, select, update, values
+from sqlalchemy.orm import Session
+
+from models import Match, MatchType, Player, PlayerMatchStats
+
+COUNTERS = ("total_kills", "total_deaths", "total_flags", "matches_played")
+
+# player_id -> [kills, deaths, flags, matches_played]
+PlayerDeltas = Dict[int, List[int]]
+
+
+def counts_towards_totals(match: Match) -> bool:
+    return bool(match.is_completed) and match.match_type != MatchType.SCRIM
+
+
+def stat_deltas(stats: Iterable, sign: int = 1) -> PlayerDeltas:
+    """
+    Deltas for adding (sign=1) or removing (sign=-1) one match's stat rows.
+    Ringer rows don't count, and each player's match counts once; callers
+    check `counts_towards_totals` first.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0, sign])
+    for stat in stats:
+        if stat.is_ringer:
+            continue
+        totals = deltas[stat.player_id]
+        totals[0] += sign * stat.kills
+        totals[1] += sign * stat.deaths
+        totals[2] += sign * stat.flags
+    return dict(deltas)
+
+
+def merge_deltas(*parts: PlayerDeltas) -> PlayerDeltas:
+    """Sum several sets of deltas, e.g. removing old stats and adding new ones."""
+    merged = defaultdict(lambda: [0] * len(COUNTERS))
+    for deltas in parts:
+        for pid, delta in deltas.items():
+            merged[pid] = [a + b for a, b in zip(merged[pid], delta)]
+    return dict(merged)
+
+
+def lock_players(db: Session, player_ids):
+    """Lock the players' rows in id order until the caller commits (`player_ids` may be a subquery)."""
+    db.execute(select(Player.id).where(Player.id.in_(player_ids)).order_by(Player.id).with_for_update())
+
+
+def add_player_totals(db: Session, deltas: PlayerDeltas):
+    """Add `deltas` to the players' counters in one UPDATE (caller commits)."""
+    deltas = {pid: d for pid, d in deltas.items() if any(d)}
+    if not deltas:
+        return
+
+    lock_players(db, sorted(deltas))
+    if db.get_bind().dialect.name == "postgresql":
+        v = values(
+            column("player_id", Integer), *[column(c, Integer) for c in COUNTERS], name="v"
+        ).data([(pid, *deltas[pid]) for pid in sorted(deltas)])
+        stmt = update(Player).where(Player.id == v.c.player_id).values(
+            {c: getattr(Player, c) + v.c[c] for c in COUNTERS}
+        )
+    else:
+        stmt = update(Player).where(Player.id.in_(deltas)).values({
+            c: getattr(Player, c) + case(
+                {pid: d[i] for pid, d in deltas.items()}, value=Player.id, else_=0
+            )
+            for i, c in enumerate(COUNTERS)
+        })
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+
+def add_match_totals(db: Session, match: Match, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) all of a match's stats in one aggregated UPDATE."""
+    db.flush()
+    per_player = select(
+        PlayerMatchStats.player_id,
+        func.sum(PlayerMatchStats.kills).label("kills"),
+        func.sum(PlayerMatchStats.deaths).label("deaths"),
+        func.sum(PlayerMatchStats.flags).label("flags"),
+    ).where(
+        PlayerMatchStats.for_match(match), PlayerMatchStats.is_ringer == False
+    ).group_by(PlayerMatchStats.player_id).subquery()
+    lock_players(db, select(per_player.c.player_id))
+    db.execute(
+        update(Player).where(Player.id == per_player.c.player_id).values(
+            total_kills=Player.total_kills + sign * per_player.c.kills,
+            total_deaths=Player.total_deaths + sign * per_player.c.deaths,
+            total_flags=Player.total_flags + sign * per_player.c.flags,
+            matches_played=Player.matches_played + sign,
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def recompute_player_totals(db: Session, player_ids):
+    """
+    Set the players' counters from all their counted stats in one UPDATE
+    (caller commits).
+
+    Writers that already changed these players' totals have committed once
+    the locks are granted, so the UPDATE, whose snapshot is taken after them
+    under READ COMMITTED, includes their stats; writers that come later wait
+    and apply theirs on top. Reading the sums into Python and writing them
+    back would overwrite changes made in between.
+    """
+    lock_players(db, player_ids)
+
+    counted = select(PlayerMatchStats.player_id).join(Match, Match.id == PlayerMatchStats.match_id).where(
+        PlayerMatchStats.player_id == Player.id,
+        PlayerMatchStats.is_ringer == False,
+        Match.is_completed == True,
+        Match.match_type != MatchType.SCRIM,
+    )
+
+    def total(expr):
+        return counted.with_only_columns(expr).scalar_subquery()
+
+    db.execute(
+        update(Player).where(Player.id.in_(player_ids)).values(
+            total_kills=total(func.coalesce(func.sum(PlayerMatchStats.kills), 0)),
+            total_deaths=total(func.coalesce(func.sum(PlayerMatchStats.deaths), 0)),
+            total_flags=total(func.coalesce(func.sum(PlayerMatchStats.flags), 0)),
+            matches_played=total(func.count(func.distinct(PlayerMatchStats.match_id))),
+        ).execution_options(synchronize_session=False)
+    )
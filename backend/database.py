@@ -1,8 +1,18 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi import Depends, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 from dotenv import load_dotenv
+from invalidation import bus
+from tracing import traced
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -17,21 +27,180 @@ DATABASE_URL = os.getenv(
 
 logger.info(f"Connecting to database: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'localhost'}")
 
+# Optional read replica for GET endpoints; falls back to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# After a successful write, the user's reads go to the primary for this long
+READ_AFTER_WRITE_SECONDS = int(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+# Logging in or registering writes nothing the user reads back
+READ_AFTER_WRITE_EXEMPT_PATHS = ("/api/auth/",)
+
+def _pool_options(prefix: str = "DB") -> dict:
+    """Pool settings from the environment, e.g. DB_POOL_SIZE / DB_READ_POOL_SIZE"""
+    return {
+        "pool_pre_ping": True,  # Verify connections before using
+        "pool_recycle": int(os.getenv(f"{prefix}_POOL_RECYCLE", "300")),  # Recycle connections every 5 minutes
+        "pool_size": int(os.getenv(f"{prefix}_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv(f"{prefix}_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv(f"{prefix}_POOL_TIMEOUT", "30")),
+    }
+
+# SQLite tuning (DATABASE_URL=sqlite:///./ktp.db). Every pooled connection
+# gets these PRAGMAs when it is opened.
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))  # seconds a writer waits for the lock
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative: KiB, so 64 MiB
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL lets readers run alongside the single writer; with WAL, NORMAL
+        # only risks the last commits on power loss, never corruption.
+        # In-memory databases keep their "memory" journal.
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        # Off by default in SQLite; the ON DELETE CASCADE / SET NULL keys rely on it
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+def _create_engine(url: str, prefix: str = "DB"):
+    """Engine for `url`; SQLite URLs get the tuning above instead of Postgres-sized pools"""
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url, **_pool_options(prefix))
+
+    # Connections are handed between threads (FastAPI's threadpool, the
+    # background jobs), each used by one thread at a time through the pool.
+    # pysqlite only opens a transaction at the first INSERT/UPDATE/DELETE, so
+    # reads never hold a snapshot that would make a later write fail with
+    # "database is locked" instead of waiting for the busy timeout.
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}
+    if make_url(url).database in (None, "", ":memory:"):
+        # One shared connection, or every checkout would see its own empty database
+        sqlite_engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        sqlite_engine = create_engine(url, connect_args=connect_args, **_pool_options(prefix))
+    event.listen(sqlite_engine, "connect", _sqlite_pragmas)
+    return sqlite_engine
+
 # Configure engine with SSL support for cloud databases (Neon, etc.)
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=300,    # Recycle connections every 5 minutes
-    pool_size=5,
-    max_overflow=10,
-)
+engine = _create_engine(DATABASE_URL, "DB")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if DATABASE_READ_URL:
+    logger.info(f"Routing reads to replica: {DATABASE_READ_URL.split('@')[1] if '@' in DATABASE_READ_URL else 'localhost'}")
+    read_engine = _create_engine(DATABASE_READ_URL, "DB_READ")
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
+@traced
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+class RecentWriters:
+    """
+    Users (bearer token subjects) who made a successful write in the last
+    `ttl` seconds. Each worker keeps its own copy; on Postgres the writes are
+    announced over the invalidation bus so every worker knows them.
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def mark(self, subject: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) > 1000:
+                self._until = {s: until for s, until in self._until.items() if until > now}
+            self._until[subject] = now + self.ttl
+    
+    def __contains__(self, subject: Optional[str]) -> bool:
+        until = self._until.get(subject)
+        return until is not None and until > time.monotonic()
+
+recent_writers = RecentWriters(READ_AFTER_WRITE_SECONDS)
+
+@bus.on("writer")
+def _writer_elsewhere(tag: Optional[str]):
+    # Another worker's write; a reconnect (tag None) only risks a few stale reads
+    if tag is not None:
+        recent_writers.mark(tag.split(":", 1)[1])
+
+def request_subject(authorization: Optional[str]) -> Optional[str]:
+    """The `sub` of a valid bearer token in an Authorization header, else None"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from auth import decode_token  # auth imports this module
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
+
+def _announce_write(subject: str):
+    db = SessionLocal()
+    try:
+        bus.publish(db, f"writer:{subject}")
+        db.commit()
+    except Exception:
+        logger.warning("Could not announce a write by %s to other workers", subject, exc_info=True)
+    finally:
+        db.close()
+
+@traced
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Session for read-only endpoints. Uses the replica when one is configured,
+    except for users who wrote recently (read-your-writes) - those share the
+    request's primary session, which costs nothing if it is unused.
+    """
+    if read_engine is engine or request_subject(request.headers.get("authorization")) in recent_writers:
+        yield db
+        return
+    
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+class ReadAfterWriteMiddleware:
+    """
+    Marks users who just made a successful write so their reads stick to the
+    primary. Keyed on the authenticated user rather than a cookie, which a
+    frontend on another origin wouldn't send; auth endpoints don't count.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in ("GET", "HEAD", "OPTIONS")
+            or scope["path"].startswith(READ_AFTER_WRITE_EXEMPT_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                subject = request_subject(Headers(scope=scope).get("authorization"))
+                if subject is not None:
+                    recent_writers.mark(subject)
+                    if bus.active:
+                        # Before the response, so the user's next read finds the mark on any worker
+                        await run_in_threadpool(_announce_write, subject)
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,150 @@
+"""
+Background database health sampling for cheap liveness/readiness probes.
+
+`DatabaseHealthMonitor` runs `SELECT 1` against each registered engine every
+`interval` seconds from a background task and keeps the latest sample: probe
+latency, error and pool saturation (checked-out connections over
+`pool_size + max_overflow`). Probe endpoints only read the cached samples, so
+they never take a pool slot themselves. A sample older than `stale_after`
+counts as a failure, which catches a wedged probe as well as a dead database.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+def pool_status(engine) -> Optional[dict]:
+    """Checked-out/capacity figures for a QueuePool; None for pools without a size."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return None
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+class DatabaseHealthMonitor:
+    def __init__(self, interval: float = 5.0, timeout: float = 2.0, saturation_warning: float = 0.9):
+        self.interval = interval
+        self.timeout = timeout
+        self.saturation_warning = saturation_warning
+        self.stale_after = interval * 3 + timeout
+        self.engines = {}
+        self.samples = {}
+        self._probes = {}
+        self._task = None
+
+    def add_engine(self, name: str, engine):
+        self.engines[name] = engine
+
+    def _probe(self, engine) -> float:
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return time.perf_counter() - start
+
+    async def sample(self, name: str) -> dict:
+        """Probe one engine (off the event loop) and store the result."""
+        engine = self.engines[name]
+        loop = asyncio.get_running_loop()
+        latency = None
+        error = None
+
+        # A probe stuck waiting on the pool or the network keeps its thread;
+        # don't start another one behind it
+        probe = self._probes.get(name)
+        if probe is None or probe.done():
+            probe = self._probes[name] = loop.run_in_executor(None, self._probe, engine)
+        try:
+            latency = await asyncio.wait_for(asyncio.shield(probe), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"probe did not complete within {self.timeout:g}s"
+        except Exception as e:
+            error = str(e)
+
+        sample = {
+            "ok": error is None,
+            "latency_ms": round(latency * 1000, 2) if latency is not None else None,
+            "error": error,
+            "pool": pool_status(engine),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "_monotonic": time.monotonic(),
+        }
+        if error and self.samples.get(name, {}).get("ok", True):
+            logger.warning("Database %s health probe failed: %s", name, error)
+        self.samples[name] = sample
+        return sample
+
+    async def _run(self):
+        while True:
+            for name in self.engines:
+                try:
+                    await self.sample(name)
+                except Exception:  # never let the sampler die
+                    logger.exception("Database %s health sampling failed", name)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        """
+        Overall status from the cached samples.
+
+        `ready` is false until every engine has a fresh, successful sample.
+        `status` is "starting", "healthy", "degraded" (ready but a pool is
+        above `saturation_warning`) or "unhealthy".
+        """
+        now = time.monotonic()
+        databases = {}
+        ready = bool(self.engines)
+        degraded = False
+        for name in self.engines:
+            sample = self.samples.get(name)
+            if sample is None:
+                databases[name] = {"ok": False, "error": "not sampled yet"}
+                ready = False
+                continue
+            age = now - sample["_monotonic"]
+            entry = {k: v for k, v in sample.items() if not k.startswith("_")}
+            entry["age_seconds"] = round(age, 1)
+            if age > self.stale_after:
+                entry["ok"] = False
+                entry["error"] = f"last sample is {age:.0f}s old"
+            databases[name] = entry
+            ready = ready and entry["ok"]
+            pool = entry.get("pool")
+            if pool and pool["saturation"] >= self.saturation_warning:
+                degraded = True
+
+        if not self.samples:
+            status = "starting"
+        elif not ready:
+            status = "unhealthy"
+        elif degraded:
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"status": status, "ready": ready, "databases": databases}
@@ -0,0 +1,199 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Write paths call `bus.publish(db, "match:42", ...)` before they commit. On
+Postgres that is `pg_notify('ktp_changes', payload)`, which is delivered
+only if the transaction commits. Every worker runs a listener thread on its
+own connection (detached from the pool) and, for each tag published by
+another worker, calls the handlers registered for the tag's entity:
+
+    @bus.on("match")
+    def _match_changed(tag: Optional[str]):
+        ...
+
+The worker that made the change updates its own caches directly and
+ignores its own notifications.
+
+While the listener is disconnected other workers' changes are missed, so
+caches ask `bus.max_age(ttl)` how old an entry may get. That is their usual
+TTL while the listener is connected (or when there is no bus, e.g. on
+SQLite), and `INVALIDATION_FALLBACK_TTL_SECONDS` otherwise. After a
+reconnect every handler is called with tag None, since anything may have
+changed in the meantime.
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from metrics import INVALIDATION_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ktp_changes"
+ENABLED = os.getenv("INVALIDATION_ENABLED", "true").lower() == "true"
+FALLBACK_TTL_SECONDS = float(os.getenv("INVALIDATION_FALLBACK_TTL_SECONDS", "5"))
+POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "5"))
+MAX_RECONNECT_DELAY = 30.0
+
+
+class InvalidationBus:
+    def __init__(
+        self,
+        channel: str = CHANNEL,
+        enabled: bool = ENABLED,
+        fallback_ttl: float = FALLBACK_TTL_SECONDS,
+        poll_seconds: float = POLL_SECONDS,
+    ):
+        self.channel = channel
+        self.enabled = enabled
+        self.fallback_ttl = fallback_ttl
+        self.poll_seconds = poll_seconds
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.received = 0
+        self.last_error = None
+        self.backend_pid = None
+        self._handlers = defaultdict(list)
+        self._active = False
+        self._connected = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on(self, entity: str):
+        """Register a handler for another worker's changes to `entity` (tag None: anything changed)."""
+        def decorator(fn: Callable[[Optional[str]], None]):
+            self._handlers[entity].append(fn)
+            return fn
+        return decorator
+
+    @property
+    def active(self) -> bool:
+        """A listener is running (Postgres with INVALIDATION_ENABLED)."""
+        return self._active
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def max_age(self, ttl: float) -> float:
+        """`ttl`, shortened to the fallback TTL while changes from other workers may be missed."""
+        if self._active and not self._connected:
+            return min(ttl, self.fallback_ttl)
+        return ttl
+
+    def publish(self, db: Session, *tags: str):
+        """Queue tags like "match:42" on the session's transaction; sent when it commits."""
+        if not self.enabled or not tags or db.get_bind().dialect.name != "postgresql":
+            return
+        payload = json.dumps({"origin": self.origin, "tags": list(tags)}, separators=(",", ":"))
+        db.execute(func.pg_notify(self.channel, payload).select())
+        INVALIDATION_MESSAGES.labels("published").inc()
+
+    def dispatch(self, tags):
+        for tag in tags:
+            entity = tag.split(":", 1)[0]
+            for handler in self._handlers.get(entity, ()):
+                try:
+                    handler(tag)
+                except Exception:
+                    logger.exception("Invalidation handler for %s failed", tag)
+
+    def _dispatch_all(self):
+        for entity, handlers in list(self._handlers.items()):
+            for handler in handlers:
+                try:
+                    handler(None)
+                except Exception:
+                    logger.exception("Invalidation handler for %s failed", entity)
+
+    def _receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed %s payload: %.100s", self.channel, payload)
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        INVALIDATION_MESSAGES.labels("received").inc()
+        self.dispatch(message.get("tags", []))
+
+    # Listener
+
+    def start(self, engine):
+        if not self.enabled or engine.dialect.name != "postgresql" or self._thread is not None:
+            return
+        self._active = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(engine,), name="ktp-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+        self._active = False
+
+    def _run(self, engine):
+        delay = 1.0
+        missed = False  # whether changes may have gone unheard since startup
+        while not self._stop.is_set():
+            conn = None
+            try:
+                # A connection of its own: detached, so it doesn't hold a pool slot
+                raw = engine.raw_connection()
+                raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                self.backend_pid = conn.get_backend_pid()
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                self._connected = True
+                delay = 1.0
+                if missed:
+                    logger.info("Invalidation listener reconnected; evicting all cached entries")
+                    self._dispatch_all()
+                self._listen(conn)
+            except Exception as e:
+                self.last_error = str(e)
+                if self._connected:
+                    logger.warning("Invalidation listener disconnected: %s", e)
+            finally:
+                self._connected = False
+                missed = True
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                # Nothing for a while: make sure the connection is still alive
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            conn.poll()
+            while conn.notifies:
+                self._receive(conn.notifies.pop(0).payload)
+
+    def status(self) -> dict:
+        return {
+            "active": self._active,
+            "connected": self._connected,
+            "received": self.received,
+            "backend_pid": self.backend_pid,
+            "last_error": self.last_error,
+        }
+
+
+bus = InvalidationBus()
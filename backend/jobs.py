@@ -0,0 +1,319 @@
+"""
+In-process background jobs for heavy recomputations.
+
+Jobs are rows in the `jobs` table (status, progress, result) and run on a
+bounded thread pool (`JOB_WORKERS`) in whichever API process accepted them.
+A partial unique index allows at most one queued/running job per kind, so
+the limit holds across uvicorn workers and instances.
+
+Every process heartbeats the jobs it owns. A queued or running job whose
+heartbeat is older than `JOB_STALE_SECONDS` belongs to a process that died;
+it is marked failed the next time someone submits that kind.
+
+Job kinds register with `job_kind` and receive a `JobContext`:
+
+    @job_kind("rebuild-player-totals")
+    def rebuild_player_totals(ctx, batch_size: int = 500):
+        ...
+        ctx.progress(done / total, f"{done}/{total} players")
+        return {"players": total}
+
+`ctx.progress` raises `JobCancelled` once cancellation has been requested,
+so long loops stop at their next progress report.
+
+A job's keyword parameters (everything after `ctx`) double as its params
+schema: `submit` validates the submitted params against them, so unknown
+names or wrong types are rejected before a job row exists.
+"""
+import inspect
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from sqlalchemy import update, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from counters import recompute_player_totals
+from models import Job, Player, Season
+from rollups import rebuild_season
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+ACTIVE_STATUSES = ("queued", "running")
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+JOB_KINDS: Dict[str, Callable] = {}
+JOB_PARAMS: Dict[str, Type[BaseModel]] = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobConflict(Exception):
+    """Another job of the same kind is already queued or running."""
+
+    def __init__(self, job: Optional[Job]):
+        self.job = job
+        super().__init__(f"A job of this kind is already active (id {job.id if job else '?'})")
+
+
+def job_kind(name: str):
+    """Register a job function under `name`."""
+
+    def decorator(fn):
+        JOB_KINDS[name] = fn
+        JOB_PARAMS[name] = _params_model(fn)
+        return fn
+
+    return decorator
+
+
+def _params_model(fn) -> Type[BaseModel]:
+    """Pydantic model of `fn`'s parameters after the JobContext (other names rejected unless it takes **kwargs)."""
+    fields = {}
+    extra = "forbid"
+    for param in list(inspect.signature(fn).parameters.values())[1:]:
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            extra = "allow"
+            continue
+        annotation = Any if param.annotation is inspect.Parameter.empty else param.annotation
+        default = ... if param.default is inspect.Parameter.empty else param.default
+        fields[param.name] = (annotation, default)
+    return create_model(f"{fn.__name__}_params", __config__=ConfigDict(extra=extra), **fields)
+
+
+def job_params(kind: str, params: Optional[dict]) -> dict:
+    """`params` validated for job `kind`; raises pydantic.ValidationError."""
+    return JOB_PARAMS[kind].model_validate(params or {}).model_dump()
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes, Postgres aware ones; compare in naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class JobContext:
+    def __init__(self, job_id: int, db: Session):
+        self.job_id = job_id
+        self.db = db
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        """Record progress (0..1) and stop with `JobCancelled` if cancellation was requested."""
+        with SessionLocal() as db:
+            db.execute(
+                update(Job).where(Job.id == self.job_id).values(
+                    progress=max(0.0, min(1.0, fraction)), message=message, heartbeat_at=_utcnow()
+                )
+            )
+            cancelled = db.execute(select(Job.cancel_requested).where(Job.id == self.job_id)).scalar()
+            db.commit()
+        if cancelled:
+            raise JobCancelled()
+
+
+class JobRunner:
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._local = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ktp-job")
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="ktp-job-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            with self._lock:
+                job_ids = list(self._local)
+            if not job_ids:
+                continue
+            try:
+                with SessionLocal() as db:
+                    db.execute(update(Job).where(Job.id.in_(job_ids)).values(heartbeat_at=_utcnow()))
+                    db.commit()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def _expire_stale(self, db: Session, kind: str) -> bool:
+        """Fail an active job of `kind` whose owner stopped heartbeating; True if one was expired."""
+        job = db.query(Job).filter(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES)).first()
+        if job is None:
+            return True
+        last_seen = _naive(job.heartbeat_at or job.created_at)
+        if last_seen is not None and _utcnow() - last_seen < timedelta(seconds=STALE_SECONDS):
+            return False
+        logger.warning("Job %s (%s) on %s stopped heartbeating; marking it failed", job.id, kind, job.worker)
+        job.status = "failed"
+        job.error = f"Worker {job.worker} stopped responding"
+        job.finished_at = _utcnow()
+        db.commit()
+        return True
+
+    def submit(self, db: Session, kind: str, params: Optional[dict] = None, user_id: Optional[int] = None) -> Job:
+        """
+        Queue a job, or raise `JobConflict` if one of this kind is already
+        active. Raises pydantic.ValidationError for params the job doesn't take.
+        """
+        if kind not in JOB_KINDS:
+            raise KeyError(kind)
+        params = job_params(kind, params)
+        self._ensure_started()
+
+        for attempt in range(2):
+            job = Job(
+                kind=kind, status="queued", params=params, progress=0.0, cancel_requested=False,
+                worker=WORKER_ID, created_by=user_id, heartbeat_at=_utcnow(),
+            )
+            db.add(job)
+            try:
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt or not self._expire_stale(db, kind):
+                    raise JobConflict(
+                        db.query(Job).filter(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES)).first()
+                    )
+
+        db.refresh(job)
+        with self._lock:
+            self._local.add(job.id)
+        self._executor.submit(self._run, job.id)
+        return job
+
+    def cancel(self, db: Session, job: Job) -> Job:
+        """Cancel a queued job outright; ask a running one to stop at its next progress report."""
+        if job.status == "queued":
+            # Only wins if the worker hasn't picked the job up in the meantime
+            db.execute(
+                update(Job).where(Job.id == job.id, Job.status == "queued").values(
+                    status="cancelled", cancel_requested=True, finished_at=_utcnow()
+                )
+            )
+        db.execute(update(Job).where(Job.id == job.id).values(cancel_requested=True))
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def _run(self, job_id: int):
+        try:
+            with SessionLocal() as db:
+                claimed = db.execute(
+                    update(Job).where(Job.id == job_id, Job.status == "queued").values(
+                        status="running", started_at=_utcnow(), heartbeat_at=_utcnow(), worker=WORKER_ID
+                    )
+                ).rowcount
+                db.commit()
+                if not claimed:
+                    return
+                job = db.get(Job, job_id)
+                fn = JOB_KINDS[job.kind]
+                params = dict(job.params or {})
+
+                values = {}
+                try:
+                    result = fn(JobContext(job_id, db), **params)
+                    values.update(status="succeeded", progress=1.0, result=result)
+                except JobCancelled:
+                    db.rollback()
+                    values.update(status="cancelled")
+                except Exception as e:
+                    db.rollback()
+                    logger.exception("Job %s (%s) failed", job_id, job.kind)
+                    values.update(status="failed", error=f"{type(e).__name__}: {e}")
+                values["finished_at"] = _utcnow()
+                db.execute(update(Job).where(Job.id == job_id).values(**values))
+                db.commit()
+        finally:
+            with self._lock:
+                self._local.discard(job_id)
+
+    def shutdown(self):
+        """Stop accepting work; running jobs are asked to cancel and queued ones are dropped."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            job_ids = list(self._local)
+        self._stop.set()
+        if job_ids:
+            with SessionLocal() as db:
+                db.execute(update(Job).where(Job.id.in_(job_ids)).values(cancel_requested=True))
+                db.commit()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if job_ids:
+            with SessionLocal() as db:
+                db.execute(
+                    update(Job).where(Job.id.in_(job_ids), Job.status == "queued").values(
+                        status="cancelled", error="Server shut down", finished_at=_utcnow()
+                    )
+                )
+                db.commit()
+
+
+runner = JobRunner()
+
+
+# Job kinds
+
+@job_kind("rebuild-player-totals")
+def rebuild_player_totals(ctx: JobContext, batch_size: Annotated[int, Field(gt=0)] = 500):
+    """
+    Recompute every player's totals and matches_played from player_match_stats
+    (only completed non-SCRIM matches, no ringer rows), in batches of players.
+    Each batch is recomputed inside one UPDATE so concurrent match writes
+    aren't lost, and commits on its own to keep row locks short; a cancelled rebuild
+    leaves the remaining players' totals as they were.
+    """
+    db = ctx.db
+    player_ids = [pid for (pid,) in db.query(Player.id).order_by(Player.id)]
+
+    for start in range(0, len(player_ids), batch_size):
+        batch = player_ids[start:start + batch_size]
+        recompute_player_totals(db, batch)
+        db.commit()
+        done = start + len(batch)
+        ctx.progress(done / len(player_ids), f"{done}/{len(player_ids)} players")
+
+    return {"players": len(player_ids)}
+
+
+@job_kind("rebuild-season-rollups")
+def rebuild_season_rollups(ctx: JobContext, season_id: Optional[int] = None):
+    """Recompute player/team season rollups for one season, or all of them."""
+    db = ctx.db
+    query = db.query(Season).order_by(Season.start_date)
+    if season_id is not None:
+        query = query.filter(Season.id == season_id)
+    seasons = query.all()
+
+    for n, season in enumerate(seasons, 1):
+        rebuild_season(db, season)
+        db.commit()
+        ctx.progress(n / len(seasons), f"{season.name} ({n}/{len(seasons)})")
+
+    return {"seasons": [season.id for season in seasons]}
@@ -1,68 +1,67 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from sqlalchemy import text
 import os
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from database import engine, Base, SessionLocal
-from models import User, Team, Player, Match, PlayerMatchStats
-from auth import get_password_hash
-from routes import auth, teams, players, matches, stats
+from database import engine, read_engine, ReadAfterWriteMiddleware
+from health import DatabaseHealthMonitor
+from schema_version import check_schema
+from routes import auth, teams, players, matches, stats, seasons, admin
+from jobs import runner as job_runner
+from statstore import store as stats_store
+import analytics
+from invalidation import bus as invalidation_bus
+from serializers import FastJSONResponse
+from compression import CompressionMiddleware
+from metrics import MetricsMiddleware, instrument_pool, metrics_response
+import querystats
+import tracing
+
+# Probes read DB health sampled in the background instead of querying per request
+db_monitor = DatabaseHealthMonitor(
+    interval=float(os.getenv("HEALTH_CHECK_INTERVAL", "5")),
+    timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "2")),
+    saturation_warning=float(os.getenv("HEALTH_POOL_SATURATION_WARNING", "0.9")),
+)
+db_monitor.add_engine("primary", engine)
+if read_engine is not engine:
+    db_monitor.add_engine("read", read_engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    try:
-        logger.info("Starting KTP League API...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created/verified")
-        
-        # Create default admin user if not exists
-        db = SessionLocal()
-        try:
-            admin = db.query(User).filter(User.username == "admin").first()
-            if not admin:
-                admin_user = User(
-                    username="admin",
-                    password_hash=get_password_hash("admin"),
-                    is_admin=True
-                )
-                db.add(admin_user)
-                db.commit()
-                logger.info("Default admin user created (username: admin, password: admin)")
-            
-            # Create FREE AGENTS team if not exists
-            free_agents = db.query(Team).filter(Team.is_free_agents == True).first()
-            if not free_agents:
-                free_agents_team = Team(
-                    name="FREE AGENTS",
-                    tag="FA",
-                    is_free_agents=True
-                )
-                db.add(free_agents_team)
-                db.commit()
-                logger.info("FREE AGENTS team created")
-        finally:
-            db.close()
-        
-        logger.info("KTP League API started successfully")
-    except Exception as e:
-        logger.error(f"Startup error: {e}")
-        # Don't raise - let the app start anyway so health checks can report the issue
+    # Startup: schema changes and seeding happen in `python manage.py migrate`,
+    # so a cold start only checks the schema revision. Fail loudly rather than
+    # serving against a database the code wasn't written for.
+    logger.info("Starting KTP League API...")
+    if os.getenv("AUTO_MIGRATE", "false").lower() == "true":
+        from manage import migrate
+        migrate()
+    check_schema(engine)
+    db_monitor.start()
+    invalidation_bus.start(engine)
+    stats_store.start()
+    analytics.start()
+    logger.info("KTP League API started successfully")
     
     yield
     # Shutdown
+    await db_monitor.stop()
+    stats_store.stop()
+    invalidation_bus.stop()
+    job_runner.shutdown()
+    tracing.tracer.stop()
     logger.info("Shutting down KTP League API")
 
 app = FastAPI(
     title="KTP League API",
     description="API for KTP League - Day of Defeat 1.3 competitive league management",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS configuration
@@ -86,12 +85,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (Cloud Run serves the API without nginx in front)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+)
+
+# Reads go to DATABASE_READ_URL when set, except right after a client's write
+if read_engine is not engine:
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+# Request/pool metrics, scraped from /metrics
+instrument_pool(engine)
+if read_engine is not engine:
+    instrument_pool(read_engine, "read")
+app.add_middleware(MetricsMiddleware)
+
+# Per-request SQL counts (X-DB-Queries / Server-Timing) and N+1 warnings;
+# added after MetricsMiddleware so it wraps it
+querystats.instrument_engine(engine)
+if read_engine is not engine:
+    querystats.instrument_engine(read_engine)
+app.add_middleware(
+    querystats.QueryStatsMiddleware,
+    repeat_threshold=int(os.getenv("QUERY_REPEAT_THRESHOLD", "5")),
+    headers=os.getenv("QUERY_STATS_HEADERS", "true").lower() == "true",
+)
+
+# Request tracing (spans per request, dependency, SQL statement and
+# serialization step); added last so it wraps every other middleware
+if tracing.tracer.enabled:
+    tracing.instrument_engine(engine)
+    if read_engine is not engine:
+        tracing.instrument_engine(read_engine)
+    tracing.instrument_fastapi()
+    app.add_middleware(tracing.TracingMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(teams.router)
 app.include_router(players.router)
 app.include_router(matches.router)
 app.include_router(stats.router)
+app.include_router(seasons.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -101,24 +140,44 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is serving requests. Never touches the database."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe from the cached background DB health sample (503 until ready)"""
+    health = db_monitor.status()
+    return FastJSONResponse(health, status_code=200 if health["ready"] else 503)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for deployment monitoring"""
-    try:
-        # Test database connection
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
+    health = db_monitor.status()
+    primary = health["databases"]["primary"]
+    if primary["ok"]:
         db_status = "healthy"
-    except Exception as e:
-        db_status = f"unhealthy: {str(e)}"
+    else:
+        db_status = f"unhealthy: {primary['error']}"
     
     return {
         "status": "healthy" if db_status == "healthy" else "degraded",
         "database": db_status,
-        "api": "healthy"
+        "api": "healthy",
+        "checked_at": primary.get("checked_at"),
+        "latency_ms": primary.get("latency_ms"),
+        "pool": primary.get("pool"),
+        "stats_store": stats_store.status(),
+        "invalidation": invalidation_bus.status(),
+        "tracing": tracing.tracer.status(),
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for routes and the database pool"""
+    return metrics_response()
+
 @app.get("/api/health")
 async def api_health_check():
     """API health check endpoint"""
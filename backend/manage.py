@@ -0,0 +1,164 @@
+"""
+One-off management commands, run once per deploy rather than on every boot.
+
+    python manage.py migrate          # upgrade to the latest schema and seed defaults
+    python manage.py migrate --no-seed
+    python manage.py seed             # default admin user and FREE AGENTS team
+    python manage.py check            # exit non-zero unless the schema is current
+    python manage.py archive-season 3 # move a finished season's stats into their own partition
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timezone
+
+from alembic import command
+from sqlalchemy import inspect, text
+
+from database import engine, SessionLocal
+from schema_version import (
+    SCHEMA_REVISION, SchemaVersionError, alembic_config, check_schema, current_revisions, head_revisions,
+)
+
+logger = logging.getLogger("manage")
+
+# Revision matching the tables `Base.metadata.create_all` used to build at startup
+BASELINE_REVISION = "0001"
+
+
+def migrate(seed_defaults: bool = True):
+    """Upgrade the database to the head revision.
+
+    Databases created by the old startup `create_all` have the tables but no
+    `alembic_version`; they are stamped at the baseline before upgrading.
+    """
+    heads = head_revisions()
+    if heads != {SCHEMA_REVISION}:
+        raise SchemaVersionError(
+            f"schema_version.SCHEMA_REVISION is {SCHEMA_REVISION} but the migration head is "
+            f"{', '.join(sorted(heads))}; update it with the new migration"
+        )
+
+    config = alembic_config()
+    config.attributes["configure_logger"] = False
+    if not current_revisions(engine) and inspect(engine).has_table("users"):
+        logger.info("Existing schema without a revision, stamping %s", BASELINE_REVISION)
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    logger.info("Database schema is up to date")
+    if seed_defaults:
+        seed()
+
+
+def seed():
+    """Create the default admin user and the FREE AGENTS team if missing."""
+    from models import User, Team
+    from auth import get_password_hash
+
+    db = SessionLocal()
+    try:
+        if not db.query(User).filter(User.username == "admin").first():
+            db.add(User(username="admin", password_hash=get_password_hash("admin"), is_admin=True))
+            db.commit()
+            logger.info("Default admin user created (username: admin, password: admin)")
+
+        if not db.query(Team).filter(Team.is_free_agents == True).first():
+            db.add(Team(name="FREE AGENTS", tag="FA", is_free_agents=True))
+            db.commit()
+            logger.info("FREE AGENTS team created")
+    finally:
+        db.close()
+
+
+def archive_season(season_id: int):
+    """Refresh a finished season's rollups and move its stats out of the hot partition.
+
+    On Postgres the season's `player_match_stats` rows move from the DEFAULT
+    partition (`player_match_stats_current`) into a new partition covering
+    exactly the season's dates, clustered by player, so queries on current
+    data no longer scan them. Other databases only get the rollup refresh.
+    """
+    from models import Season
+    from rollups import as_utc, rebuild_season
+
+    db = SessionLocal()
+    try:
+        season = db.get(Season, season_id)
+        if season is None:
+            raise SystemExit(f"Season {season_id} not found")
+        if season.archived_at is not None:
+            raise SystemExit(f"Season {season.name} was already archived")
+        start, end = as_utc(season.start_date), as_utc(season.end_date)
+        if end > datetime.now(timezone.utc):
+            raise SystemExit(f"Season {season.name} hasn't ended yet")
+
+        # Season queries read the rollups; make sure they are complete first
+        rebuild_season(db, season)
+        db.commit()
+
+        if engine.dialect.name == "postgresql":
+            partition = f"player_match_stats_season_{season.id}"
+            bounds = {"start": start, "end": end}
+            db.execute(text(f"CREATE TABLE {partition} (LIKE player_match_stats INCLUDING DEFAULTS)"))
+            moved = db.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM player_match_stats_current
+                    WHERE played_date >= :start AND played_date < :end
+                    RETURNING *
+                )
+                INSERT INTO {partition} SELECT * FROM moved ORDER BY player_id, played_date
+            """), bounds).rowcount
+            # Partition bounds must be literals; they come from our own datetimes
+            db.execute(text(
+                f"ALTER TABLE player_match_stats ATTACH PARTITION {partition} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            logger.info("Moved %s stats rows into %s", moved, partition)
+        else:
+            logger.info("Partitioning needs Postgres; only the rollups were refreshed")
+
+        season.archived_at = datetime.now(timezone.utc)
+        db.commit()
+    finally:
+        db.close()
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"ANALYZE player_match_stats_season_{season_id}"))
+            conn.execute(text("VACUUM ANALYZE player_match_stats_current"))
+    elif engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE player_match_stats"))
+    logger.info("Season %s archived", season_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="upgrade the schema and seed defaults")
+    migrate_parser.add_argument("--no-seed", action="store_true")
+    commands.add_parser("seed", help="create the default admin user and FREE AGENTS team")
+    commands.add_parser("check", help="verify the schema is at the latest revision")
+    archive_parser = commands.add_parser("archive-season", help="move a finished season into its own partition")
+    archive_parser.add_argument("season_id", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "migrate":
+        migrate(seed_defaults=not args.no_seed)
+    elif args.command == "seed":
+        seed()
+    elif args.command == "check":
+        try:
+            check_schema(engine)
+        except SchemaVersionError as e:
+            logger.error(str(e))
+            return 1
+        logger.info("Database schema is up to date")
+    elif args.command == "archive-season":
+        archive_season(args.season_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Prometheus metrics for HTTP routes and the SQLAlchemy connection pool.
+
+`MetricsMiddleware` records per-route request counts, latency, in-flight
+requests and DB queries per request (from `querystats`, whose middleware must
+wrap this one). `instrument_pool` times pool checkout waits; pool gauges are
+read from `engine.pool` at scrape time.
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+
+from querystats import current_stats
+
+REQUESTS = Counter(
+    "ktp_http_requests_total",
+    "HTTP requests handled, by route and status code",
+    ["method", "route", "status"],
+)
+LATENCY = Histogram(
+    "ktp_http_request_duration_seconds",
+    "HTTP request latency in seconds",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_FLIGHT = Gauge(
+    "ktp_http_requests_in_flight",
+    "HTTP requests currently being handled",
+)
+DB_QUERIES = Histogram(
+    "ktp_db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000),
+)
+POOL_WAIT = Histogram(
+    "ktp_db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+COALESCED_REQUESTS = Counter(
+    "ktp_coalesced_requests_total",
+    "Requests that awaited an identical in-flight computation (outcome=shared) "
+    "or gave up waiting and computed their own (outcome=timeout)",
+    ["endpoint", "outcome"],
+)
+INVALIDATION_MESSAGES = Counter(
+    "ktp_invalidation_messages_total",
+    "Cache invalidation messages on the ktp_changes channel, by direction (published, received)",
+    ["direction"],
+)
+STATS_STORE_BYTES = Gauge(
+    "ktp_stats_store_bytes",
+    "Memory held by the in-process columnar stats store (0 when not serving)",
+)
+STATS_STORE_ROWS = Gauge(
+    "ktp_stats_store_rows",
+    "Rows in the columnar stats store, by table",
+    ["table"],
+)
+STATS_STORE_REBUILDS = Counter(
+    "ktp_stats_store_rebuilds_total",
+    "Full rebuilds of the columnar stats store, by reason (startup, write, drift, retry)",
+    ["reason"],
+)
+TRACES = Counter(
+    "ktp_traces_total",
+    "Finished request traces, by result (exported, dropped when the export queue was full, failed to export)",
+    ["result"],
+)
+
+
+class _PoolCollector:
+    def __init__(self):
+        self.engines = {}
+
+    def collect(self):
+        for name, doc, getter in [
+            ("ktp_db_pool_size", "Configured pool size", "size"),
+            ("ktp_db_pool_checked_out", "Connections currently checked out", "checkedout"),
+            ("ktp_db_pool_checked_in", "Idle connections in the pool", "checkedin"),
+            ("ktp_db_pool_overflow", "Connections open beyond pool_size (negative while below it)", "overflow"),
+        ]:
+            family = GaugeMetricFamily(name, doc, labels=["pool"])
+            for pool_name, engine in self.engines.items():
+                if hasattr(engine.pool, getter):
+                    family.add_metric([pool_name], getattr(engine.pool, getter)())
+            yield family
+
+
+_pool_collector = _PoolCollector()
+REGISTRY.register(_pool_collector)
+
+
+def instrument_pool(engine, name: str = "primary"):
+    """Time pool checkouts for `engine` and export its pool gauges as `pool=name`."""
+    wait = POOL_WAIT.labels(name)
+
+    # The pool has no "checkout requested" event, so time the underlying getter
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def _timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            wait.observe(time.perf_counter() - start)
+
+    pool._do_get = _timed_do_get
+    _pool_collector.engines[name] = engine
+
+
+def route_label(scope) -> str:
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    route_paths = getattr(app.state, "metrics_route_paths", None)
+    if route_paths is None:
+        route_paths = {
+            route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")
+        }
+        app.state.metrics_route_paths = route_paths
+    return route_paths.get(endpoint, "unmatched")
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            route = route_label(scope)
+            method = scope["method"]
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            LATENCY.labels(method, route).observe(elapsed)
+            stats = current_stats()
+            if stats is not None:
+                DB_QUERIES.labels(route).observe(stats.count)
+
+
+def metrics_response() -> Response:
+    # Pass the content type as a header so Starlette doesn't append a second charset
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -0,0 +1,101 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 02:19:36
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('teams',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('tag', sa.String(length=10), nullable=False),
+    sa.Column('is_free_agents', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name'),
+    sa.UniqueConstraint('tag')
+    )
+    op.create_index(op.f('ix_teams_id'), 'teams', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('matches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('match_type', sa.Enum('DRAFT', 'LEAGUE', 'SCRIM', name='matchtype'), nullable=False),
+    sa.Column('team1_id', sa.Integer(), nullable=False),
+    sa.Column('team2_id', sa.Integer(), nullable=False),
+    sa.Column('team1_score', sa.Integer(), nullable=True),
+    sa.Column('team2_score', sa.Integer(), nullable=True),
+    sa.Column('map_name', sa.String(length=50), nullable=True),
+    sa.Column('scheduled_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('played_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_completed', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['team1_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['team2_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_matches_id'), 'matches', ['id'], unique=False)
+    op.create_table('players',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nickname', sa.String(length=50), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('total_kills', sa.Integer(), nullable=True),
+    sa.Column('total_deaths', sa.Integer(), nullable=True),
+    sa.Column('total_flags', sa.Integer(), nullable=True),
+    sa.Column('matches_played', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nickname')
+    )
+    op.create_index(op.f('ix_players_id'), 'players', ['id'], unique=False)
+    op.create_table('player_match_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('match_id', sa.Integer(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('half', sa.Integer(), nullable=False),
+    sa.Column('kills', sa.Integer(), nullable=True),
+    sa.Column('deaths', sa.Integer(), nullable=True),
+    sa.Column('flags', sa.Integer(), nullable=True),
+    sa.Column('is_ringer', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['match_id'], ['matches.id'], ),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_player_match_stats_id'), 'player_match_stats', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_player_match_stats_id'), table_name='player_match_stats')
+    op.drop_table('player_match_stats')
+    op.drop_index(op.f('ix_players_id'), table_name='players')
+    op.drop_table('players')
+    op.drop_index(op.f('ix_matches_id'), table_name='matches')
+    op.drop_table('matches')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_teams_id'), table_name='teams')
+    op.drop_table('teams')
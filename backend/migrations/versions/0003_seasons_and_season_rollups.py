@@ -0,0 +1,63 @@
+"""seasons and season rollups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 02:31:05
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('seasons',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('start_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_seasons_id'), 'seasons', ['id'], unique=False)
+    op.create_table('team_season_stats',
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('matches_played', sa.Integer(), nullable=False),
+    sa.Column('wins', sa.Integer(), nullable=False),
+    sa.Column('losses', sa.Integer(), nullable=False),
+    sa.Column('score_for', sa.Integer(), nullable=False),
+    sa.Column('score_against', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('season_id', 'team_id')
+    )
+    op.create_table('player_season_stats',
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('kills', sa.Integer(), nullable=False),
+    sa.Column('deaths', sa.Integer(), nullable=False),
+    sa.Column('flags', sa.Integer(), nullable=False),
+    sa.Column('matches_played', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('season_id', 'player_id')
+    )
+    op.create_index(op.f('ix_matches_played_date'), 'matches', ['played_date'], unique=False)
+    op.create_index(op.f('ix_player_match_stats_match_id'), 'player_match_stats', ['match_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_player_match_stats_match_id'), table_name='player_match_stats')
+    op.drop_index(op.f('ix_matches_played_date'), table_name='matches')
+    op.drop_table('player_season_stats')
+    op.drop_table('team_season_stats')
+    op.drop_index(op.f('ix_seasons_id'), table_name='seasons')
+    op.drop_table('seasons')
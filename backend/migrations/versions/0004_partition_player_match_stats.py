@@ -0,0 +1,84 @@
+"""partition player_match_stats by played_date
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 02:40:12
+
+Adds `player_match_stats.played_date` (a copy of the match's played_date)
+and `seasons.archived_at` on every database. On Postgres the table is then
+rebuilt as a range-partitioned table on played_date with a single DEFAULT
+partition, `player_match_stats_current`; `python manage.py archive-season`
+later moves closed seasons into partitions of their own.
+
+Postgres requires a partitioned table's primary key to include the
+partition key, and played_date is NULL for stats on unplayed matches, so
+the partitioned table has no primary key constraint: ids still come from
+the original sequence and are indexed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = "id, match_id, player_id, team_id, half, kills, deaths, flags, is_ringer, played_date"
+
+_INDEXES_AND_KEYS = """
+CREATE INDEX ix_player_match_stats_id ON player_match_stats (id);
+CREATE INDEX ix_player_match_stats_match_id ON player_match_stats (match_id);
+CREATE INDEX ix_player_match_stats_player_date ON player_match_stats (player_id, played_date);
+ALTER TABLE player_match_stats
+    ADD CONSTRAINT player_match_stats_match_id_fkey FOREIGN KEY (match_id) REFERENCES matches (id),
+    ADD CONSTRAINT player_match_stats_player_id_fkey FOREIGN KEY (player_id) REFERENCES players (id),
+    ADD CONSTRAINT player_match_stats_team_id_fkey FOREIGN KEY (team_id) REFERENCES teams (id);
+"""
+
+
+def upgrade() -> None:
+    op.add_column('seasons', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('player_match_stats', sa.Column('played_date', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE player_match_stats SET played_date = "
+        "(SELECT matches.played_date FROM matches WHERE matches.id = player_match_stats.match_id)"
+    )
+
+    if op.get_bind().dialect.name != "postgresql":
+        op.create_index('ix_player_match_stats_player_date', 'player_match_stats', ['player_id', 'played_date'], unique=False)
+        return
+
+    op.execute(f"""
+ALTER TABLE player_match_stats RENAME TO player_match_stats_unpartitioned;
+ALTER SEQUENCE player_match_stats_id_seq OWNED BY NONE;
+CREATE TABLE player_match_stats (LIKE player_match_stats_unpartitioned INCLUDING DEFAULTS)
+    PARTITION BY RANGE (played_date);
+CREATE TABLE player_match_stats_current PARTITION OF player_match_stats DEFAULT;
+INSERT INTO player_match_stats ({_COLUMNS})
+    SELECT {_COLUMNS} FROM player_match_stats_unpartitioned;
+DROP TABLE player_match_stats_unpartitioned;
+ALTER SEQUENCE player_match_stats_id_seq OWNED BY player_match_stats.id;
+{_INDEXES_AND_KEYS}
+""")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"""
+ALTER TABLE player_match_stats RENAME TO player_match_stats_partitioned;
+ALTER SEQUENCE player_match_stats_id_seq OWNED BY NONE;
+CREATE TABLE player_match_stats (LIKE player_match_stats_partitioned INCLUDING DEFAULTS);
+INSERT INTO player_match_stats ({_COLUMNS})
+    SELECT {_COLUMNS} FROM player_match_stats_partitioned;
+DROP TABLE player_match_stats_partitioned;
+ALTER TABLE player_match_stats ADD PRIMARY KEY (id);
+ALTER SEQUENCE player_match_stats_id_seq OWNED BY player_match_stats.id;
+{_INDEXES_AND_KEYS}
+""")
+
+    op.drop_index('ix_player_match_stats_player_date', table_name='player_match_stats')
+    op.drop_column('player_match_stats', 'played_date')
+    op.drop_column('seasons', 'archived_at')
@@ -0,0 +1,41 @@
+"""player transfer history
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 02:39:45
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('player_transfers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('from_team_id', sa.Integer(), nullable=True),
+    sa.Column('to_team_id', sa.Integer(), nullable=True),
+    sa.Column('moved_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('moved_by', sa.Integer(), nullable=True),
+    sa.Column('note', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['from_team_id'], ['teams.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['moved_by'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['to_team_id'], ['teams.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_player_transfers_id'), 'player_transfers', ['id'], unique=False)
+    op.create_index('ix_player_transfers_player_moved_at', 'player_transfers', ['player_id', 'moved_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_player_transfers_player_moved_at', table_name='player_transfers')
+    op.drop_index(op.f('ix_player_transfers_id'), table_name='player_transfers')
+    op.drop_table('player_transfers')
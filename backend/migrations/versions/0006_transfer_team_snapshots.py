@@ -0,0 +1,54 @@
+"""keep transfer history when a team is deleted
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:12:31
+
+`player_transfers.from_team_id` / `to_team_id` were foreign keys with
+ON DELETE SET NULL, so deleting a team turned its players' history into
+"no team -> no team". The keys are dropped so the ids survive the team, and
+the team names are stored next to them so the history stays readable.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 0005 left the keys unnamed; SQLite gets these names while batch mode
+# copies the table, Postgres named them <table>_<column>_fkey
+_NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('player_transfers', naming_convention=_NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('player_transfers_from_team_id_fkey', type_='foreignkey')
+        batch_op.drop_constraint('player_transfers_to_team_id_fkey', type_='foreignkey')
+        batch_op.add_column(sa.Column('from_team_name', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('to_team_name', sa.String(length=100), nullable=True))
+
+    op.execute(
+        "UPDATE player_transfers SET "
+        "from_team_name = (SELECT teams.name FROM teams WHERE teams.id = player_transfers.from_team_id), "
+        "to_team_name = (SELECT teams.name FROM teams WHERE teams.id = player_transfers.to_team_id)"
+    )
+
+
+def downgrade() -> None:
+    # Ids of deleted teams can't point at a team again
+    op.execute("UPDATE player_transfers SET from_team_id = NULL WHERE from_team_id NOT IN (SELECT id FROM teams)")
+    op.execute("UPDATE player_transfers SET to_team_id = NULL WHERE to_team_id NOT IN (SELECT id FROM teams)")
+    with op.batch_alter_table('player_transfers', naming_convention=_NAMING_CONVENTION) as batch_op:
+        batch_op.drop_column('to_team_name')
+        batch_op.drop_column('from_team_name')
+        batch_op.create_foreign_key(
+            'player_transfers_from_team_id_fkey', 'teams', ['from_team_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.create_foreign_key(
+            'player_transfers_to_team_id_fkey', 'teams', ['to_team_id'], ['id'], ondelete='SET NULL'
+        )
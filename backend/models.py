@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum as SQLEnum, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum as SQLEnum, Float, Text, JSON, Index, text, and_
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -59,7 +59,7 @@ class Match(Base):
     team2_score = Column(Integer, default=0)
     map_name = Column(String(50), nullable=True)
     scheduled_date = Column(DateTime(timezone=True), nullable=True)
-    played_date = Column(DateTime(timezone=True), nullable=True)
+    played_date = Column(DateTime(timezone=True), nullable=True, index=True)
     is_completed = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -71,7 +71,7 @@ class PlayerMatchStats(Base):
     __tablename__ = "player_match_stats"
     
     id = Column(Integer, primary_key=True, index=True)
-    match_id = Column(Integer, ForeignKey("matches.id"), nullable=False)
+    match_id = Column(Integer, ForeignKey("matches.id"), nullable=False, index=True)
     player_id = Column(Integer, ForeignKey("players.id"), nullable=False)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
     half = Column(Integer, nullable=False)  # 1 or 2
@@ -79,6 +79,101 @@ class PlayerMatchStats(Base):
     deaths = Column(Integer, default=0)
     flags = Column(Integer, default=0)
     is_ringer = Column(Boolean, default=False)
+    # Copy of the match's played_date: the Postgres partition key (see migration 0004)
+    played_date = Column(DateTime(timezone=True), nullable=True)
     
     match = relationship("Match", back_populates="player_stats")
     player = relationship("Player", back_populates="match_stats")
+    
+    __table_args__ = (
+        Index("ix_player_match_stats_player_date", "player_id", "played_date"),
+    )
+    
+    @staticmethod
+    def for_match(match):
+        """Filter for one match's stats; the played_date term lets Postgres skip other partitions"""
+        if match.played_date is None:
+            return and_(PlayerMatchStats.match_id == match.id, PlayerMatchStats.played_date.is_(None))
+        return and_(PlayerMatchStats.match_id == match.id, PlayerMatchStats.played_date == match.played_date)
+
+class Season(Base):
+    __tablename__ = "seasons"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    start_date = Column(DateTime(timezone=True), nullable=False)
+    end_date = Column(DateTime(timezone=True), nullable=False)  # exclusive
+    archived_at = Column(DateTime(timezone=True), nullable=True)  # stats moved to their own partition
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PlayerSeasonStats(Base):
+    """Per-season player totals, same rules as Player.total_* (no SCRIMs, no ringer stats)"""
+    __tablename__ = "player_season_stats"
+    
+    season_id = Column(Integer, ForeignKey("seasons.id", ondelete="CASCADE"), primary_key=True)
+    player_id = Column(Integer, ForeignKey("players.id", ondelete="CASCADE"), primary_key=True)
+    kills = Column(Integer, nullable=False, default=0)
+    deaths = Column(Integer, nullable=False, default=0)
+    flags = Column(Integer, nullable=False, default=0)
+    matches_played = Column(Integer, nullable=False, default=0)
+
+class TeamSeasonStats(Base):
+    """Per-season team record over completed matches, same rules as /api/stats/team/{id}"""
+    __tablename__ = "team_season_stats"
+    
+    season_id = Column(Integer, ForeignKey("seasons.id", ondelete="CASCADE"), primary_key=True)
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+    matches_played = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    score_for = Column(Integer, nullable=False, default=0)
+    score_against = Column(Integer, nullable=False, default=0)
+
+class PlayerTransfer(Base):
+    """One roster change: a player moving from one team (or none) to another (or none)"""
+    __tablename__ = "player_transfers"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    player_id = Column(Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False)
+    # Not foreign keys: the history keeps the ids (and names) of deleted teams
+    from_team_id = Column(Integer, nullable=True)
+    to_team_id = Column(Integer, nullable=True)
+    from_team_name = Column(String(100), nullable=True)
+    to_team_name = Column(String(100), nullable=True)
+    moved_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    moved_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    note = Column(String(255), nullable=True)
+    
+    __table_args__ = (
+        # A player's history in order, and "which team was the player on at time T"
+        Index("ix_player_transfers_player_moved_at", "player_id", "moved_at"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed, cancelled
+    params = Column(JSON, nullable=True)
+    progress = Column(Float, default=0.0)
+    message = Column(String(255), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    worker = Column(String(100), nullable=True)  # host:pid that runs the job
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        # At most one active job per kind, enforced by the database so it
+        # holds across uvicorn workers and instances
+        Index(
+            "uq_jobs_active_kind", "kind", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
@@ -0,0 +1,42 @@
+"""
+Sparse fieldsets for list endpoints.
+
+`?fields=id,nickname,team_id` switches a list endpoint to a Core `select` of
+just those columns. Rows are serialized straight from the result tuples:
+no ORM identity map, no per-row Pydantic validation.
+"""
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from serializers import FastJSONResponse
+
+
+def parse_fields(fields: Optional[str], model) -> Optional[List]:
+    """Resolve a comma-separated `fields` value to table columns of `model`."""
+    if not fields:
+        return None
+
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    table_columns = model.__table__.columns
+    unknown = [name for name in names if name not in table_columns]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(unknown) or fields}"
+        )
+    return [table_columns[name] for name in names]
+
+
+def projected_response(db: Session, columns: List, *criteria, order_by=None) -> FastJSONResponse:
+    """Run a column-only select and return the rows as a JSON list of objects."""
+    query = select(*columns).where(*criteria)
+    if order_by is not None:
+        query = query.order_by(order_by)
+    rows = db.execute(query).all()
+
+    # orjson handles datetimes and enums natively, so rows need no conversion
+    names = [column.name for column in columns]
+    return FastJSONResponse([dict(zip(names, row)) for row in rows])
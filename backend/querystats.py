@@ -0,0 +1,149 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+`instrument_engine` times every statement and attributes it to the request
+being handled. `QueryStatsMiddleware` reports the totals in `X-DB-Queries`
+and `Server-Timing` headers and logs a warning when the same statement shape
+runs `repeat_threshold` times or more in one request, which is what an N+1
+loop looks like.
+
+`assert_max_queries` is meant for tests:
+
+    with assert_max_queries(5):
+        client.get("/api/stats/leaderboard")
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so expanded IN lists of any length compare equal."""
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements executed while handling one request (or one test block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int):
+        """(shape, count) pairs executed at least `threshold` times, worst first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("ktp_query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def instrument_engine(engine):
+    """Attribute every statement run on `engine` to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["ktp_query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - conn.info["ktp_query_start"])
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app, repeat_threshold: int = 5, headers: bool = True):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.headers:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.count)
+                headers.append(
+                    "Server-Timing", f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+                )
+                repeated = stats.repeated(self.repeat_threshold)
+                if repeated:
+                    headers["X-DB-Repeated-Queries"] = str(repeated[0][1])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            for shape, count in stats.repeated(self.repeat_threshold):
+                logger.warning(
+                    "Possible N+1 in %s %s: %d x %s", scope["method"], scope["path"], count, shape[:200]
+                )
+
+
+@contextmanager
+def count_queries(*engines):
+    """Record every statement run on `engines` inside the block.
+
+    Defaults to the primary and the read replica, so reads routed through
+    `get_read_db` are counted too. Listens on the engines directly rather
+    than the request context, so it also sees statements executed on
+    TestClient's worker thread.
+    """
+    if not engines:
+        from database import engine, read_engine
+        engines = (engine,) if read_engine is engine else (engine, read_engine)
+
+    stats = QueryStats()
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        stats.record(statement, 0.0)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield stats
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", _record)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, *engines):
+    """Fail if more than `max_queries` statements run on `engines` (as `count_queries`) inside the block."""
+    with count_queries(*engines) as stats:
+        yield stats
+
+    if stats.count > max_queries:
+        worst = "\n".join(f"  {n} x {shape[:200]}" for shape, n in stats.shapes.most_common(5))
+        raise AssertionError(
+            f"Expected at most {max_queries} queries, {stats.count} were executed:\n{worst}"
+        )
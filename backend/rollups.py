@@ -0,0 +1,195 @@
+"""
+Per-season player and team rollups.
+
+A completed match belongs to the season whose `[start_date, end_date)`
+contains its `played_date`. `apply_match(db, match, sign)` adds (+1) or
+removes (-1) a match's contribution to its season's `PlayerSeasonStats` and
+`TeamSeasonStats` with upserts, so write paths keep the rollups current by
+removing a match's old contribution before changing it and adding the new
+one afterwards. `rebuild_season` recomputes a season from scratch with set-based
+INSERT ... SELECT statements (used when a season is created or its dates
+change).
+
+Player rollups follow the same rules as `Player.total_*` (SCRIM matches and
+ringer stats don't count); team rollups follow `/api/stats/team/{id}` (every
+completed match, anything but a win is a loss).
+"""
+from datetime import date, datetime, time, timezone
+from typing import Optional, Tuple, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, case, delete, func, insert, literal, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Match, MatchType, PlayerMatchStats, PlayerSeasonStats, Season, TeamSeasonStats
+
+# `from`/`to` query parameters accept a date (midnight UTC) or a datetime
+PeriodBound = Union[datetime, date]
+
+PLAYER_COUNTERS = ("kills", "deaths", "flags", "matches_played")
+TEAM_COUNTERS = ("matches_played", "wins", "losses", "score_for", "score_against")
+
+
+def season_for(db: Session, played_date: Optional[datetime]) -> Optional[Season]:
+    if played_date is None:
+        return None
+    return db.query(Season).filter(
+        Season.start_date <= played_date, Season.end_date > played_date
+    ).first()
+
+
+def _add_counters(db: Session, model, keys: Tuple[str, ...], counters: Tuple[str, ...], rows):
+    """Upsert `rows`, adding their counters to any existing row with the same keys."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in counters},
+        )
+        db.execute(stmt)
+        return
+
+    for row in rows:
+        updated = db.execute(
+            update(model).where(*[getattr(model, k) == row[k] for k in keys]).values(
+                {c: getattr(model, c) + row[c] for c in counters}
+            )
+        ).rowcount
+        if not updated:
+            db.execute(insert(model).values(row))
+
+
+def apply_match(db: Session, match: Match, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a match's contribution to its season's rollups."""
+    if not match.is_completed:
+        return
+    season = season_for(db, match.played_date)
+    if season is None:
+        return
+
+    db.flush()
+    player_rows = []
+    if match.match_type != MatchType.SCRIM:
+        totals = db.query(
+            PlayerMatchStats.player_id,
+            func.coalesce(func.sum(PlayerMatchStats.kills), 0),
+            func.coalesce(func.sum(PlayerMatchStats.deaths), 0),
+            func.coalesce(func.sum(PlayerMatchStats.flags), 0),
+        ).filter(
+            PlayerMatchStats.for_match(match), PlayerMatchStats.is_ringer == False
+        ).group_by(PlayerMatchStats.player_id)
+        player_rows = [
+            {"season_id": season.id, "player_id": player_id, "kills": sign * kills,
+             "deaths": sign * deaths, "flags": sign * flags, "matches_played": sign}
+            for player_id, kills, deaths, flags in totals
+        ]
+    _add_counters(db, PlayerSeasonStats, ("season_id", "player_id"), PLAYER_COUNTERS, player_rows)
+
+    team_rows = []
+    for team_id, score_for, score_against in (
+        (match.team1_id, match.team1_score or 0, match.team2_score or 0),
+        (match.team2_id, match.team2_score or 0, match.team1_score or 0),
+    ):
+        won = score_for > score_against
+        team_rows.append({
+            "season_id": season.id, "team_id": team_id, "matches_played": sign,
+            "wins": sign if won else 0, "losses": 0 if won else sign,
+            "score_for": sign * score_for, "score_against": sign * score_against,
+        })
+    _add_counters(db, TeamSeasonStats, ("season_id", "team_id"), TEAM_COUNTERS, team_rows)
+
+
+def rebuild_season(db: Session, season: Season):
+    """Recompute a season's rollups from matches and player stats (caller commits)."""
+    db.flush()
+    db.execute(delete(PlayerSeasonStats).where(PlayerSeasonStats.season_id == season.id))
+    db.execute(delete(TeamSeasonStats).where(TeamSeasonStats.season_id == season.id))
+
+    in_season = and_(
+        Match.is_completed == True,
+        Match.played_date >= season.start_date,
+        Match.played_date < season.end_date,
+    )
+
+    player_totals = select(
+        literal(season.id),
+        PlayerMatchStats.player_id,
+        func.sum(PlayerMatchStats.kills),
+        func.sum(PlayerMatchStats.deaths),
+        func.sum(PlayerMatchStats.flags),
+        func.count(func.distinct(PlayerMatchStats.match_id)),
+    ).join(Match, Match.id == PlayerMatchStats.match_id).where(
+        in_season, Match.match_type != MatchType.SCRIM, PlayerMatchStats.is_ringer == False,
+        *played_between(season.start_date, season.end_date, PlayerMatchStats.played_date),
+    ).group_by(PlayerMatchStats.player_id)
+    db.execute(insert(PlayerSeasonStats).from_select(
+        ["season_id", "player_id", *PLAYER_COUNTERS], player_totals
+    ))
+
+    sides = union_all(
+        select(Match.team1_id.label("team_id"), Match.team1_score.label("score_for"),
+               Match.team2_score.label("score_against")).where(in_season),
+        select(Match.team2_id, Match.team2_score, Match.team1_score).where(in_season),
+    ).subquery()
+    team_totals = select(
+        literal(season.id),
+        sides.c.team_id,
+        func.count(),
+        func.sum(case((sides.c.score_for > sides.c.score_against, 1), else_=0)),
+        func.sum(case((sides.c.score_for > sides.c.score_against, 0), else_=1)),
+        func.coalesce(func.sum(sides.c.score_for), 0),
+        func.coalesce(func.sum(sides.c.score_against), 0),
+    ).group_by(sides.c.team_id)
+    db.execute(insert(TeamSeasonStats).from_select(
+        ["season_id", "team_id", *TEAM_COUNTERS], team_totals
+    ))
+
+
+def as_utc(value: Optional[PeriodBound]) -> Optional[datetime]:
+    """Aware UTC datetime; naive values (query params, SQLite columns) are taken as UTC."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def period_bounds(
+    db: Session,
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = None,
+    to_date: Optional[PeriodBound] = None,
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    `[start, end)` for a stats query: the season's range, narrowed by
+    `from`/`to` when given. (None, None) means all time.
+    """
+    start, end = as_utc(from_date), as_utc(to_date)
+    if season_id is not None:
+        season = db.query(Season).filter(Season.id == season_id).first()
+        if not season:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Season not found"
+            )
+        season_start, season_end = as_utc(season.start_date), as_utc(season.end_date)
+        start = max(start, season_start) if start else season_start
+        end = min(end, season_end) if end else season_end
+    return start, end
+
+
+def played_between(start: Optional[datetime], end: Optional[datetime], column=Match.played_date) -> list:
+    """Filters on `column` (default `Match.played_date`) for `[start, end)`; empty for all time."""
+    criteria = []
+    if start is not None:
+        criteria.append(column >= start)
+    if end is not None:
+        criteria.append(column < end)
+    return criteria
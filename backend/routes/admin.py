@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from database import get_db
+from models import Job, User
+from schemas import JobResponse
+from auth import get_current_admin_user
+from jobs import JOB_KINDS, JobConflict, runner
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+def _get_job(db: Session, job_id: int) -> Job:
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(
+    kind: Optional[str] = None,
+    job_status: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Most recent jobs first, optionally filtered by kind and status"""
+    query = db.query(Job)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    if job_status:
+        query = query.filter(Job.status == job_status)
+    return query.order_by(Job.id.desc()).limit(limit).all()
+
+@router.post("/jobs/{kind}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    kind: str,
+    params: dict = Body(default={}),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Queue a background job. Only one job of each kind can be queued or
+    running at a time; a second submission gets 409 with the active job's id.
+    Params the job doesn't take, or of the wrong type, get 422.
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown job kind. Available: {', '.join(sorted(JOB_KINDS))}"
+        )
+    
+    try:
+        return runner.submit(db, kind, params, user_id=current_user.id)
+    except ValidationError as e:
+        # Located like FastAPI's own request validation errors
+        errors = e.errors(include_url=False, include_context=False)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[{**error, "loc": ["body", *error["loc"]]} for error in errors]
+        )
+    except JobConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": f"A {kind} job is already active", "job_id": e.job.id if e.job else None}
+        )
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    return _get_job(db, job_id)
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    job = _get_job(db, job_id)
+    if job.status not in ("queued", "running"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job.status}"
+        )
+    
+    return runner.cancel(db, job)
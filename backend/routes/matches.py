@@ -1,62 +1,57 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from typing import List
+from sqlalchemy import delete, func, insert, or_, update
+from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Match, Team, Player, PlayerMatchStats, User, MatchType
 from schemas import (
     MatchCreate, MatchUpdate, MatchResponse, MatchDetailResponse,
-    MatchLoadRequest, PlayerMatchStatsCreate, PlayerMatchStatsResponse
+    MatchLoadRequest, MatchStatsReplace, PlayerMatchStatsCreate, PlayerMatchStatsResponse
 )
 from auth import get_current_user
+from projection import parse_fields, projected_response
+from serializers import (
+    FastJSONResponse, match_response, match_responses, team_lookup, player_stat_response
+)
+from singleflight import coalesce
+from rollups import apply_match
+from invalidation import bus
+from statstore import store as stats_store
+from counters import add_match_totals, add_player_totals, counts_towards_totals, merge_deltas, stat_deltas
 
 router = APIRouter(prefix="/api/matches", tags=["Matches"])
 
 def get_match_response(match: Match, db: Session) -> MatchResponse:
-    team1 = db.query(Team).filter(Team.id == match.team1_id).first()
-    team2 = db.query(Team).filter(Team.id == match.team2_id).first()
-    
-    return MatchResponse(
-        id=match.id,
-        match_type=match.match_type.value,
-        team1_id=match.team1_id,
-        team2_id=match.team2_id,
-        team1_score=match.team1_score,
-        team2_score=match.team2_score,
-        map_name=match.map_name,
-        scheduled_date=match.scheduled_date,
-        played_date=match.played_date,
-        is_completed=match.is_completed,
-        created_at=match.created_at,
-        team1_name=team1.name if team1 else None,
-        team2_name=team2.name if team2 else None,
-        team1_tag=team1.tag if team1 else None,
-        team2_tag=team2.tag if team2 else None
-    )
+    return match_response(match, team_lookup(db, [match.team1_id, match.team2_id]))
 
 @router.get("", response_model=List[MatchResponse])
 async def get_matches(
     match_type: str = None,
     is_completed: bool = None,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Match)
+    filters = []
     
     if match_type:
-        query = query.filter(Match.match_type == MatchType(match_type))
+        filters.append(Match.match_type == MatchType(match_type))
     
     if is_completed is not None:
-        query = query.filter(Match.is_completed == is_completed)
+        filters.append(Match.is_completed == is_completed)
     
-    matches = query.order_by(Match.created_at.desc()).all()
-    return [get_match_response(m, db) for m in matches]
+    columns = parse_fields(fields, Match)
+    if columns:
+        return projected_response(db, columns, *filters, order_by=Match.created_at.desc())
+    
+    matches = db.query(Match).filter(*filters).order_by(Match.created_at.desc()).all()
+    return FastJSONResponse(match_responses(db, matches))
 
 @router.get("/upcoming", response_model=List[MatchResponse])
 async def get_upcoming_matches(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     matches = db.query(Match).filter(
@@ -65,24 +60,25 @@ async def get_upcoming_matches(
         Match.scheduled_date >= datetime.utcnow()
     ).order_by(Match.scheduled_date.asc()).limit(10).all()
     
-    return [get_match_response(m, db) for m in matches]
+    return FastJSONResponse(match_responses(db, matches))
 
 @router.get("/recent", response_model=List[MatchResponse])
-async def get_recent_matches(
+@coalesce()
+def get_recent_matches(
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     matches = db.query(Match).filter(
         Match.is_completed == True
     ).order_by(Match.played_date.desc()).limit(limit).all()
     
-    return [get_match_response(m, db) for m in matches]
+    return FastJSONResponse(match_responses(db, matches))
 
 @router.get("/{match_id}", response_model=MatchDetailResponse)
 async def get_match(
     match_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     match = db.query(Match).filter(Match.id == match_id).first()
@@ -92,48 +88,23 @@ async def get_match(
             detail="Match not found"
         )
     
-    team1 = db.query(Team).filter(Team.id == match.team1_id).first()
-    team2 = db.query(Team).filter(Team.id == match.team2_id).first()
+    teams = team_lookup(db, [match.team1_id, match.team2_id])
     
-    # Get player stats
-    stats = db.query(PlayerMatchStats).filter(
-        PlayerMatchStats.match_id == match_id
+    # Get player stats with their nicknames in one query
+    stats = db.query(PlayerMatchStats, Player.nickname).outerjoin(
+        Player, Player.id == PlayerMatchStats.player_id
+    ).filter(
+        PlayerMatchStats.for_match(match)
     ).all()
     
-    player_stats = []
-    for stat in stats:
-        player = db.query(Player).filter(Player.id == stat.player_id).first()
-        player_stats.append(PlayerMatchStatsResponse(
-            id=stat.id,
-            match_id=stat.match_id,
-            player_id=stat.player_id,
-            team_id=stat.team_id,
-            half=stat.half,
-            kills=stat.kills,
-            deaths=stat.deaths,
-            flags=stat.flags,
-            is_ringer=stat.is_ringer,
-            player_nickname=player.nickname if player else "Unknown"
-        ))
+    player_stats = [
+        player_stat_response(stat, nickname or "Unknown")
+        for stat, nickname in stats
+    ]
     
-    return MatchDetailResponse(
-        id=match.id,
-        match_type=match.match_type.value,
-        team1_id=match.team1_id,
-        team2_id=match.team2_id,
-        team1_score=match.team1_score,
-        team2_score=match.team2_score,
-        map_name=match.map_name,
-        scheduled_date=match.scheduled_date,
-        played_date=match.played_date,
-        is_completed=match.is_completed,
-        created_at=match.created_at,
-        team1_name=team1.name if team1 else None,
-        team2_name=team2.name if team2 else None,
-        team1_tag=team1.tag if team1 else None,
-        team2_tag=team2.tag if team2 else None,
-        player_stats=player_stats
-    )
+    return FastJSONResponse(match_response(
+        match, teams, cls=MatchDetailResponse, player_stats=player_stats
+    ))
 
 @router.post("", response_model=MatchResponse)
 async def create_match(
@@ -166,6 +137,8 @@ async def create_match(
         is_completed=False
     )
     db.add(new_match)
+    db.flush()
+    bus.publish(db, f"match:{new_match.id}")
     db.commit()
     db.refresh(new_match)
     
@@ -197,6 +170,16 @@ async def load_match(
             detail="A team cannot play against itself"
         )
     
+    # Validate players exist
+    player_ids = {stat.player_id for stat in match_data.player_stats}
+    found = {pid for (pid,) in db.query(Player.id).filter(Player.id.in_(player_ids))}
+    for stat_data in match_data.player_stats:
+        if stat_data.player_id not in found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Player with id {stat_data.player_id} not found"
+            )
+    
     # Create the match
     new_match = Match(
         match_type=MatchType(match_data.match_type),
@@ -212,23 +195,12 @@ async def load_match(
     db.commit()
     db.refresh(new_match)
     
-    is_scrim = match_data.match_type == "SCRIM"
-    
-    # Track unique players to update their match count only once
-    players_in_match = set()
-    
     # Add player stats
+    stats = []
     for stat_data in match_data.player_stats:
-        # Validate player exists
-        player = db.query(Player).filter(Player.id == stat_data.player_id).first()
-        if not player:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Player with id {stat_data.player_id} not found"
-            )
-        
         stat = PlayerMatchStats(
             match_id=new_match.id,
+            played_date=new_match.played_date,
             player_id=stat_data.player_id,
             team_id=stat_data.team_id,
             half=stat_data.half,
@@ -237,23 +209,18 @@ async def load_match(
             flags=stat_data.flags,
             is_ringer=stat_data.is_ringer
         )
-        db.add(stat)
-        
-        # Update player totals (only for non-SCRIM matches and non-ringers)
-        if not is_scrim and not stat_data.is_ringer:
-            player.total_kills += stat_data.kills
-            player.total_deaths += stat_data.deaths
-            player.total_flags += stat_data.flags
-            players_in_match.add(player.id)
-    
-    # Update match count for each player (only once per player)
-    if not is_scrim:
-        for player_id in players_in_match:
-            player = db.query(Player).filter(Player.id == player_id).first()
-            if player:
-                player.matches_played += 1
+        stats.append(stat)
+    db.add_all(stats)
+    
+    # Update player totals (only for non-SCRIM matches and non-ringers)
+    if counts_towards_totals(new_match):
+        add_player_totals(db, stat_deltas(stats))
     
+    apply_match(db, new_match)
+    store_rows = stats_store.match_rows(new_match, stats)
+    bus.publish(db, f"match:{new_match.id}")
     db.commit()
+    stats_store.add(store_rows)
     
     # Return full match details
     return await get_match(new_match.id, db, current_user)
@@ -272,6 +239,10 @@ async def update_match(
             detail="Match not found"
         )
     
+    # Take the match out of its season rollups and put it back after the changes
+    apply_match(db, match, -1)
+    counted = counts_towards_totals(match)
+    
     if match_data.match_type:
         match.match_type = MatchType(match_data.match_type)
     
@@ -302,9 +273,21 @@ async def update_match(
     if match_data.is_completed is not None:
         match.is_completed = match_data.is_completed
         if match_data.is_completed and not match.played_date:
+            # The stats keep a copy of played_date (their partition key)
+            undated_stats = PlayerMatchStats.for_match(match)
             match.played_date = datetime.utcnow()
+            db.query(PlayerMatchStats).filter(undated_stats).update(
+                {PlayerMatchStats.played_date: match.played_date}, synchronize_session=False
+            )
+    
+    # A type or completion change can put the match into player totals or take it out
+    if counted != counts_towards_totals(match):
+        add_match_totals(db, match, 1 if not counted else -1)
     
+    apply_match(db, match)
+    bus.publish(db, f"match:{match_id}")
     db.commit()
+    stats_store.refresh(match_id, db)
     db.refresh(match)
     
     return get_match_response(match, db)
@@ -322,36 +305,20 @@ async def delete_match(
             detail="Match not found"
         )
     
-    is_scrim = match.match_type == MatchType.SCRIM
+    apply_match(db, match, -1)
     
     # If match was completed, we need to subtract stats from players
-    if match.is_completed and not is_scrim:
-        stats = db.query(PlayerMatchStats).filter(
-            PlayerMatchStats.match_id == match_id
-        ).all()
-        
-        players_updated = set()
-        for stat in stats:
-            if not stat.is_ringer:
-                player = db.query(Player).filter(Player.id == stat.player_id).first()
-                if player:
-                    player.total_kills -= stat.kills
-                    player.total_deaths -= stat.deaths
-                    player.total_flags -= stat.flags
-                    players_updated.add(player.id)
-        
-        # Decrease match count
-        for player_id in players_updated:
-            player = db.query(Player).filter(Player.id == player_id).first()
-            if player and player.matches_played > 0:
-                player.matches_played -= 1
+    if counts_towards_totals(match):
+        add_match_totals(db, match, -1)
     
     # Delete match stats
-    db.query(PlayerMatchStats).filter(PlayerMatchStats.match_id == match_id).delete()
+    db.query(PlayerMatchStats).filter(PlayerMatchStats.for_match(match)).delete(synchronize_session=False)
     
     # Delete match
     db.delete(match)
+    bus.publish(db, f"match:{match_id}")
     db.commit()
+    stats_store.remove(match_id)
     
     return {"message": "Match deleted successfully"}
 
@@ -373,7 +340,7 @@ async def add_player_stat(
     
     # Check if stat already exists for this player/half combo
     existing = db.query(PlayerMatchStats).filter(
-        PlayerMatchStats.match_id == match_id,
+        PlayerMatchStats.for_match(match),
         PlayerMatchStats.player_id == stat_data.player_id,
         PlayerMatchStats.half == stat_data.half
     ).first()
@@ -386,6 +353,7 @@ async def add_player_stat(
     
     stat = PlayerMatchStats(
         match_id=match_id,
+        played_date=match.played_date,
         player_id=stat_data.player_id,
         team_id=stat_data.team_id,
         half=stat_data.half,
@@ -394,27 +362,103 @@ async def add_player_stat(
         flags=stat_data.flags,
         is_ringer=stat_data.is_ringer
     )
-    db.add(stat)
     
-    # Update player totals if not scrim and not ringer
-    is_scrim = match.match_type == MatchType.SCRIM
-    if not is_scrim and not stat_data.is_ringer:
-        player.total_kills += stat_data.kills
-        player.total_deaths += stat_data.deaths
-        player.total_flags += stat_data.flags
+    # Update player totals if the match counts and this isn't a ringer; the
+    # match counts once per player, so only a player's first counted stat adds to it
+    if counts_towards_totals(match) and not stat_data.is_ringer:
+        deltas = stat_deltas([stat])
+        already_counted = db.query(PlayerMatchStats.id).filter(
+            PlayerMatchStats.for_match(match),
+            PlayerMatchStats.player_id == stat_data.player_id,
+            PlayerMatchStats.is_ringer == False
+        ).first()
+        if already_counted:
+            deltas[stat_data.player_id][3] = 0
+        add_player_totals(db, deltas)
+    
+    apply_match(db, match, -1)
+    db.add(stat)
+    apply_match(db, match)
+    bus.publish(db, f"match:{match_id}")
     
     db.commit()
+    stats_store.refresh(match_id, db)
     db.refresh(stat)
     
-    return PlayerMatchStatsResponse(
-        id=stat.id,
-        match_id=stat.match_id,
-        player_id=stat.player_id,
-        team_id=stat.team_id,
-        half=stat.half,
-        kills=stat.kills,
-        deaths=stat.deaths,
-        flags=stat.flags,
-        is_ringer=stat.is_ringer,
-        player_nickname=player.nickname
-    )
+    return FastJSONResponse(player_stat_response(stat, player.nickname))
+
+@router.put("/{match_id}/stats", response_model=MatchDetailResponse)
+async def replace_match_stats(
+    match_id: int,
+    stats_data: MatchStatsReplace,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Replace a match's player stats with a corrected set.
+    Only rows that changed are written, and player totals move by the difference.
+    """
+    match = db.query(Match).filter(Match.id == match_id).first()
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+    
+    new_stats = {}
+    for stat_data in stats_data.player_stats:
+        key = (stat_data.player_id, stat_data.half)
+        if key in new_stats:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Duplicate stats for player {stat_data.player_id} in half {stat_data.half}"
+            )
+        new_stats[key] = stat_data
+    
+    player_ids = {player_id for player_id, _ in new_stats}
+    found = {pid for (pid,) in db.query(Player.id).filter(Player.id.in_(player_ids))}
+    missing = sorted(player_ids - found)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player with id {missing[0]} not found"
+        )
+    
+    current = {
+        (stat.player_id, stat.half): stat
+        for stat in db.query(PlayerMatchStats).filter(PlayerMatchStats.for_match(match))
+    }
+    fields = ("team_id", "kills", "deaths", "flags", "is_ringer")
+    inserts = [
+        {"match_id": match.id, "played_date": match.played_date, **stat_data.model_dump()}
+        for key, stat_data in new_stats.items() if key not in current
+    ]
+    updates = [
+        {"id": current[key].id, **stat_data.model_dump(include=set(fields))}
+        for key, stat_data in new_stats.items()
+        if key in current and any(getattr(current[key], f) != getattr(stat_data, f) for f in fields)
+    ]
+    deleted = [stat.id for key, stat in current.items() if key not in new_stats]
+    if not inserts and not updates and not deleted:
+        return await get_match(match_id, db, current_user)
+    
+    # Totals move by (new - old)
+    if counts_towards_totals(match):
+        add_player_totals(db, merge_deltas(
+            stat_deltas(current.values(), -1), stat_deltas(new_stats.values())
+        ))
+    
+    apply_match(db, match, -1)
+    if deleted:
+        db.execute(
+            delete(PlayerMatchStats).where(
+                PlayerMatchStats.for_match(match), PlayerMatchStats.id.in_(deleted)
+            ).execution_options(synchronize_session=False)
+        )
+    if updates:
+        db.execute(update(PlayerMatchStats), updates)
+    if inserts:
+        db.execute(insert(PlayerMatchStats), inserts)
+    apply_match(db, match)
+    bus.publish(db, f"match:{match_id}")
+    db.commit()
+    stats_store.refresh(match_id, db)
+    
+    return await get_match(match_id, db, current_user)
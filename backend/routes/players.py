@@ -1,27 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 
-from database import get_db
-from models import Player, Team, Match, PlayerMatchStats, User, MatchType
-from schemas import PlayerCreate, PlayerUpdate, PlayerResponse, PlayerDetailResponse, PlayerMatchStatsResponse
+from database import get_db, get_read_db
+from models import Player, Team, Match, PlayerMatchStats, PlayerTransfer, User, MatchType
+from schemas import (
+    PlayerCreate, PlayerUpdate, PlayerResponse, PlayerDetailResponse, PlayerMatchStatsResponse,
+    PlayerTransferResponse
+)
 from auth import get_current_user
+from invalidation import bus
+from projection import parse_fields, projected_response
+from transfers import record_transfers
 
 router = APIRouter(prefix="/api/players", tags=["Players"])
 
 @router.get("", response_model=List[PlayerResponse])
 async def get_players(
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
+    columns = parse_fields(fields, Player)
+    if columns:
+        return projected_response(db, columns)
+    
     players = db.query(Player).all()
     return players
 
 @router.get("/{player_id}", response_model=dict)
 async def get_player(
     player_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     player = db.query(Player).filter(Player.id == player_id).first()
@@ -93,6 +104,22 @@ async def get_player(
         "match_history": matches_data
     }
 
+@router.get("/{player_id}/transfers", response_model=List[PlayerTransferResponse])
+async def get_player_transfers(
+    player_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """A player's roster history, oldest first"""
+    if not db.query(Player.id).filter(Player.id == player_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Player not found"
+        )
+    return db.query(PlayerTransfer).filter(
+        PlayerTransfer.player_id == player_id
+    ).order_by(PlayerTransfer.moved_at, PlayerTransfer.id).all()
+
 @router.post("", response_model=PlayerResponse)
 async def create_player(
     player_data: PlayerCreate,
@@ -130,6 +157,9 @@ async def create_player(
         team_id=player_data.team_id
     )
     db.add(new_player)
+    db.flush()
+    record_transfers(db, [(new_player.id, None, new_player.team_id)], current_user.id)
+    bus.publish(db, f"player:{new_player.id}")
     db.commit()
     db.refresh(new_player)
     return new_player
@@ -160,6 +190,7 @@ async def update_player(
             )
         player.nickname = player_data.nickname
     
+    previous_team_id = player.team_id
     if player_data.team_id is not None:
         if player_data.team_id == 0:
             player.team_id = None
@@ -184,6 +215,8 @@ async def update_player(
             
             player.team_id = player_data.team_id
     
+    record_transfers(db, [(player.id, previous_team_id, player.team_id)], current_user.id)
+    bus.publish(db, f"player:{player_id}")
     db.commit()
     db.refresh(player)
     return player
@@ -213,5 +246,6 @@ async def delete_player(
         )
     
     db.delete(player)
+    bus.publish(db, f"player:{player_id}")
     db.commit()
     return {"message": "Player deleted successfully"}
@@ -0,0 +1,184 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+
+from database import get_db, get_read_db
+from models import Season, PlayerSeasonStats, TeamSeasonStats, Team, User
+from schemas import SeasonCreate, SeasonUpdate, SeasonResponse, TeamStanding
+from auth import get_current_user
+from rollups import as_utc, rebuild_season
+from invalidation import bus
+
+router = APIRouter(prefix="/api/seasons", tags=["Seasons"])
+
+def _get_season(db: Session, season_id: int) -> Season:
+    season = db.query(Season).filter(Season.id == season_id).first()
+    if not season:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Season not found"
+        )
+    return season
+
+def _validate_range(db: Session, start_date: datetime, end_date: datetime, season_id: Optional[int] = None):
+    """Seasons must not be empty and must not overlap, so every match has at most one season"""
+    if start_date >= end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Season must end after it starts"
+        )
+    
+    overlapping = db.query(Season).filter(
+        Season.start_date < end_date,
+        Season.end_date > start_date
+    )
+    if season_id is not None:
+        overlapping = overlapping.filter(Season.id != season_id)
+    other = overlapping.first()
+    if other:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Season overlaps with {other.name}"
+        )
+
+@router.get("", response_model=List[SeasonResponse])
+async def get_seasons(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    return db.query(Season).order_by(Season.start_date.desc()).all()
+
+@router.get("/current", response_model=SeasonResponse)
+async def get_current_season(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    now = datetime.utcnow()
+    season = db.query(Season).filter(
+        Season.start_date <= now,
+        Season.end_date > now
+    ).first()
+    if not season:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No season in progress"
+        )
+    return season
+
+@router.get("/{season_id}", response_model=SeasonResponse)
+async def get_season(
+    season_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    return _get_season(db, season_id)
+
+@router.get("/{season_id}/standings", response_model=List[TeamStanding])
+async def get_season_standings(
+    season_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Team standings for a season, from the season rollups (wins, then score difference)"""
+    _get_season(db, season_id)
+    rows = db.query(TeamSeasonStats, Team).join(
+        Team, Team.id == TeamSeasonStats.team_id
+    ).filter(
+        TeamSeasonStats.season_id == season_id,
+        TeamSeasonStats.matches_played > 0
+    ).all()
+    
+    standings = [
+        TeamStanding(
+            team_id=team.id,
+            team_name=team.name,
+            team_tag=team.tag,
+            matches_played=stats.matches_played,
+            wins=stats.wins,
+            losses=stats.losses,
+            win_rate=round(stats.wins / stats.matches_played * 100, 1),
+            score_for=stats.score_for,
+            score_against=stats.score_against,
+            score_difference=stats.score_for - stats.score_against
+        )
+        for stats, team in rows
+    ]
+    standings.sort(key=lambda s: (s.wins, s.score_difference), reverse=True)
+    return standings
+
+@router.post("", response_model=SeasonResponse)
+async def create_season(
+    season_data: SeasonCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create a season; matches already played in its range are rolled up immediately"""
+    if db.query(Season).filter(Season.name == season_data.name).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Season name already exists"
+        )
+    
+    start_date, end_date = as_utc(season_data.start_date), as_utc(season_data.end_date)
+    _validate_range(db, start_date, end_date)
+    
+    season = Season(name=season_data.name, start_date=start_date, end_date=end_date)
+    db.add(season)
+    db.flush()
+    rebuild_season(db, season)
+    bus.publish(db, f"season:{season.id}")
+    db.commit()
+    db.refresh(season)
+    return season
+
+@router.put("/{season_id}", response_model=SeasonResponse)
+async def update_season(
+    season_id: int,
+    season_data: SeasonUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    season = _get_season(db, season_id)
+    
+    if season_data.name and season_data.name != season.name:
+        if db.query(Season).filter(Season.name == season_data.name).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Season name already exists"
+            )
+        season.name = season_data.name
+    
+    if season_data.start_date or season_data.end_date:
+        if season.archived_at is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Archived seasons can't change dates; their stats live in a fixed partition"
+            )
+        start_date = as_utc(season_data.start_date or season.start_date)
+        end_date = as_utc(season_data.end_date or season.end_date)
+        _validate_range(db, start_date, end_date, season_id)
+        season.start_date = start_date
+        season.end_date = end_date
+        # Matches moved in or out of the season
+        rebuild_season(db, season)
+    
+    bus.publish(db, f"season:{season_id}")
+    db.commit()
+    db.refresh(season)
+    return season
+
+@router.delete("/{season_id}")
+async def delete_season(
+    season_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a season and its rollups; matches and player stats are kept"""
+    season = _get_season(db, season_id)
+    db.query(PlayerSeasonStats).filter(PlayerSeasonStats.season_id == season_id).delete()
+    db.query(TeamSeasonStats).filter(TeamSeasonStats.season_id == season_id).delete()
+    db.delete(season)
+    bus.publish(db, f"season:{season_id}")
+    db.commit()
+    return {"message": "Season deleted successfully"}
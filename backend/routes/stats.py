@@ -1,52 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
-from typing import List
+from typing import List, Optional
 
-from database import get_db
-from models import Player, Team, Match, PlayerMatchStats, User, MatchType
-from schemas import PlayerStatsLeaderboard, DashboardStats, MatchResponse
+from database import get_read_db
+from models import Player, Team, Match, PlayerMatchStats, PlayerSeasonStats, User, MatchType
+from schemas import (
+    PlayerStatsLeaderboard, DashboardStats, MatchResponse, PlayerDistributionResponse, PercentilesResponse,
+    PlayerComparisonResponse
+)
 from auth import get_current_user
+from serializers import FastJSONResponse, kd_ratio, leaderboard_entry, match_responses
+from singleflight import coalesce
+from rollups import PeriodBound, period_bounds, played_between
+import analytics
+from statstore import store as stats_store
 from datetime import datetime
 
 router = APIRouter(prefix="/api/stats", tags=["Stats"])
 
+COMPARE_MAX_PLAYERS = 20
+
+def _leaderboard_entries(
+    db: Session,
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = None,
+    to_date: Optional[PeriodBound] = None
+) -> List[PlayerStatsLeaderboard]:
+    """
+    Leaderboard rows for every player with at least one counted match in the
+    period: all-time totals, a season's rollups, or (with from/to) totals
+    aggregated from match stats.
+    """
+    if from_date is None and to_date is None:
+        if season_id is None:
+            rows = db.query(Player, Team.name).outerjoin(
+                Team, Team.id == Player.team_id
+            ).filter(Player.matches_played > 0).all()
+            return [leaderboard_entry(player, team_name) for player, team_name in rows]
+        
+        period_bounds(db, season_id)
+        rows = db.query(Player, Team.name, PlayerSeasonStats).join(
+            PlayerSeasonStats, PlayerSeasonStats.player_id == Player.id
+        ).outerjoin(
+            Team, Team.id == Player.team_id
+        ).filter(
+            PlayerSeasonStats.season_id == season_id,
+            PlayerSeasonStats.matches_played > 0
+        ).all()
+        return [leaderboard_entry(player, team_name, totals) for player, team_name, totals in rows]
+    
+    start, end = period_bounds(db, season_id, from_date, to_date)
+    store = stats_store.view()
+    if store is not None:
+        totals = {row.player_id: row for row in store.player_totals(start, end)}
+        rows = db.query(Player, Team.name).outerjoin(
+            Team, Team.id == Player.team_id
+        ).filter(Player.id.in_(totals)).all()
+        return [leaderboard_entry(player, team_name, totals[player.id]) for player, team_name in rows]
+    
+    totals = db.query(
+        PlayerMatchStats.player_id,
+        func.sum(PlayerMatchStats.kills).label("kills"),
+        func.sum(PlayerMatchStats.deaths).label("deaths"),
+        func.sum(PlayerMatchStats.flags).label("flags"),
+        func.count(func.distinct(PlayerMatchStats.match_id)).label("matches_played")
+    ).join(Match, Match.id == PlayerMatchStats.match_id).filter(
+        Match.is_completed == True,
+        Match.match_type != MatchType.SCRIM,
+        PlayerMatchStats.is_ringer == False,
+        *played_between(start, end),
+        # Same range on the stats' own copy of played_date, for partition pruning
+        *played_between(start, end, PlayerMatchStats.played_date)
+    ).group_by(PlayerMatchStats.player_id).subquery()
+    rows = db.query(Player, Team.name, totals).join(
+        totals, totals.c.player_id == Player.id
+    ).outerjoin(Team, Team.id == Player.team_id).all()
+    return [leaderboard_entry(row[0], row[1], row) for row in rows]
+
 @router.get("/leaderboard", response_model=List[PlayerStatsLeaderboard])
-async def get_leaderboard(
+@coalesce()
+def get_leaderboard(
     sort_by: str = "kd_ratio",
     limit: int = 50,
-    db: Session = Depends(get_db),
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = Query(None, alias="from"),
+    to_date: Optional[PeriodBound] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get player leaderboard sorted by various stats.
     sort_by options: kd_ratio, kills, deaths, flags, matches
+    season_id / from / to (to is exclusive) limit it to a period; a season
+    on its own is served from the season rollups.
     """
-    players = db.query(Player).filter(Player.matches_played > 0).all()
-    
-    leaderboard = []
-    for player in players:
-        team_name = None
-        if player.team_id:
-            team = db.query(Team).filter(Team.id == player.team_id).first()
-            team_name = team.name if team else None
-        
-        kd_ratio = 0.0
-        if player.total_deaths > 0:
-            kd_ratio = round(player.total_kills / player.total_deaths, 2)
-        elif player.total_kills > 0:
-            kd_ratio = float(player.total_kills)
-        
-        leaderboard.append(PlayerStatsLeaderboard(
-            id=player.id,
-            nickname=player.nickname,
-            team_name=team_name,
-            total_kills=player.total_kills,
-            total_deaths=player.total_deaths,
-            total_flags=player.total_flags,
-            matches_played=player.matches_played,
-            kd_ratio=kd_ratio
-        ))
+    leaderboard = _leaderboard_entries(db, season_id, from_date, to_date)
     
     # Sort based on requested field
     if sort_by == "kills":
@@ -60,130 +109,65 @@ async def get_leaderboard(
     else:  # Default to kd_ratio
         leaderboard.sort(key=lambda x: x.kd_ratio, reverse=True)
     
-    return leaderboard[:limit]
+    return FastJSONResponse(leaderboard[:limit])
 
 @router.get("/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+@coalesce()
+def get_dashboard_stats(
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = Query(None, alias="from"),
+    to_date: Optional[PeriodBound] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get dashboard statistics"""
+    """Get dashboard statistics, optionally for a season and/or from/to period"""
+    start, end = period_bounds(db, season_id, from_date, to_date)
+    in_period = played_between(start, end)
+    store = stats_store.view()
     
     # Total counts
-    total_matches = db.query(Match).filter(Match.is_completed == True).count()
+    if store is not None:
+        total_matches = store.match_count(start, end)
+    else:
+        total_matches = db.query(Match).filter(Match.is_completed == True, *in_period).count()
     total_teams = db.query(Team).count()
     total_players = db.query(Player).count()
     
     # Most played map
-    map_counts = db.query(
-        Match.map_name,
-        func.count(Match.id).label('count')
-    ).filter(
-        Match.is_completed == True,
-        Match.map_name != None
-    ).group_by(Match.map_name).order_by(desc('count')).first()
+    if store is not None:
+        map_counts = next(iter(store.map_counts(start, end)), None)
+    else:
+        map_counts = db.query(
+            Match.map_name,
+            func.count(Match.id).label('count')
+        ).filter(
+            Match.is_completed == True,
+            Match.map_name != None,
+            *in_period
+        ).group_by(Match.map_name).order_by(desc('count')).first()
     
     most_played_map = map_counts[0] if map_counts else None
     most_played_map_count = map_counts[1] if map_counts else 0
     
-    # Top K/D player
-    players_with_stats = db.query(Player).filter(Player.matches_played > 0).all()
-    
-    top_kd_player = None
-    top_flags_player = None
-    
-    if players_with_stats:
-        # Calculate K/D for all players
-        player_stats = []
-        for player in players_with_stats:
-            team_name = None
-            if player.team_id:
-                team = db.query(Team).filter(Team.id == player.team_id).first()
-                team_name = team.name if team else None
-            
-            kd_ratio = 0.0
-            if player.total_deaths > 0:
-                kd_ratio = round(player.total_kills / player.total_deaths, 2)
-            elif player.total_kills > 0:
-                kd_ratio = float(player.total_kills)
-            
-            player_stats.append(PlayerStatsLeaderboard(
-                id=player.id,
-                nickname=player.nickname,
-                team_name=team_name,
-                total_kills=player.total_kills,
-                total_deaths=player.total_deaths,
-                total_flags=player.total_flags,
-                matches_played=player.matches_played,
-                kd_ratio=kd_ratio
-            ))
-        
-        if player_stats:
-            # Top K/D
-            player_stats_sorted_kd = sorted(player_stats, key=lambda x: x.kd_ratio, reverse=True)
-            top_kd_player = player_stats_sorted_kd[0] if player_stats_sorted_kd else None
-            
-            # Top Flags
-            player_stats_sorted_flags = sorted(player_stats, key=lambda x: x.total_flags, reverse=True)
-            top_flags_player = player_stats_sorted_flags[0] if player_stats_sorted_flags else None
+    # Top K/D and top flags players
+    player_stats = _leaderboard_entries(db, season_id, from_date, to_date)
+    top_kd_player = max(player_stats, key=lambda x: x.kd_ratio, default=None)
+    top_flags_player = max(player_stats, key=lambda x: x.total_flags, default=None)
     
     # Recent matches
-    recent_matches_query = db.query(Match).filter(
-        Match.is_completed == True
-    ).order_by(Match.played_date.desc()).limit(5).all()
-    
-    recent_matches = []
-    for match in recent_matches_query:
-        team1 = db.query(Team).filter(Team.id == match.team1_id).first()
-        team2 = db.query(Team).filter(Team.id == match.team2_id).first()
-        recent_matches.append(MatchResponse(
-            id=match.id,
-            match_type=match.match_type.value,
-            team1_id=match.team1_id,
-            team2_id=match.team2_id,
-            team1_score=match.team1_score,
-            team2_score=match.team2_score,
-            map_name=match.map_name,
-            scheduled_date=match.scheduled_date,
-            played_date=match.played_date,
-            is_completed=match.is_completed,
-            created_at=match.created_at,
-            team1_name=team1.name if team1 else None,
-            team2_name=team2.name if team2 else None,
-            team1_tag=team1.tag if team1 else None,
-            team2_tag=team2.tag if team2 else None
-        ))
+    recent_matches = match_responses(db, db.query(Match).filter(
+        Match.is_completed == True,
+        *in_period
+    ).order_by(Match.played_date.desc()).limit(5).all())
     
     # Upcoming matches
-    upcoming_matches_query = db.query(Match).filter(
+    upcoming_matches = match_responses(db, db.query(Match).filter(
         Match.is_completed == False,
         Match.scheduled_date != None,
         Match.scheduled_date >= datetime.utcnow()
-    ).order_by(Match.scheduled_date.asc()).limit(5).all()
+    ).order_by(Match.scheduled_date.asc()).limit(5).all())
     
-    upcoming_matches = []
-    for match in upcoming_matches_query:
-        team1 = db.query(Team).filter(Team.id == match.team1_id).first()
-        team2 = db.query(Team).filter(Team.id == match.team2_id).first()
-        upcoming_matches.append(MatchResponse(
-            id=match.id,
-            match_type=match.match_type.value,
-            team1_id=match.team1_id,
-            team2_id=match.team2_id,
-            team1_score=match.team1_score,
-            team2_score=match.team2_score,
-            map_name=match.map_name,
-            scheduled_date=match.scheduled_date,
-            played_date=match.played_date,
-            is_completed=match.is_completed,
-            created_at=match.created_at,
-            team1_name=team1.name if team1 else None,
-            team2_name=team2.name if team2 else None,
-            team1_tag=team1.tag if team1 else None,
-            team2_tag=team2.tag if team2 else None
-        ))
-    
-    return DashboardStats(
+    return FastJSONResponse(DashboardStats.model_construct(
         total_matches=total_matches,
         total_teams=total_teams,
         total_players=total_players,
@@ -193,39 +177,40 @@ async def get_dashboard_stats(
         top_flags_player=top_flags_player,
         recent_matches=recent_matches,
         upcoming_matches=upcoming_matches
-    )
+    ))
 
 @router.get("/maps")
 async def get_map_stats(
-    db: Session = Depends(get_db),
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = Query(None, alias="from"),
+    to_date: Optional[PeriodBound] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get statistics for each map"""
-    map_stats = db.query(
-        Match.map_name,
-        func.count(Match.id).label('times_played')
-    ).filter(
-        Match.is_completed == True,
-        Match.map_name != None
-    ).group_by(Match.map_name).order_by(desc('times_played')).all()
+    start, end = period_bounds(db, season_id, from_date, to_date)
+    store = stats_store.view()
+    if store is not None:
+        map_stats = store.map_counts(start, end)
+    else:
+        map_stats = db.query(
+            Match.map_name,
+            func.count(Match.id).label('times_played')
+        ).filter(
+            Match.is_completed == True,
+            Match.map_name != None,
+            *played_between(start, end)
+        ).group_by(Match.map_name).order_by(desc('times_played')).all()
     
     return [{"map_name": m[0], "times_played": m[1]} for m in map_stats]
 
-@router.get("/team/{team_id}")
-async def get_team_stats(
-    team_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get detailed statistics for a team"""
-    team = db.query(Team).filter(Team.id == team_id).first()
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-    
+def _team_record(db: Session, team_id: int, start: Optional[datetime], end: Optional[datetime]) -> dict:
+    """A team's results in [start, end) from its completed matches"""
     # Get all completed matches for the team
     matches = db.query(Match).filter(
         Match.is_completed == True,
-        ((Match.team1_id == team_id) | (Match.team2_id == team_id))
+        ((Match.team1_id == team_id) | (Match.team2_id == team_id)),
+        *played_between(start, end)
     ).all()
     
     wins = 0
@@ -262,15 +247,219 @@ async def get_team_stats(
             map_record[map_name]["losses"] += 1
     
     return {
-        "team_id": team.id,
-        "team_name": team.name,
-        "team_tag": team.tag,
         "total_matches": len(matches),
         "wins": wins,
         "losses": losses,
-        "win_rate": round(wins / len(matches) * 100, 1) if matches else 0,
         "total_score_for": total_score_for,
         "total_score_against": total_score_against,
-        "score_difference": total_score_for - total_score_against,
         "map_record": map_record
     }
+
+@router.get("/team/{team_id}")
+async def get_team_stats(
+    team_id: int,
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = Query(None, alias="from"),
+    to_date: Optional[PeriodBound] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get detailed statistics for a team"""
+    team = db.query(Team).filter(Team.id == team_id).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    
+    start, end = period_bounds(db, season_id, from_date, to_date)
+    store = stats_store.view()
+    if store is not None:
+        record = store.team_record(team_id, start, end)
+    else:
+        record = _team_record(db, team_id, start, end)
+    
+    return {
+        "team_id": team.id,
+        "team_name": team.name,
+        "team_tag": team.tag,
+        "total_matches": record["total_matches"],
+        "wins": record["wins"],
+        "losses": record["losses"],
+        "win_rate": round(record["wins"] / record["total_matches"] * 100, 1) if record["total_matches"] else 0,
+        "total_score_for": record["total_score_for"],
+        "total_score_against": record["total_score_against"],
+        "score_difference": record["total_score_for"] - record["total_score_against"],
+        "map_record": record["map_record"]
+    }
+
+def _stat_split(totals: List[int]) -> dict:
+    kills, deaths, flags, matches = totals
+    return {
+        "matches": matches,
+        "kills": kills,
+        "deaths": deaths,
+        "flags": flags,
+        "kd_ratio": kd_ratio(kills, deaths)
+    }
+
+@router.get("/compare", response_model=PlayerComparisonResponse)
+def compare_players(
+    players: str = Query(..., description="Comma-separated player ids"),
+    last: int = Query(5, ge=1, le=50),
+    season_id: Optional[int] = None,
+    from_date: Optional[PeriodBound] = Query(None, alias="from"),
+    to_date: Optional[PeriodBound] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Side-by-side stats for up to 20 players: totals, K/D per map, a split per
+    match type and form over their last `last` matches. Totals, maps and form
+    count the same matches as player totals (no SCRIMs); ringer stats never
+    count. season_id / from / to limit it to a period.
+    """
+    try:
+        player_ids = list(dict.fromkeys(int(p) for p in players.split(",") if p.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="players must be a comma-separated list of player ids"
+        )
+    if not player_ids or len(player_ids) > COMPARE_MAX_PLAYERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Compare between 1 and {COMPARE_MAX_PLAYERS} players"
+        )
+    
+    names = {
+        pid: (nickname, team_name)
+        for pid, nickname, team_name in db.query(Player.id, Player.nickname, Team.name).outerjoin(
+            Team, Team.id == Player.team_id
+        ).filter(Player.id.in_(player_ids))
+    }
+    missing = [str(pid) for pid in player_ids if pid not in names]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Players not found: {', '.join(missing)}"
+        )
+    
+    # One row per player and match, newest first, for all the players at once
+    start, end = period_bounds(db, season_id, from_date, to_date)
+    rows = db.query(
+        PlayerMatchStats.player_id,
+        Match.match_type,
+        Match.map_name,
+        func.sum(PlayerMatchStats.kills),
+        func.sum(PlayerMatchStats.deaths),
+        func.sum(PlayerMatchStats.flags)
+    ).join(Match, Match.id == PlayerMatchStats.match_id).filter(
+        PlayerMatchStats.player_id.in_(player_ids),
+        PlayerMatchStats.is_ringer == False,
+        Match.is_completed == True,
+        *played_between(start, end),
+        *played_between(start, end, PlayerMatchStats.played_date)
+    ).group_by(
+        PlayerMatchStats.player_id, Match.id, Match.match_type, Match.map_name, Match.played_date
+    ).order_by(PlayerMatchStats.player_id, Match.played_date.desc(), Match.id.desc()).all()
+    
+    # [kills, deaths, flags, matches] accumulators
+    totals = {pid: [0, 0, 0, 0] for pid in player_ids}
+    form = {pid: [0, 0, 0, 0] for pid in player_ids}
+    maps = {pid: {} for pid in player_ids}
+    match_types = {pid: {} for pid in player_ids}
+    for player_id, match_type, map_name, kills, deaths, flags in rows:
+        row = (kills, deaths, flags, 1)
+        splits = [match_types[player_id].setdefault(match_type.value, [0, 0, 0, 0])]
+        if match_type != MatchType.SCRIM:
+            splits.append(totals[player_id])
+            splits.append(maps[player_id].setdefault(map_name or "Unknown", [0, 0, 0, 0]))
+            if form[player_id][3] < last:
+                splits.append(form[player_id])
+        for split in splits:
+            for i, value in enumerate(row):
+                split[i] += value
+    
+    return FastJSONResponse({
+        "last": last,
+        "players": [
+            {
+                "player_id": pid,
+                "nickname": names[pid][0],
+                "team_name": names[pid][1],
+                "totals": _stat_split(totals[pid]),
+                "form": _stat_split(form[pid]),
+                "maps": {name: _stat_split(split) for name, split in maps[pid].items()},
+                "match_types": {name: _stat_split(split) for name, split in match_types[pid].items()},
+            }
+            for pid in player_ids
+        ]
+    })
+
+@router.get("/players/{player_id}/distribution", response_model=PlayerDistributionResponse)
+def get_player_distribution(
+    player_id: int,
+    last: int = Query(10, ge=1, le=200),
+    bins: int = Query(10, ge=1, le=50),
+    min_matches: int = Query(5, ge=1),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Per-match kills/deaths/flags distributions (mean, stddev, quantiles,
+    histogram), form over the last `last` matches and league percentile
+    ranks among players with at least `min_matches` matches.
+    Counts the same matches as player totals (no SCRIMs, no ringer stats).
+    """
+    nickname = db.query(Player.nickname).filter(Player.id == player_id).scalar()
+    if nickname is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Player not found"
+        )
+    
+    snapshot = analytics.snapshot()
+    i = snapshot.index_of(player_id)
+    if i is None:
+        return FastJSONResponse(PlayerDistributionResponse.model_construct(
+            player_id=player_id, nickname=nickname, matches=0, kd_ratio=0.0,
+            distributions={}, form=None, league_percentiles={}
+        ))
+    
+    distributions = {}
+    for metric in analytics.METRICS:
+        quantiles = snapshot.quantiles[metric]
+        distributions[metric] = {
+            "mean": round(float(snapshot.means[metric][i]), 3),
+            "stddev": round(float(snapshot.stddevs[metric][i]), 3),
+            **{name: round(float(values[i]), 3) for name, values in quantiles.items()},
+            "histogram": snapshot.histogram(i, metric, bins),
+        }
+    form = snapshot.form(last)
+    return FastJSONResponse({
+        "player_id": player_id,
+        "nickname": nickname,
+        "matches": int(snapshot.counts[i]),
+        "kd_ratio": float(snapshot.kd[i]),
+        "distributions": distributions,
+        "form": {
+            "matches": int(form["matches"][i]),
+            **{f"{m}_per_match": round(float(form[m][i]), 3) for m in analytics.METRICS},
+            "kd_ratio": float(form["kd_ratio"][i]),
+        },
+        "league_percentiles": snapshot.percentile_ranks(i, min_matches),
+    })
+
+@router.get("/percentiles", response_model=PercentilesResponse)
+def get_percentiles(
+    min_matches: int = Query(5, ge=1),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    League quantiles (p10-p99) of per-player kills/deaths/flags per match and
+    K/D, over players with at least `min_matches` counted matches.
+    """
+    snapshot = analytics.snapshot()
+    return FastJSONResponse({
+        "min_matches": min_matches,
+        "players": int((snapshot.counts >= min_matches).sum()),
+        "quantiles": snapshot.league_quantiles(min_matches),
+    })
@@ -1,40 +1,69 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Team, Player, Match, User
-from schemas import TeamCreate, TeamUpdate, TeamResponse, TeamDetailResponse, PlayerResponse
+from schemas import (
+    TeamCreate, TeamUpdate, TeamResponse, TeamDetailResponse, TeamWithPlayersResponse, PlayerResponse,
+    RosterMovesRequest, PlayerTransferResponse
+)
 from auth import get_current_user
+from invalidation import bus
+from projection import parse_fields, projected_response
+from serializers import FastJSONResponse, player_response, team_response
+from transfers import MAX_PLAYERS_PER_TEAM, apply_moves, record_transfers
 
 router = APIRouter(prefix="/api/teams", tags=["Teams"])
 
-MAX_PLAYERS_PER_TEAM = 10
+TEAM_INCLUDES = {"players"}
 
-@router.get("", response_model=List[TeamResponse])
+@router.get("", response_model=List[TeamWithPlayersResponse])
 async def get_teams(
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    teams = db.query(Team).all()
-    result = []
-    for team in teams:
-        team_dict = TeamResponse(
-            id=team.id,
-            name=team.name,
-            tag=team.tag,
-            is_free_agents=team.is_free_agents,
-            created_at=team.created_at,
-            player_count=len(team.players)
+    """
+    List teams with their player counts.
+    `include=players` adds each roster, loaded for all teams with one extra query.
+    """
+    columns = parse_fields(fields, Team)
+    if columns:
+        return projected_response(db, columns)
+    
+    includes = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    unknown = includes - TEAM_INCLUDES
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}"
         )
-        result.append(team_dict)
-    return result
+    
+    if "players" in includes:
+        teams = db.query(Team).options(selectinload(Team.players)).order_by(Team.id).all()
+        return FastJSONResponse([
+            team_response(
+                team, len(team.players), TeamWithPlayersResponse,
+                players=[player_response(p) for p in team.players]
+            )
+            for team in teams
+        ])
+    
+    counts = db.query(
+        Player.team_id, func.count(Player.id).label("player_count")
+    ).group_by(Player.team_id).subquery()
+    rows = db.query(Team, func.coalesce(counts.c.player_count, 0)).outerjoin(
+        counts, counts.c.team_id == Team.id
+    ).order_by(Team.id).all()
+    return FastJSONResponse([team_response(team, player_count) for team, player_count in rows])
 
 @router.get("/{team_id}", response_model=TeamDetailResponse)
 async def get_team(
     team_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     team = db.query(Team).filter(Team.id == team_id).first()
@@ -116,6 +145,8 @@ async def create_team(
         is_free_agents=team_data.is_free_agents
     )
     db.add(new_team)
+    db.flush()
+    bus.publish(db, f"team:{new_team.id}")
     db.commit()
     db.refresh(new_team)
     
@@ -160,17 +191,12 @@ async def update_team(
             )
         team.tag = team_data.tag
     
+    bus.publish(db, f"team:{team_id}")
     db.commit()
     db.refresh(team)
     
-    return TeamResponse(
-        id=team.id,
-        name=team.name,
-        tag=team.tag,
-        is_free_agents=team.is_free_agents,
-        created_at=team.created_at,
-        player_count=len(team.players)
-    )
+    player_count = db.query(func.count(Player.id)).filter(Player.team_id == team_id).scalar()
+    return FastJSONResponse(team_response(team, player_count))
 
 @router.delete("/{team_id}")
 async def delete_team(
@@ -197,9 +223,12 @@ async def delete_team(
         )
     
     # Remove players from team
+    released = [pid for (pid,) in db.query(Player.id).filter(Player.team_id == team_id)]
     db.query(Player).filter(Player.team_id == team_id).update({"team_id": None})
+    record_transfers(db, [(pid, team_id, None) for pid in released], current_user.id, "Team deleted")
     
     db.delete(team)
+    bus.publish(db, f"team:{team_id}", *(f"player:{pid}" for pid in released))
     db.commit()
     return {"message": "Team deleted successfully"}
 
@@ -233,6 +262,9 @@ async def add_player_to_team(
                 detail=f"Team already has maximum {MAX_PLAYERS_PER_TEAM} players"
             )
     
+    record_transfers(db, [(player.id, player.team_id, team_id)], current_user.id)
+    previous_team = [f"team:{player.team_id}"] if player.team_id else []
+    bus.publish(db, f"team:{team_id}", *previous_team, f"player:{player_id}")
     player.team_id = team_id
     db.commit()
     return {"message": f"Player {player.nickname} added to team {team.name}"}
@@ -251,6 +283,38 @@ async def remove_player_from_team(
             detail="Player not found in this team"
         )
     
+    record_transfers(db, [(player.id, team_id, None)], current_user.id)
     player.team_id = None
+    bus.publish(db, f"team:{team_id}", f"player:{player_id}")
     db.commit()
     return {"message": f"Player {player.nickname} removed from team"}
+
+
+@router.post("/roster-moves", response_model=List[PlayerTransferResponse])
+async def apply_roster_moves(
+    moves_data: RosterMovesRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply a batch of roster moves (trades, draft picks, releases) atomically.
+    Capacity is checked on the rosters after every move, so swaps between
+    full teams are allowed. Returns the transfers that were recorded.
+    """
+    targets = {}
+    for move in moves_data.moves:
+        if move.player_id in targets:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Player {move.player_id} appears in more than one move"
+            )
+        targets[move.player_id] = move.to_team_id
+    
+    transfers = apply_moves(db, targets, current_user.id, moves_data.note)
+    response = [PlayerTransferResponse.model_validate(t) for t in transfers]
+    teams = {t.from_team_id for t in transfers} | {t.to_team_id for t in transfers}
+    bus.publish(
+        db, *(f"team:{tid}" for tid in sorted(teams - {None})), *(f"player:{t.player_id}" for t in transfers)
+    )
+    db.commit()
+    return response
@@ -0,0 +1,53 @@
+"""
+Schema version check for the boot path.
+
+Tables are created and upgraded by `python manage.py migrate`, not by the
+API process. At startup the API only reads `alembic_version` and refuses to
+serve against a schema other than `SCHEMA_REVISION`. Alembic itself is not
+imported here (it costs ~100 ms of import time on every cold start);
+`manage.py` checks that `SCHEMA_REVISION` matches the migration head.
+"""
+import os
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Bump together with each new migration in migrations/versions
+SCHEMA_REVISION = "0006"
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    return Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+
+
+def head_revisions() -> set:
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(engine) -> set:
+    try:
+        with engine.connect() as conn:
+            return set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except DBAPIError:
+        # No alembic_version table yet
+        return set()
+
+
+def check_schema(engine):
+    """Raise `SchemaVersionError` unless the database is at `SCHEMA_REVISION`."""
+    current = current_revisions(engine)
+    if current != {SCHEMA_REVISION}:
+        found = ", ".join(sorted(current)) or "no revision"
+        raise SchemaVersionError(
+            f"Database schema is at {found}, expected {SCHEMA_REVISION}; run `python manage.py migrate`"
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -55,6 +55,9 @@ class TeamResponse(TeamBase):
     class Config:
         from_attributes = True
 
+class TeamWithPlayersResponse(TeamResponse):
+    players: Optional[List["PlayerResponse"]] = None  # only with ?include=players
+
 class TeamDetailResponse(TeamResponse):
     players: List["PlayerResponse"] = []
     matches_played: int = 0
@@ -111,6 +114,10 @@ class PlayerMatchStatsCreate(BaseModel):
     flags: int = Field(ge=0)
     is_ringer: bool = False
 
+class MatchStatsReplace(BaseModel):
+    """The complete corrected stat set for a match"""
+    player_stats: List[PlayerMatchStatsCreate]
+
 class PlayerMatchStatsResponse(BaseModel):
     id: int
     match_id: int
@@ -186,5 +193,139 @@ class DashboardStats(BaseModel):
     recent_matches: List[MatchResponse]
     upcoming_matches: List[MatchResponse]
 
+# Analytics schemas
+class MetricDistribution(BaseModel):
+    """One stat's per-match distribution for a player"""
+    mean: float
+    stddev: float
+    min: float
+    p10: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+    p99: float
+    max: float
+    histogram: dict  # {"edges": [...], "counts": [...]}
+
+class PlayerForm(BaseModel):
+    matches: int
+    kills_per_match: float
+    deaths_per_match: float
+    flags_per_match: float
+    kd_ratio: float
+
+class PlayerDistributionResponse(BaseModel):
+    player_id: int
+    nickname: str
+    matches: int
+    kd_ratio: float
+    distributions: Dict[str, MetricDistribution] = {}
+    form: Optional[PlayerForm] = None
+    # Share (0-100) of players with at least min_matches whose average is at or below this player's
+    league_percentiles: Dict[str, Optional[float]] = {}
+
+class PercentilesResponse(BaseModel):
+    min_matches: int
+    players: int
+    quantiles: Dict[str, Dict[str, Optional[float]]]
+
+class StatSplit(BaseModel):
+    matches: int
+    kills: int
+    deaths: int
+    flags: int
+    kd_ratio: float
+
+class PlayerComparison(BaseModel):
+    player_id: int
+    nickname: str
+    team_name: Optional[str] = None
+    totals: StatSplit
+    form: StatSplit  # the last `last` counted matches
+    maps: Dict[str, StatSplit] = {}
+    match_types: Dict[str, StatSplit] = {}
+
+class PlayerComparisonResponse(BaseModel):
+    last: int
+    players: List[PlayerComparison]
+
+# Season schemas
+class SeasonCreate(BaseModel):
+    name: str
+    start_date: datetime
+    end_date: datetime
+
+class SeasonUpdate(BaseModel):
+    name: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class SeasonResponse(BaseModel):
+    id: int
+    name: str
+    start_date: datetime
+    end_date: datetime
+    archived_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class TeamStanding(BaseModel):
+    team_id: int
+    team_name: str
+    team_tag: str
+    matches_played: int
+    wins: int
+    losses: int
+    win_rate: float
+    score_for: int
+    score_against: int
+    score_difference: int
+
+# Roster move schemas
+class RosterMove(BaseModel):
+    player_id: int
+    to_team_id: Optional[int] = None  # None releases the player
+
+class RosterMovesRequest(BaseModel):
+    moves: List[RosterMove]
+    note: Optional[str] = Field(None, max_length=255)
+
+class PlayerTransferResponse(BaseModel):
+    id: int
+    player_id: int
+    from_team_id: Optional[int] = None
+    from_team_name: Optional[str] = None
+    to_team_id: Optional[int] = None
+    to_team_name: Optional[str] = None
+    moved_at: datetime
+    moved_by: Optional[int] = None
+    note: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+# Job schemas
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    params: Optional[dict] = None
+    progress: float
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 # Update forward references
+TeamWithPlayersResponse.model_rebuild()
 TeamDetailResponse.model_rebuild()
@@ -0,0 +1,143 @@
+"""
+Fast response construction for rows that come straight from the database.
+
+Database rows are already trusted, so responses are built with
+`model_construct` (no validation) and returned as `FastJSONResponse`, which
+FastAPI sends as-is instead of re-validating against `response_model`.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from models import Match, Player, Team, PlayerMatchStats
+from schemas import (
+    MatchResponse, MatchTypeEnum, PlayerResponse, PlayerStatsLeaderboard, PlayerMatchStatsResponse, TeamResponse
+)
+from tracing import start_span
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson response that also accepts Pydantic models (and lists of them)."""
+
+    def render(self, content) -> bytes:
+        with start_span("response.render"):
+            return orjson.dumps(content, default=_default)
+
+
+def team_lookup(db: Session, team_ids: Iterable[int]) -> Dict[int, Team]:
+    """Load the given teams with one query, keyed by id."""
+    team_ids = set(team_ids)
+    if not team_ids:
+        return {}
+    return {team.id: team for team in db.query(Team).filter(Team.id.in_(team_ids))}
+
+
+def match_response(match: Match, teams: Dict[int, Team], cls=MatchResponse, **extra):
+    """Build a `MatchResponse` (or subclass) from a `Match` row without validation."""
+    team1 = teams.get(match.team1_id)
+    team2 = teams.get(match.team2_id)
+    return cls.model_construct(
+        id=match.id,
+        match_type=MatchTypeEnum(match.match_type.value),
+        team1_id=match.team1_id,
+        team2_id=match.team2_id,
+        team1_score=match.team1_score,
+        team2_score=match.team2_score,
+        map_name=match.map_name,
+        scheduled_date=match.scheduled_date,
+        played_date=match.played_date,
+        is_completed=match.is_completed,
+        created_at=match.created_at,
+        team1_name=team1.name if team1 else None,
+        team2_name=team2.name if team2 else None,
+        team1_tag=team1.tag if team1 else None,
+        team2_tag=team2.tag if team2 else None,
+        **extra
+    )
+
+
+def match_responses(db: Session, matches: List[Match]) -> List[MatchResponse]:
+    """Build responses for a list of matches with a single team lookup."""
+    teams = team_lookup(db, [m.team1_id for m in matches] + [m.team2_id for m in matches])
+    return [match_response(m, teams) for m in matches]
+
+
+def kd_ratio(kills: int, deaths: int) -> float:
+    if deaths > 0:
+        return round(kills / deaths, 2)
+    if kills > 0:
+        return float(kills)
+    return 0.0
+
+
+def leaderboard_entry(player: Player, team_name: Optional[str], totals=None) -> PlayerStatsLeaderboard:
+    """
+    Leaderboard row from the player's all-time totals, or from `totals`
+    (anything with kills/deaths/flags/matches_played, e.g. a season rollup).
+    """
+    if totals is None:
+        kills, deaths, flags, matches = (
+            player.total_kills, player.total_deaths, player.total_flags, player.matches_played
+        )
+    else:
+        kills, deaths, flags, matches = totals.kills, totals.deaths, totals.flags, totals.matches_played
+    return PlayerStatsLeaderboard.model_construct(
+        id=player.id,
+        nickname=player.nickname,
+        team_name=team_name,
+        total_kills=kills,
+        total_deaths=deaths,
+        total_flags=flags,
+        matches_played=matches,
+        kd_ratio=kd_ratio(kills, deaths)
+    )
+
+
+def player_stat_response(stat: PlayerMatchStats, nickname: Optional[str]) -> PlayerMatchStatsResponse:
+    return PlayerMatchStatsResponse.model_construct(
+        id=stat.id,
+        match_id=stat.match_id,
+        player_id=stat.player_id,
+        team_id=stat.team_id,
+        half=stat.half,
+        kills=stat.kills,
+        deaths=stat.deaths,
+        flags=stat.flags,
+        is_ringer=stat.is_ringer,
+        player_nickname=nickname
+    )
+
+
+def player_response(player: Player) -> PlayerResponse:
+    return PlayerResponse.model_construct(
+        id=player.id,
+        nickname=player.nickname,
+        team_id=player.team_id,
+        total_kills=player.total_kills,
+        total_deaths=player.total_deaths,
+        total_flags=player.total_flags,
+        matches_played=player.matches_played,
+        created_at=player.created_at
+    )
+
+
+def team_response(team: Team, player_count: int, cls=TeamResponse, **extra):
+    """Build a `TeamResponse` (or subclass) from a `Team` row without validation."""
+    return cls.model_construct(
+        id=team.id,
+        name=team.name,
+        tag=team.tag,
+        is_free_agents=team.is_free_agents,
+        created_at=team.created_at,
+        player_count=player_count,
+        **extra
+    )
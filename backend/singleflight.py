@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing for expensive read endpoints.
+
+Concurrent identical requests share one computation: the first request runs
+the endpoint body in the threadpool and every identical request that arrives
+while it is running awaits the same result instead of querying the database
+again. Endpoints opt in with the `coalesce` decorator:
+
+    @router.get("/leaderboard")
+    @coalesce()
+    def get_leaderboard(sort_by: str = "kd_ratio", db: Session = Depends(get_read_db), ...):
+        ...
+
+Requests are identical when they hit the same endpoint with the same
+primitive parameters, the same role (`current_user.is_admin`) and the same
+database (primary or read replica). A request waits at most `max_wait`
+seconds for someone else's computation before running its own.
+"""
+import asyncio
+import copy
+import functools
+import inspect
+import logging
+import os
+from datetime import date, datetime
+from enum import Enum
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from metrics import COALESCED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WAIT = float(os.getenv("COALESCE_MAX_WAIT", "10"))
+ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+
+_PRIMITIVES = (str, int, float, bool, type(None), Enum, date, datetime)
+
+
+def _copy_result(result):
+    # Middlewares add headers to the message's raw header list in place, so
+    # every request needs its own header list
+    if isinstance(result, Response):
+        result = copy.copy(result)
+        result.raw_headers = list(result.raw_headers)
+    return result
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._inflight = {}
+
+    async def do(self, key, fn, max_wait: float):
+        """Run `fn` in the threadpool, or await the identical call already running."""
+        if not self.enabled:
+            return await run_in_threadpool(fn)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), max_wait)
+                COALESCED_REQUESTS.labels(key[0], "shared").inc()
+                return _copy_result(result)
+            except asyncio.TimeoutError:
+                COALESCED_REQUESTS.labels(key[0], "timeout").inc()
+                logger.warning("Gave up waiting %.1fs for in-flight %s; computing", max_wait, key[0])
+                return await run_in_threadpool(fn)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leading request was cancelled, not this one
+                return await run_in_threadpool(fn)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await run_in_threadpool(fn)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return _copy_result(result)
+        finally:
+            del self._inflight[key]
+
+
+_flights = SingleFlight(enabled=ENABLED)
+
+
+def set_enabled(enabled: bool):
+    _flights.enabled = enabled
+
+
+def request_key(name: str, arguments: dict) -> tuple:
+    parts = []
+    for param, value in sorted(arguments.items()):
+        if isinstance(value, _PRIMITIVES):
+            parts.append((param, value))
+        elif isinstance(value, Session):
+            # Primary vs replica sessions can see different data
+            parts.append((param, id(value.get_bind())))
+        elif hasattr(value, "is_admin"):
+            parts.append((param, "admin" if value.is_admin else "user"))
+    return (name, tuple(parts))
+
+
+def coalesce(max_wait: float = DEFAULT_MAX_WAIT):
+    """Opt a sync endpoint into single-flight coalescing (see module docstring)."""
+
+    def decorator(endpoint):
+        if inspect.iscoroutinefunction(endpoint):
+            raise TypeError("coalesce() needs a sync endpoint so the body can run in the threadpool")
+        name = f"{endpoint.__module__}.{endpoint.__qualname__}"
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            return await _flights.do(
+                request_key(name, kwargs), functools.partial(endpoint, **kwargs), max_wait
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,590 @@
+"""
+Optional in-process columnar copy of completed matches and counted stats.
+
+With `STATS_STORE_ENABLED=true` each API process keeps two struct-of-arrays
+tables in NumPy:
+
+- matches: every completed match (id, played date, teams, scores, map code,
+  whether it counts towards player totals),
+- player matches: one row per player and counted match (non-ringer stats of
+  completed, non-SCRIM matches, halves summed), with the match's played date.
+
+Period leaderboards, map stats and team records are then answered with a
+boolean mask on played date and `np.bincount` group-bys instead of SQL.
+
+The store is built in a background thread at startup and served once ready;
+until then (and whenever it isn't ready) the routes fall back to SQL.
+Match writes update it incrementally after they commit: `load_match` and
+`delete_match` from what they wrote, other match edits by reloading that
+one match (`refresh`), and other workers' match writes heard on the
+invalidation bus the same way. `invalidate()` takes the store out of
+service until a full rebuild finishes. Every match write, incremental or
+not and whether or not the store is enabled, bumps `store.version`, which
+is how the analytics snapshot (built from this store's player-match table
+when it is ready, from `load_columns` otherwise) knows it is stale.
+
+A background check compares a fingerprint of the store (row counts and sums
+of ids, scores and stats) with the same aggregates in the database every
+`STATS_STORE_CHECK_SECONDS` (the bus's fallback TTL while its listener is
+down) and rebuilds on a mismatch. A build larger than `STATS_STORE_MAX_MB`
+is dropped and the store stays off.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from counters import counts_towards_totals
+from database import SessionLocal
+from invalidation import bus
+from metrics import STATS_STORE_BYTES, STATS_STORE_REBUILDS, STATS_STORE_ROWS
+from models import Match, MatchType, PlayerMatchStats
+from rollups import as_utc
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("STATS_STORE_ENABLED", "false").lower() == "true"
+MAX_BYTES = int(float(os.getenv("STATS_STORE_MAX_MB", "512")) * 1024 * 1024)
+CHECK_SECONDS = float(os.getenv("STATS_STORE_CHECK_SECONDS", "30"))
+
+MATCH_COLUMNS = {
+    "id": np.int32,
+    "played_date": "datetime64[us]",
+    "team1_id": np.int32,
+    "team2_id": np.int32,
+    "team1_score": np.int32,
+    "team2_score": np.int32,
+    "map": np.int32,  # index into ColumnarStats.maps, -1 when unknown
+    "counted": np.bool_,
+}
+STAT_COLUMNS = {
+    "match_id": np.int32,
+    "player": np.int32,  # index into ColumnarStats.player_ids
+    "played_date": "datetime64[us]",
+    "kills": np.int32,
+    "deaths": np.int32,
+    "flags": np.int32,
+}
+
+
+class PlayerTotals(NamedTuple):
+    player_id: int
+    kills: int
+    deaths: int
+    flags: int
+    matches_played: int
+
+
+def _datetime64(value: Optional[datetime]):
+    value = as_utc(value)
+    return value.replace(tzinfo=None) if value is not None else None
+
+
+def _in_period(played: np.ndarray, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+    """Mask for `[start, end)`; rows without a date only match when there are no bounds."""
+    mask = np.ones(len(played), dtype=np.bool_)
+    if start is not None:
+        mask &= played >= np.datetime64(_datetime64(start), "us")
+    if end is not None:
+        mask &= played < np.datetime64(_datetime64(end), "us")
+    return mask
+
+
+class ColumnTable:
+    """
+    Named columns with spare capacity, so appends are amortized O(1). Appends
+    write past `size` and removals build new arrays, so views handed out
+    earlier are never changed underneath a reader.
+    """
+
+    def __init__(self, dtypes: Dict[str, object], columns: Optional[Dict[str, np.ndarray]] = None):
+        if columns is None:
+            columns = {name: np.empty(0, dtype=dtype) for name, dtype in dtypes.items()}
+        self.columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in dtypes.items()}
+        self.size = len(self.columns[next(iter(dtypes))])
+
+    def view(self) -> Dict[str, np.ndarray]:
+        return {name: column[:self.size] for name, column in self.columns.items()}
+
+    def append(self, rows: Dict[str, list]):
+        count = len(next(iter(rows.values())))
+        needed = self.size + count
+        for name, column in self.columns.items():
+            if needed > len(column):
+                grown = np.empty(max(needed, 2 * len(column), 1024), dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = column = grown
+            column[self.size:needed] = rows[name]
+        self.size = needed
+
+    def keep(self, mask: np.ndarray):
+        self.columns = {name: column[:self.size][mask] for name, column in self.columns.items()}
+        self.size = int(mask.sum())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+
+class ColumnarStats:
+    """The two tables plus the code books for player ids and map names."""
+
+    def __init__(self, matches: ColumnTable, stats: ColumnTable, player_ids: List[int], maps: List[str]):
+        self.matches = matches
+        self.stats = stats
+        self.maps = maps
+        self.map_codes = {name: i for i, name in enumerate(maps)}
+        self.player_codes = {pid: i for i, pid in enumerate(player_ids)}
+        self.player_ids = np.array(player_ids, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matches.nbytes + self.stats.nbytes + self.player_ids.nbytes
+
+    def map_code(self, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        if name not in self.map_codes:
+            self.map_codes[name] = len(self.maps)
+            self.maps = self.maps + [name]
+        return self.map_codes[name]
+
+    def player_code(self, player_id: int) -> int:
+        if player_id not in self.player_codes:
+            self.player_codes[player_id] = len(self.player_ids)
+            self.player_ids = np.append(self.player_ids, player_id)
+        return self.player_codes[player_id]
+
+    def view(self) -> "StoreView":
+        return StoreView(self.matches.view(), self.stats.view(), self.player_ids, self.maps)
+
+    def fingerprint(self) -> Tuple[int, ...]:
+        m, s = self.matches.view(), self.stats.view()
+        return (
+            len(m["id"]),
+            int(m["id"].sum(dtype=np.int64)),
+            int(m["team1_score"].sum(dtype=np.int64) + m["team2_score"].sum(dtype=np.int64)),
+            int((m["map"] >= 0).sum()),
+            int(m["counted"].sum()),
+            int(s["kills"].sum(dtype=np.int64)),
+            int(s["deaths"].sum(dtype=np.int64)),
+            int(s["flags"].sum(dtype=np.int64)),
+        )
+
+
+class MatchRows(NamedTuple):
+    """A loaded match as store rows, captured before the session commits (and expires it)."""
+    match: Dict[str, list]
+    map_name: Optional[str]
+    stats: Dict[int, List[int]]  # player_id -> [kills, deaths, flags]
+
+
+def load_columns(db: Session) -> ColumnarStats:
+    """Both tables from the database (also the analytics snapshot's loader when the store is off)."""
+    # Core rows on the session's connection skip the ORM's per-row result processing
+    conn = db.connection()
+    match_rows = conn.execute(select(
+        Match.id, Match.played_date, Match.team1_id, Match.team2_id,
+        func.coalesce(Match.team1_score, 0), func.coalesce(Match.team2_score, 0),
+        Match.map_name, Match.match_type,
+    ).where(Match.is_completed == True).order_by(Match.id)).all()
+    maps = sorted({row.map_name for row in match_rows if row.map_name is not None})
+    map_codes = {name: i for i, name in enumerate(maps)}
+    matches = ColumnTable(MATCH_COLUMNS, {
+        "id": [row[0] for row in match_rows],
+        "played_date": np.array([_datetime64(row[1]) for row in match_rows], dtype="datetime64[us]"),
+        "team1_id": [row[2] for row in match_rows],
+        "team2_id": [row[3] for row in match_rows],
+        "team1_score": [row[4] for row in match_rows],
+        "team2_score": [row[5] for row in match_rows],
+        "map": [map_codes.get(row[6], -1) for row in match_rows],
+        "counted": [row[7] != MatchType.SCRIM for row in match_rows],
+    })
+
+    stat_rows = conn.execute(select(
+        PlayerMatchStats.match_id,
+        PlayerMatchStats.player_id,
+        func.sum(PlayerMatchStats.kills),
+        func.sum(PlayerMatchStats.deaths),
+        func.sum(PlayerMatchStats.flags),
+    ).join(Match, Match.id == PlayerMatchStats.match_id).where(
+        PlayerMatchStats.is_ringer == False,
+        Match.is_completed == True,
+        Match.match_type != MatchType.SCRIM,
+    ).group_by(PlayerMatchStats.match_id, PlayerMatchStats.player_id)).all()
+    # fromiter over the flattened rows is far faster than np.array(rows)
+    flat = np.fromiter(
+        itertools.chain.from_iterable(stat_rows), dtype=np.int64, count=5 * len(stat_rows)
+    ).reshape(-1, 5)
+    player_ids, player_codes = np.unique(flat[:, 1], return_inverse=True)
+    match_ids = matches.view()["id"]
+    # Every counted stat's match is in the matches table, which is in id order
+    played = matches.view()["played_date"][np.searchsorted(match_ids, flat[:, 0])]
+    stats = ColumnTable(STAT_COLUMNS, {
+        "match_id": flat[:, 0],
+        "player": player_codes,
+        "played_date": played,
+        "kills": flat[:, 2],
+        "deaths": flat[:, 3],
+        "flags": flat[:, 4],
+    })
+    return ColumnarStats(matches, stats, player_ids.tolist(), maps)
+
+
+def database_fingerprint(db: Session) -> Tuple[int, ...]:
+    """The aggregates `ColumnarStats.fingerprint` computes, from the database."""
+    matches = db.execute(select(
+        func.count(Match.id),
+        func.coalesce(func.sum(Match.id), 0),
+        func.coalesce(func.sum(func.coalesce(Match.team1_score, 0) + func.coalesce(Match.team2_score, 0)), 0),
+        func.count(Match.map_name),
+        func.coalesce(func.sum(case((Match.match_type != MatchType.SCRIM, 1), else_=0)), 0),
+    ).where(Match.is_completed == True)).one()
+    stats = db.execute(select(
+        func.coalesce(func.sum(PlayerMatchStats.kills), 0),
+        func.coalesce(func.sum(PlayerMatchStats.deaths), 0),
+        func.coalesce(func.sum(PlayerMatchStats.flags), 0),
+    ).join(Match, Match.id == PlayerMatchStats.match_id).where(
+        PlayerMatchStats.is_ringer == False,
+        Match.is_completed == True,
+        Match.match_type != MatchType.SCRIM,
+    )).one()
+    return tuple(int(value) for value in (*matches, *stats))
+
+
+class StoreView:
+    """Vectorized queries over the arrays as they were when the view was taken."""
+
+    def __init__(self, matches: Dict[str, np.ndarray], stats: Dict[str, np.ndarray], player_ids: np.ndarray, maps: List[str]):
+        self.matches = matches
+        self.stats = stats
+        self.player_ids = player_ids
+        self.maps = maps
+
+    def player_totals(self, start: Optional[datetime], end: Optional[datetime]) -> List[PlayerTotals]:
+        """Leaderboard totals for every player with a counted match in `[start, end)`."""
+        stats = self.stats
+        mask = _in_period(stats["played_date"], start, end)
+        players = stats["player"][mask]
+        n = len(self.player_ids)
+        matches = np.bincount(players, minlength=n)
+        sums = [
+            np.bincount(players, weights=stats[metric][mask], minlength=n).astype(np.int64)
+            for metric in ("kills", "deaths", "flags")
+        ]
+        present = np.flatnonzero(matches)
+        return [
+            PlayerTotals(*row)
+            for row in zip(
+                self.player_ids[present].tolist(), sums[0][present].tolist(), sums[1][present].tolist(),
+                sums[2][present].tolist(), matches[present].tolist(),
+            )
+        ]
+
+    def match_count(self, start: Optional[datetime], end: Optional[datetime]) -> int:
+        return int(np.count_nonzero(_in_period(self.matches["played_date"], start, end)))
+
+    def map_counts(self, start: Optional[datetime], end: Optional[datetime]) -> List[Tuple[str, int]]:
+        """(map_name, completed matches) in `[start, end)`, most played first."""
+        codes = self.matches["map"][_in_period(self.matches["played_date"], start, end)]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.maps))
+        order = np.argsort(-counts, kind="stable")
+        return [(self.maps[i], int(counts[i])) for i in order if counts[i]]
+
+    def team_record(self, team_id: int, start: Optional[datetime], end: Optional[datetime]) -> dict:
+        """Results of a team's completed matches in `[start, end)`; anything but a win is a loss."""
+        matches = self.matches
+        home = matches["team1_id"] == team_id
+        mask = (home | (matches["team2_id"] == team_id)) & _in_period(matches["played_date"], start, end)
+        home = home[mask]
+        score_for = np.where(home, matches["team1_score"][mask], matches["team2_score"][mask])
+        score_against = np.where(home, matches["team2_score"][mask], matches["team1_score"][mask])
+        won = score_for > score_against
+
+        # Per-map record in order of first appearance; code 0 is "Unknown"
+        codes = matches["map"][mask] + 1
+        wins = np.bincount(codes, weights=won, minlength=len(self.maps) + 1)
+        played = np.bincount(codes, minlength=len(self.maps) + 1)
+        seen, first = np.unique(codes, return_index=True)
+        map_record = {}
+        for code in seen[np.argsort(first)].tolist():
+            name = self.maps[code - 1] if code else "Unknown"
+            record = map_record.setdefault(name, {"wins": 0, "losses": 0})
+            record["wins"] += int(wins[code])
+            record["losses"] += int(played[code] - wins[code])
+        return {
+            "total_matches": int(mask.sum()),
+            "wins": int(won.sum()),
+            "losses": int((~won).sum()),
+            "total_score_for": int(score_for.sum()),
+            "total_score_against": int(score_against.sum()),
+            "map_record": map_record,
+        }
+
+
+class StatsStore:
+    def __init__(self, enabled: bool = ENABLED, max_bytes: int = MAX_BYTES, check_seconds: float = CHECK_SECONDS):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.check_seconds = check_seconds
+        self.disabled_reason = None if enabled else "STATS_STORE_ENABLED is off"
+        self.built_at = None
+        self.last_check = None
+        self.version = 0  # bumped by every match write, see touch()
+        self._columns: Optional[ColumnarStats] = None
+        self._ready = False
+        self._generation = 0  # bumped by invalidate()
+        self._building = False
+        self._pending = []  # incremental changes made while a build was running
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._checker = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    # Lifecycle
+
+    def start(self):
+        """Build in the background and start the drift check (no-op when disabled)."""
+        if not self.enabled or self._checker is not None:
+            return
+        self._stop.clear()
+        self.rebuild("startup")
+        self._checker = threading.Thread(target=self._check_loop, name="ktp-stats-store", daemon=True)
+        self._checker.start()
+
+    def stop(self):
+        self._stop.set()
+        self._checker = None
+
+    def rebuild(self, reason: str):
+        with self._lock:
+            if self._building or self.disabled_reason:
+                return
+            self._building = True
+        threading.Thread(target=self._build, args=(reason,), name="ktp-stats-store-build", daemon=True).start()
+
+    def _build(self, reason: str):
+        try:
+            while not self._stop.is_set():
+                generation = self._generation
+                start = time.perf_counter()
+                # The primary, not a replica: replaying pending changes assumes
+                # the build saw everything committed before it started
+                with SessionLocal() as db:
+                    columns = load_columns(db)
+                with self._lock:
+                    if generation != self._generation:
+                        continue  # a non-incremental write landed mid-build
+                    if columns.nbytes > self.max_bytes:
+                        self.disabled_reason = (
+                            f"store needs {columns.nbytes / 1024 / 1024:.1f} MiB, over STATS_STORE_MAX_MB"
+                        )
+                        self._columns, self._ready, self._pending = None, False, []
+                        logger.warning("Stats store disabled: %s", self.disabled_reason)
+                        break
+                    for change in self._pending:
+                        self._apply(columns, *change)
+                    self._columns, self._ready, self._pending = columns, True, []
+                    self.built_at = time.time()
+                STATS_STORE_REBUILDS.labels(reason).inc()
+                logger.info(
+                    "Stats store built (%s) in %.2fs: %d matches, %d player-matches, %.1f MiB",
+                    reason, time.perf_counter() - start, columns.matches.size, columns.stats.size,
+                    columns.nbytes / 1024 / 1024,
+                )
+                break
+        except Exception:
+            logger.exception("Building the stats store failed")
+        finally:
+            with self._lock:
+                self._building = False
+            self._export_gauges()
+
+    def _check_loop(self):
+        while not self._stop.wait(bus.max_age(self.check_seconds)):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Stats store drift check failed")
+
+    def check(self) -> bool:
+        """Compare with the database and rebuild on drift; True when the store matched."""
+        if not self.enabled or self.disabled_reason:
+            return False
+        with self._lock:
+            columns = self._columns if self._ready else None
+            expected = columns.fingerprint() if columns is not None else None
+        if expected is None:
+            self.rebuild("retry")
+            return False
+        with SessionLocal() as db:
+            actual = database_fingerprint(db)
+        self.last_check = time.time()
+        if actual != expected:
+            logger.warning("Stats store drifted from the database (%s != %s); rebuilding", expected, actual)
+            self.invalidate("drift")
+            return False
+        return True
+
+    # Writes
+
+    def touch(self):
+        """Record that a committed write changed match stats."""
+        with self._lock:
+            self.version += 1
+
+    def invalidate(self, reason: str = "write"):
+        """Stop serving until a rebuild picks up a change that can't be applied incrementally."""
+        self.touch()
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            self._ready = False
+            self._pending = []
+        self.rebuild(reason)
+
+    def match_rows(self, match: Match, stats: Iterable[PlayerMatchStats]) -> Optional[MatchRows]:
+        """A completed match and its stats as rows for `add`; None when the store is off."""
+        if not self.enabled:
+            return None
+        per_player = defaultdict(lambda: [0, 0, 0])
+        if counts_towards_totals(match):
+            for stat in stats:
+                if not stat.is_ringer:
+                    totals = per_player[stat.player_id]
+                    totals[0] += stat.kills
+                    totals[1] += stat.deaths
+                    totals[2] += stat.flags
+        return MatchRows(
+            match={
+                "id": [match.id],
+                "played_date": np.array([_datetime64(match.played_date)], dtype="datetime64[us]"),
+                "team1_id": [match.team1_id],
+                "team2_id": [match.team2_id],
+                "team1_score": [match.team1_score or 0],
+                "team2_score": [match.team2_score or 0],
+                "counted": [match.match_type != MatchType.SCRIM],
+            },
+            map_name=match.map_name,
+            stats=dict(per_player),
+        )
+
+    def add(self, rows: Optional[MatchRows]):
+        """Append a committed, newly loaded match."""
+        self._change("add", rows)
+
+    def remove(self, match_id: int):
+        """Drop a committed, deleted match and its stats."""
+        self._change("remove", match_id)
+
+    def refresh(self, match_id: int, db: Optional[Session] = None):
+        """Reload one match and its stats from the database after a committed change."""
+        if not self.enabled or self.disabled_reason:
+            self.touch()
+            return
+        if db is None:
+            with SessionLocal() as db:
+                return self.refresh(match_id, db)
+        match = db.query(Match).filter(Match.id == match_id).first()
+        rows = None
+        if match is not None and match.is_completed:
+            rows = self.match_rows(match, db.query(PlayerMatchStats).filter(PlayerMatchStats.for_match(match)))
+        self._change("replace", (match_id, rows))
+
+    def _change(self, kind: str, value):
+        if self.enabled and value is not None:
+            with self._lock:
+                if self._ready:
+                    self._apply(self._columns, kind, value)
+                elif self._building:
+                    self._pending.append((kind, value))
+            self._export_gauges()
+        # After the change, so a reader that sees the new version also sees it
+        self.touch()
+
+    @staticmethod
+    def _apply(columns: ColumnarStats, kind: str, value):
+        # Idempotent, so a pending change the build already saw is harmless
+        if kind == "replace":
+            match_id, rows = value
+            StatsStore._apply(columns, "remove", match_id)
+            if rows is not None:
+                StatsStore._apply(columns, "add", rows)
+            return
+        if kind == "remove":
+            if (columns.matches.view()["id"] == value).any():
+                columns.matches.keep(columns.matches.view()["id"] != value)
+                columns.stats.keep(columns.stats.view()["match_id"] != value)
+            return
+
+        rows: MatchRows = value
+        match_id = rows.match["id"][0]
+        if (columns.matches.view()["id"] == match_id).any():
+            return
+        columns.matches.append({**rows.match, "map": [columns.map_code(rows.map_name)]})
+        if rows.stats:
+            player_ids = list(rows.stats)
+            columns.stats.append({
+                "match_id": [match_id] * len(player_ids),
+                "player": [columns.player_code(pid) for pid in player_ids],
+                "played_date": np.repeat(rows.match["played_date"], len(player_ids)),
+                "kills": [rows.stats[pid][0] for pid in player_ids],
+                "deaths": [rows.stats[pid][1] for pid in player_ids],
+                "flags": [rows.stats[pid][2] for pid in player_ids],
+            })
+
+    def view(self) -> Optional["StoreView"]:
+        """A consistent read-only view, or None when the routes should use SQL."""
+        with self._lock:
+            if not self._ready:
+                return None
+            return self._columns.view()
+
+    # Accounting
+
+    def _export_gauges(self):
+        with self._lock:
+            columns = self._columns if self._ready else None
+        STATS_STORE_BYTES.set(columns.nbytes if columns else 0)
+        STATS_STORE_ROWS.labels("matches").set(columns.matches.size if columns else 0)
+        STATS_STORE_ROWS.labels("player_matches").set(columns.stats.size if columns else 0)
+
+    def status(self) -> dict:
+        with self._lock:
+            columns = self._columns if self._ready else None
+            return {
+                "enabled": self.enabled,
+                "ready": columns is not None,
+                "disabled_reason": self.disabled_reason,
+                "building": self._building,
+                "matches": columns.matches.size if columns else 0,
+                "player_matches": columns.stats.size if columns else 0,
+                "bytes": columns.nbytes if columns else 0,
+                "max_bytes": self.max_bytes,
+                "built_at": self.built_at,
+                "last_check": self.last_check,
+            }
+
+
+store = StatsStore()
+
+
+@bus.on("match")
+def _match_changed(tag: Optional[str]):
+    if tag is None:
+        store.touch()
+        store.check()
+    else:
+        store.refresh(int(tag.split(":", 1)[1]))
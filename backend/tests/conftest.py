@@ -0,0 +1,43 @@
+"""
+Shared fixtures. Run from `backend/` with `python -m pytest tests`.
+
+The app runs against an in-memory SQLite database (`DATABASE_URL=sqlite://`,
+one shared connection, see `database._create_engine`), migrated and filled
+with a generated league once per session, so the whole setup takes well
+under a second and needs no Postgres. Requests are authenticated as an
+admin, and the app's lifespan (health sampler, stats store, invalidation
+bus) is not started.
+"""
+import os
+import sys
+
+# Before anything imports `database` and `auth`, which read these at import time
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.common import make_client
+from benchmarks.datagen import generate_league
+
+# Roughly a season and a half of a 20-team league
+LEAGUE_TEAMS = 20
+LEAGUE_MATCHES = 500
+
+
+@pytest.fixture(scope="session")
+def league():
+    """Migrated in-memory schema with a generated league; returns the datagen summary."""
+    from database import engine
+    from manage import migrate
+
+    migrate(seed_defaults=False)
+    return generate_league(engine, teams=LEAGUE_TEAMS, matches=LEAGUE_MATCHES)
+
+
+@pytest.fixture(scope="session")
+def client(league):
+    """TestClient for the app, authenticated as an admin."""
+    return make_client()
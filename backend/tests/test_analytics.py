@@ -0,0 +1,51 @@
+import time
+
+import analytics
+
+
+def _wait_for_refresh():
+    deadline = time.monotonic() + 10
+    while analytics._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_start_builds_the_first_snapshot_in_the_background(league, monkeypatch):
+    monkeypatch.setattr(analytics, "_snapshot", None)
+    analytics.start()
+    _wait_for_refresh()
+    assert analytics._snapshot is not None
+    assert analytics._snapshot.rows > 0
+
+
+def test_percentiles_are_served_from_the_snapshot(client, league):
+    response = client.get("/api/stats/percentiles?min_matches=1")
+    assert response.status_code == 200
+    assert response.json()["players"] == len(analytics.snapshot().player_ids)
+
+
+def test_snapshot_from_the_stats_store_matches_player_totals(league):
+    from database import SessionLocal
+    from models import Player
+    from statstore import StatsStore
+
+    store = StatsStore(enabled=True)
+    store._build("test")
+    snapshot = analytics.snapshot_from(store.view())
+
+    with SessionLocal() as db:
+        players = {p.id: p for p in db.query(Player)}
+    for i, player_id in enumerate(snapshot.player_ids):
+        player = players[int(player_id)]
+        assert snapshot.counts[i] == player.matches_played
+        assert snapshot.totals["kills"][i] == player.total_kills
+        assert snapshot.totals["flags"][i] == player.total_flags
+
+
+def test_a_match_write_makes_the_snapshot_stale(league):
+    from statstore import store as stats_store
+
+    current = analytics.snapshot()
+    stats_store.refresh(1)
+    assert analytics.snapshot() is current  # served while it is rebuilt
+    _wait_for_refresh()
+    assert analytics.snapshot().version == stats_store.version
@@ -0,0 +1,106 @@
+"""
+Player counters under concurrent match loads.
+
+The app shares one in-memory connection in the other tests, which can't run
+transactions side by side, so these tests point `get_db` at a SQLite file of
+their own. Set `TEST_POSTGRES_URL` to a disposable Postgres database to run
+them there too (its tables are dropped and recreated).
+"""
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from alembic import command
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.datagen import generate_league
+from counters import recompute_player_totals
+from database import Base, _create_engine, get_db
+from models import Player
+from schema_version import alembic_config
+
+LOADERS = 20
+LOADS_PER_LOADER = 5
+
+DATABASE_URLS = ["sqlite"]
+if os.getenv("TEST_POSTGRES_URL"):
+    DATABASE_URLS.append(os.environ["TEST_POSTGRES_URL"])
+
+
+@pytest.fixture(params=DATABASE_URLS)
+def loader_db(request, tmp_path, client):
+    """Sessionmaker for a migrated two-team league that the app's `get_db` now uses."""
+    url = f"sqlite:///{tmp_path / 'ktp.db'}" if request.param == "sqlite" else request.param
+    engine = _create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    config = alembic_config()
+    config.attributes["configure_logger"] = False
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+    league = generate_league(engine, teams=2, matches=10, free_agents=5)
+
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_loader_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    client.app.dependency_overrides[get_db] = get_loader_db
+    try:
+        yield Session, league
+    finally:
+        del client.app.dependency_overrides[get_db]
+        engine.dispose()
+
+
+def _totals(db):
+    return {row.id: tuple(row[1:]) for row in db.execute(select(
+        Player.id, Player.total_kills, Player.total_deaths, Player.total_flags, Player.matches_played
+    ))}
+
+
+def test_parallel_loads_keep_totals_exact(client, loader_db):
+    Session, league = loader_db
+    team1, team2 = league["team_ids"]
+    with Session() as db:
+        rosters = {
+            team: [pid for (pid,) in db.execute(select(Player.id).where(Player.team_id == team))]
+            for team in (team1, team2)
+        }
+
+    def load(loader):
+        rng = random.Random(loader)
+        # The app has no lifespan here, so every loader can have its own portal
+        loader_client = TestClient(client.app)
+        for _ in range(LOADS_PER_LOADER):
+            match_type = rng.choice(["LEAGUE", "DRAFT", "SCRIM"])
+            player_stats = [
+                {
+                    "player_id": pid, "team_id": team, "half": half, "is_ringer": rng.random() < 0.05,
+                    "kills": rng.randint(0, 30), "deaths": rng.randint(0, 25), "flags": rng.randint(0, 3),
+                }
+                for team in (team1, team2) for pid in rosters[team] for half in (1, 2)
+            ]
+            response = loader_client.post("/api/matches/load", json={
+                "match_type": match_type, "team1_id": team1, "team2_id": team2,
+                "map_name": "dod_avalanche", "team1_score": 3, "team2_score": 2,
+                "player_stats": player_stats,
+            })
+            assert response.status_code == 200, response.text
+
+    with ThreadPoolExecutor(LOADERS) as pool:
+        list(pool.map(load, range(LOADERS)))
+
+    with Session() as db:
+        loaded = _totals(db)
+        recompute_player_totals(db, list(loaded))
+        db.commit()
+        assert _totals(db) == loaded
@@ -0,0 +1,36 @@
+from sqlalchemy import text
+
+from database import SessionLocal, engine, read_engine
+from models import Team
+from schema_version import check_schema
+
+
+def test_in_memory_database_is_migrated(league):
+    check_schema(engine)
+    assert read_engine is engine
+
+
+def test_sqlite_connections_get_pragmas(league):
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+
+
+def test_sessions_share_the_in_memory_database(league):
+    writer = SessionLocal()
+    try:
+        team = Team(name="Shared Connection", tag="SHR")
+        writer.add(team)
+        writer.commit()
+
+        reader = SessionLocal()
+        try:
+            assert reader.get(Team, team.id).tag == "SHR"
+        finally:
+            reader.close()
+
+        writer.delete(team)
+        writer.commit()
+    finally:
+        writer.close()
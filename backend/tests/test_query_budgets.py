@@ -0,0 +1,53 @@
+"""
+Statement budgets for the hot read endpoints. A budget that starts failing
+usually means an N+1 loop crept back in: the counts must not grow with the
+number of rows returned.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from querystats import assert_max_queries, count_queries
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/api/stats/leaderboard", 1),
+    ("/api/stats/leaderboard?limit=100", 1),
+    ("/api/stats/dashboard", 9),
+    ("/api/matches/1", 3),
+    ("/api/teams", 1),
+    ("/api/teams?include=players", 2),
+    ("/api/players", 1),
+    ("/api/players?fields=id,nickname", 1),
+])
+def test_query_budget(client, path, budget):
+    with assert_max_queries(budget):
+        response = client.get(path)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("players", [2, 20])
+def test_compare_query_budget(client, league, players):
+    ids = ",".join(str(pid) for pid in league["player_ids"][:players])
+    with assert_max_queries(2):
+        response = client.get(f"/api/stats/compare?players={ids}")
+    assert response.status_code == 200
+    assert len(response.json()["players"]) == players
+
+
+def test_count_queries_counts_every_engine():
+    first, second = create_engine("sqlite://"), create_engine("sqlite://")
+    with count_queries(first, second) as stats:
+        with first.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        with second.connect() as conn:
+            conn.execute(text("SELECT 2"))
+    assert stats.count == 2
+
+
+def test_assert_max_queries_reports_the_statements():
+    engine = create_engine("sqlite://")
+    with pytest.raises(AssertionError, match="Expected at most 1 queries, 2 were executed"):
+        with assert_max_queries(1, engine):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 1"))
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+from auth import create_access_token
+from database import ReadAfterWriteMiddleware, RecentWriters, get_read_db
+
+
+@pytest.fixture
+def replica_client(monkeypatch):
+    """An app with ReadAfterWriteMiddleware whose GET /db says which engine served it."""
+    replica = create_engine("sqlite://")
+    monkeypatch.setattr(database, "read_engine", replica)
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=replica))
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(60))
+
+    app = FastAPI()
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+    @app.get("/db")
+    def which_db(db: Session = Depends(get_read_db)):
+        return "replica" if db.get_bind() is replica else "primary"
+
+    @app.post("/api/things")
+    def write():
+        return {}
+
+    @app.post("/api/auth/login")
+    def login():
+        return {}
+
+    return TestClient(app)
+
+
+def _auth(username):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def test_reads_stick_to_the_primary_after_a_write(replica_client):
+    alice, bob = _auth("alice"), _auth("bob")
+    assert replica_client.get("/db", headers=alice).json() == "replica"
+
+    replica_client.post("/api/things", headers=alice)
+    assert replica_client.get("/db", headers=alice).json() == "primary"
+    assert replica_client.get("/db", headers=bob).json() == "replica"
+    assert replica_client.get("/db").json() == "replica"
+
+
+def test_auth_endpoints_and_anonymous_writes_dont_count(replica_client):
+    alice = _auth("alice")
+    replica_client.post("/api/auth/login", headers=alice)
+    replica_client.post("/api/things")
+    replica_client.post("/api/things", headers={"Authorization": "Bearer not-a-token"})
+    assert replica_client.get("/db", headers=alice).json() == "replica"
+
+
+def test_recent_writers_expire():
+    writers = RecentWriters(0.05)
+    writers.mark("alice")
+    assert "alice" in writers and "bob" not in writers and None not in writers
+    time.sleep(0.06)
+    assert "alice" not in writers
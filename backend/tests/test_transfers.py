@@ -0,0 +1,26 @@
+def test_deleting_a_team_keeps_its_transfer_history(client, league):
+    team = client.post("/api/teams", json={"name": "Short Lived", "tag": "SL"}).json()
+    free_agent = league["player_ids"][-1]
+    assert client.post(f"/api/teams/{team['id']}/players/{free_agent}").status_code == 200
+
+    assert client.delete(f"/api/teams/{team['id']}").status_code == 200
+
+    joined, released = client.get(f"/api/players/{free_agent}/transfers").json()[-2:]
+    assert (joined["from_team_id"], joined["from_team_name"]) == (1, "FREE AGENTS")
+    assert (joined["to_team_id"], joined["to_team_name"]) == (team["id"], "Short Lived")
+    assert (released["from_team_id"], released["from_team_name"]) == (team["id"], "Short Lived")
+    assert released["to_team_id"] is None
+    assert released["note"] == "Team deleted"
+
+
+def test_roster_moves_record_team_names(client, league):
+    player = league["player_ids"][0]
+    source = client.get(f"/api/players/{player}").json()["team_id"]
+    moves = client.post("/api/teams/roster-moves", json={"moves": [{"player_id": player, "to_team_id": 1}]})
+    assert moves.status_code == 200
+    [move] = moves.json()
+    assert move["from_team_id"] == source and move["from_team_name"] == f"Team {source - 1}"
+    assert move["to_team_name"] == "FREE AGENTS"
+
+    back = client.post("/api/teams/roster-moves", json={"moves": [{"player_id": player, "to_team_id": source}]})
+    assert back.status_code == 200
@@ -0,0 +1,531 @@
+"""
+Request tracing with spans for routes, dependencies, SQL and serialization.
+
+Off unless `TRACING_ENABLED=true`. A traced request looks like:
+
+    GET /api/stats/leaderboard      server span (TracingMiddleware)
+      get_db, get_current_user      dependencies decorated with @traced
+        SELECT                      every statement, from engine events
+      get_leaderboard               the route function
+      response.serialize            response_model validation and encoding
+      response.render               FastJSONResponse / orjson
+      response.send                 writing the response out
+
+Trace and span ids follow W3C Trace Context: a request with a `traceparent`
+header continues the caller's trace and keeps its sampling decision. New
+traces are sampled from the trace id like OpenTelemetry's TraceIdRatioBased
+sampler (`TRACING_SAMPLE_RATE`). With `TRACING_SLOW_MS` set every request is
+recorded, and unsampled ones are exported when they took at least that long.
+
+Finished traces are queued and exported by a background thread, as OTLP/JSON,
+to each of `TRACING_EXPORTERS`:
+
+- `console`: an indented span tree per trace in the log,
+- `json`: one OTLP/JSON line per batch appended to `TRACING_JSON_PATH`, the
+  same format as the OpenTelemetry Collector's file exporter,
+- `otlp`: POSTed to an OTLP/HTTP collector at `TRACING_OTLP_ENDPOINT`.
+
+When the queue is full traces are dropped rather than slowing requests down.
+"""
+import functools
+import inspect
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+import orjson
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+
+from metrics import TRACES, route_label
+from querystats import statement_shape
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+EXPORTERS = [name.strip() for name in os.getenv("TRACING_EXPORTERS", "console").split(",") if name.strip()]
+SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+SLOW_MS = float(os.getenv("TRACING_SLOW_MS", "0"))
+SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", os.getenv("OTEL_SERVICE_NAME", "ktp-league-api"))
+JSON_PATH = os.getenv("TRACING_JSON_PATH", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv(
+    "TRACING_OTLP_ENDPOINT", os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces")
+)
+OTLP_HEADERS = os.getenv("TRACING_OTLP_HEADERS", os.getenv("OTEL_EXPORTER_OTLP_HEADERS", ""))
+MAX_SPANS = int(os.getenv("TRACING_MAX_SPANS", "1000"))  # per trace; an N+1 loop shouldn't eat the heap
+QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "2048"))
+BATCH_SIZE = 256
+MAX_STATEMENT_LENGTH = 2000
+
+# OTLP enum values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Trace:
+    """The spans recorded for one request."""
+
+    __slots__ = ("trace_id", "sampled", "spans", "dropped")
+
+    def __init__(self, trace_id: int, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+    def add(self, name: str, kind: int, parent_id: Optional[int], attributes: dict) -> Optional["Span"]:
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = Span(self, name, kind, parent_id, attributes)
+        self.spans.append(span)
+        return span
+
+
+class Span:
+    __slots__ = ("trace", "name", "kind", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: Trace, name: str, kind: int, parent_id: Optional[int], attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def end(self, error: Optional[str] = None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = error
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": f"{self.trace.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "parentSpanId": f"{self.parent_id:016x}" if self.parent_id else "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.error is not None:
+            span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_json(traces: List[Trace], service_name: str = SERVICE_NAME) -> bytes:
+    """An OTLP ExportTraceServiceRequest for `traces`, JSON-encoded."""
+    return orjson.dumps({"resourceSpans": [{
+        "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+        "scopeSpans": [{
+            "scope": {"name": "ktp.tracing"},
+            "spans": [span.to_otlp() for trace in traces for span in trace.spans],
+        }],
+    }]})
+
+
+def _error_name(e: BaseException) -> Optional[str]:
+    # HTTPExceptions below 500 (a 401 from get_current_user, a 404) are answers, not failures
+    if getattr(e, "status_code", 500) < 500:
+        return None
+    return type(e).__name__
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("ktp_trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _start(name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[dict] = None) -> Optional[Span]:
+    """A child of the current span, or None outside a recorded trace."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    return parent.trace.add(name, kind, parent.span_id, attributes or {})
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Record the block as a child of the current span (a no-op outside a recorded trace)."""
+    span = _start(name, SPAN_KIND_INTERNAL, attributes)
+    if span is None:
+        yield None
+        return
+    token = _current.set(span)
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = _error_name(e)
+        raise
+    finally:
+        _current.reset(token)
+        span.end(error)
+
+
+def traced(fn):
+    """Record a span named after `fn` around each call; meant for FastAPI dependencies.
+
+    Handles plain, async and generator functions (for a generator only the
+    part up to `yield` is in the span). `fn` is returned as-is when tracing is
+    disabled. The wrapper keeps `fn`'s signature, so FastAPI resolves the same
+    parameters, and `dependency_overrides` keys on the decorated function.
+    """
+    if not ENABLED:
+        return fn
+    name = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            gen = fn(*args, **kwargs)
+            with start_span(name):
+                value = next(gen)
+            try:
+                yield value
+            except BaseException as e:
+                try:
+                    gen.throw(e)
+                except StopIteration:
+                    return
+                raise
+            else:
+                next(gen, None)
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with start_span(name):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with start_span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def instrument_engine(engine):
+    """Record a span for every statement run on `engine` inside a recorded trace."""
+    system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        span = _start(statement.split(None, 1)[0].upper() if statement else "SQL", SPAN_KIND_CLIENT)
+        if span is not None:
+            span.attributes["db.system"] = system
+            span.attributes["db.statement"] = statement_shape(statement)[:MAX_STATEMENT_LENGTH]
+            if executemany:
+                span.attributes["db.executemany"] = True
+        conn.info["ktp_trace_span"] = span
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info.pop("ktp_trace_span", None)
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        span = conn.info.pop("ktp_trace_span", None) if conn is not None else None
+        if span is not None:
+            span.end(type(exception_context.original_exception).__name__)
+
+
+def instrument_fastapi():
+    """Record spans for every route function and `response_model` serialization.
+
+    FastAPI's request handler looks both helpers up in `fastapi.routing` on
+    every request, so wrapping the module attributes covers all routes.
+    """
+    import fastapi.routing
+
+    run_endpoint_function = fastapi.routing.run_endpoint_function
+    serialize_response = fastapi.routing.serialize_response
+    if getattr(run_endpoint_function, "ktp_traced", False):
+        return
+
+    async def _run_endpoint_function(**kwargs):
+        with start_span(kwargs["dependant"].call.__name__):
+            return await run_endpoint_function(**kwargs)
+
+    async def _serialize_response(**kwargs):
+        with start_span("response.serialize"):
+            return await serialize_response(**kwargs)
+
+    _run_endpoint_function.ktp_traced = True
+    fastapi.routing.run_endpoint_function = _run_endpoint_function
+    fastapi.routing.serialize_response = _serialize_response
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent span id, sampled) from a W3C `traceparent` header, or None."""
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None:
+        return None
+    trace_id, parent_id = int(match.group(1), 16), int(match.group(2), 16)
+    if not trace_id or not parent_id:
+        return None
+    return trace_id, parent_id, bool(int(match.group(3), 16) & 0x01)
+
+
+# Exporters
+
+class ConsoleExporter:
+    """Logs each trace as an indented span tree with durations."""
+
+    def export(self, traces: List[Trace], payload: bytes):
+        for trace in traces:
+            depth = {}
+            lines = []
+            for span in sorted(trace.spans, key=lambda s: s.start_ns):
+                depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+                label = span.attributes.get("db.statement", span.name)[:120]
+                error = f" [{span.error}]" if span.error else ""
+                lines.append(f"{span.duration_ms:9.2f} ms {'  ' * depth[span.span_id]}{label}{error}")
+            dropped = f" ({trace.dropped} spans dropped)" if trace.dropped else ""
+            logger.info("trace %032x%s\n%s", trace.trace_id, dropped, "\n".join(lines))
+
+
+class JsonFileExporter:
+    """Appends one OTLP/JSON line per batch to `path`."""
+
+    def __init__(self, path: str = JSON_PATH):
+        self.path = path
+
+    def export(self, traces: List[Trace], payload: bytes):
+        with open(self.path, "ab") as f:
+            f.write(payload + b"\n")
+
+
+class OtlpHttpExporter:
+    """POSTs OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, headers: str = OTLP_HEADERS, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        # OTEL_EXPORTER_OTLP_HEADERS format: key1=value1,key2=value2
+        self.headers = {"Content-Type": "application/json"}
+        for pair in filter(None, (p.strip() for p in headers.split(","))):
+            key, _, value = pair.partition("=")
+            self.headers[key.strip()] = value.strip()
+
+    def export(self, traces: List[Trace], payload: bytes):
+        request = urllib.request.Request(self.endpoint, data=payload, headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+EXPORTER_TYPES = {"console": ConsoleExporter, "json": JsonFileExporter, "otlp": OtlpHttpExporter}
+
+
+class Tracer:
+    def __init__(
+        self,
+        enabled: bool = ENABLED,
+        exporters: List[str] = EXPORTERS,
+        sample_rate: float = SAMPLE_RATE,
+        slow_ms: float = SLOW_MS,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        unknown = [name for name in exporters if name not in EXPORTER_TYPES]
+        if enabled and unknown:
+            raise ValueError(
+                f"Unknown TRACING_EXPORTERS {', '.join(unknown)}; choose from {', '.join(EXPORTER_TYPES)}"
+            )
+        self.enabled = enabled
+        self.exporter_names = list(exporters)
+        self.exporters = [EXPORTER_TYPES[name]() for name in exporters] if enabled else []
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def sample(self, traceparent: Optional[str] = None):
+        """(trace_id, parent span id, sampled) for a new request."""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            return parent
+        trace_id = random.getrandbits(128) or 1
+        # TraceIdRatioBased: compare the id's low 64 bits with rate * 2^64
+        return trace_id, None, (trace_id & 0xFFFFFFFFFFFFFFFF) < self.sample_rate * 2 ** 64
+
+    def finish(self, trace: Trace, duration_ms: float):
+        """Queue a finished trace for export if it was sampled or was slow."""
+        if not trace.sampled and not (self.slow_ms and duration_ms >= self.slow_ms):
+            return
+        now = time.time_ns()
+        for span in trace.spans:
+            if span.end_ns is None:
+                span.end_ns = now
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+            TRACES.labels("dropped").inc()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ktp-tracing-export", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Export what is queued and stop the export thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            traces = [trace for trace in batch if trace is not None]
+            if traces:
+                self._export(traces)
+            if stopping:
+                return
+
+    def _export(self, traces: List[Trace]):
+        payload = otlp_json(traces) if any(not isinstance(e, ConsoleExporter) for e in self.exporters) else b""
+        failed = False
+        for exporter in self.exporters:
+            try:
+                exporter.export(traces, payload)
+            except Exception as e:
+                failed = True
+                if str(e) != self.last_error:
+                    logger.warning("Exporting traces with %s failed: %s", type(exporter).__name__, e)
+                self.last_error = str(e)
+        if failed:
+            self.failed += len(traces)
+            TRACES.labels("failed").inc(len(traces))
+        else:
+            self.exported += len(traces)
+            TRACES.labels("exported").inc(len(traces))
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "exporters": self.exporter_names if self.enabled else [],
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms or None,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """Records a server span per request and hands the finished trace to `tracer`.
+
+    Add it last so that it wraps every other middleware.
+    """
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, sampled = self.tracer.sample(Headers(scope=scope).get("traceparent"))
+        if not sampled and not self.tracer.slow_ms:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        trace = Trace(trace_id, sampled)
+        root = trace.add(method, SPAN_KIND_SERVER, parent_id, {
+            "http.request.method": method,
+            "url.path": scope["path"],
+        })
+        status_code = 500
+        send_span = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, send_span
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if sampled:
+                    MutableHeaders(scope=message)["X-Trace-Id"] = f"{trace_id:032x}"
+                send_span = trace.add("response.send", SPAN_KIND_INTERNAL, root.span_id, {})
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body") and send_span:
+                send_span.end()
+
+        token = _current.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            route = route_label(scope)
+            if route != "unmatched":
+                root.name = f"{method} {route}"
+                root.attributes["http.route"] = route
+            root.attributes["http.response.status_code"] = status_code
+            if trace.dropped:
+                root.attributes["ktp.dropped_spans"] = trace.dropped
+            if error is None and status_code >= 500:
+                error = f"HTTP {status_code}"
+            root.end(error)
+            self.tracer.finish(trace, root.duration_ms)
@@ -0,0 +1,105 @@
+"""
+Roster changes and their history.
+
+Every change of `Player.team_id` is recorded as a `PlayerTransfer` row
+(from team, to team, when, by whom), so a player's team at any point in time
+is the `to_team_id` of their last transfer before it. The rows keep the team
+ids and names even after a team is deleted.
+
+`apply_moves` applies a batch of moves atomically: it locks the affected
+teams, checks roster capacity with one grouped count over those teams, moves
+the players and writes the history, and leaves the commit to the caller.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from models import Player, PlayerTransfer, Team
+
+MAX_PLAYERS_PER_TEAM = 10
+
+# (player_id, from_team_id, to_team_id)
+Move = Tuple[int, Optional[int], Optional[int]]
+
+
+def record_transfers(db: Session, moves: Iterable[Move], user_id: Optional[int] = None,
+                     note: Optional[str] = None,
+                     team_names: Optional[Dict[int, str]] = None) -> List[PlayerTransfer]:
+    """
+    Insert history rows for `moves` that actually change team (caller commits).
+    Team names are looked up unless the caller already has them in `team_names`.
+    """
+    moves = [move for move in moves if move[1] != move[2]]
+    if not moves:
+        return []
+
+    team_ids = {team_id for _, src, dst in moves for team_id in (src, dst) if team_id is not None}
+    if team_names is None:
+        team_names = dict(db.query(Team.id, Team.name).filter(Team.id.in_(team_ids)))
+    rows = [
+        {"player_id": player_id, "from_team_id": from_team_id, "to_team_id": to_team_id,
+         "from_team_name": team_names.get(from_team_id), "to_team_name": team_names.get(to_team_id),
+         "moved_by": user_id, "note": note}
+        for player_id, from_team_id, to_team_id in moves
+    ]
+    return db.scalars(insert(PlayerTransfer).returning(PlayerTransfer), rows).all()
+
+
+def apply_moves(db: Session, targets: Dict[int, Optional[int]], user_id: Optional[int] = None,
+                note: Optional[str] = None) -> List[PlayerTransfer]:
+    """
+    Move each player in `targets` (player_id -> team_id, None to release).
+    Raises 404 for unknown players or teams and 400 when a team would end up
+    above `MAX_PLAYERS_PER_TEAM`; nothing is written in that case.
+    """
+    current = dict(db.query(Player.id, Player.team_id).filter(Player.id.in_(targets)))
+    missing = sorted(set(targets) - set(current))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player with id {missing[0]} not found"
+        )
+
+    moves = [(pid, current[pid], to) for pid, to in targets.items() if current[pid] != to]
+    if not moves:
+        return []
+
+    # Lock the receiving and losing teams (in id order) so concurrent moves
+    # can't both pass the capacity check
+    team_ids = {team_id for _, src, dst in moves for team_id in (src, dst) if team_id is not None}
+    teams = {
+        team.id: team
+        for team in db.query(Team).filter(Team.id.in_(team_ids)).order_by(Team.id).with_for_update()
+    }
+    unknown = sorted({dst for _, _, dst in moves if dst is not None} - set(teams))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Team with id {unknown[0]} not found"
+        )
+
+    sizes = dict(
+        db.query(Player.team_id, func.count(Player.id))
+        .filter(Player.team_id.in_(teams)).group_by(Player.team_id)
+    )
+    receiving = set()
+    for _, src, dst in moves:
+        if src is not None:
+            sizes[src] = sizes.get(src, 0) - 1
+        if dst is not None:
+            sizes[dst] = sizes.get(dst, 0) + 1
+            receiving.add(dst)
+    full = [
+        teams[team_id].name for team_id in sorted(receiving)
+        if not teams[team_id].is_free_agents and sizes[team_id] > MAX_PLAYERS_PER_TEAM
+    ]
+    if full:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Team already has maximum {MAX_PLAYERS_PER_TEAM} players: {', '.join(full)}"
+        )
+
+    db.execute(update(Player), [{"id": pid, "team_id": dst} for pid, _, dst in moves])
+    return record_transfers(db, moves, user_id, note, {team.id: team.name for team in teams.values()})